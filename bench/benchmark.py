@@ -0,0 +1,627 @@
+"""Benchmarks for the physics, vector math and level loading.
+
+Generates synthetic levels from the size of the current levels (21x6) up to
+10000x1000 tiles, times every stage, and writes the results as json so that
+they can be compared against a saved baseline.
+
+Usage:
+    python bench/benchmark.py --output results.json
+    python bench/benchmark.py --sizes small,medium --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# The game's modules are in 'src', next to this folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+from broadphase import AABBTree, UniformGrid
+from camera import Camera
+from chunkstream import ChunkStreamer
+from controller import PlayerController, START_POSITION
+from leveldata import LevelData, read_levels, TILE_SIZE
+from levelpack import LevelPack, write_pack
+from mathf import Circlef, PhysicsWorld, Rectanglef, RigidBody2D, Vector2f, \
+    collide_swept, SLEEP_FRAMES
+import narrowphase
+from narrowphase import collide_swept_batch
+from tilemap import TileMap, merge_rects
+from tilemesh import ChunkIndex, build_meshes
+
+# (columns, rows) of every synthetic level size
+SIZES = {
+    "small": (21, 6),
+    "medium": (200, 50),
+    "large": (1000, 200),
+    "huge": (10000, 1000),
+}
+# Fraction of the tiles below the surface that are solid
+DENSITIES = (0.1, 0.3, 0.6)
+# Block names used in synthetic levels
+BLOCKS = ("dirt", "stone")
+# The size of the screen when measuring what the camera draws
+VIEW_SIZE = (800, 600)
+
+def generate_rows(columns, rows, density, seed=0):
+    """Generates the [y][x] block names of a synthetic level.
+
+    The bottom half of the level is solid at `density`, with a flat floor
+    at the bottom row, so that the player always has something to walk on.
+
+    Args:
+        columns: the width of the level in tiles
+        rows: the height of the level in tiles
+        density: 0 to 1, the fraction of tiles in the bottom half that are
+                    solid
+        seed: seed for the random number generator
+
+    Returns:
+        A list of rows, top row first (same as 'levels.json').
+    """
+    generator = random.Random(seed)
+    result = []
+    for y in range(rows):
+        row = []
+        for x in range(columns):
+            if y == rows - 1:
+                row.append("dirt")
+            elif y >= rows // 2 and generator.random() < density:
+                row.append(generator.choice(BLOCKS))
+            else:
+                row.append("None")
+        result.append(row)
+    return result
+
+class Benchmark(object):
+    """Times a function and measures the memory it uses."""
+
+    def __init__(self, min_time=0.2):
+        """Initalizes the results.
+
+        Args:
+            min_time: run every benchmark at least this many seconds
+        """
+        self.min_time = min_time
+        self.results = dict()
+
+    def run(self, name, function, ops=1, unit="ops"):
+        """Runs one benchmark.
+
+        Args:
+            name: the name of the result
+            function: the function to time, it is called over and over
+            ops: the amount of operations that one call of `function` does
+            unit: what one operation is, only used in the printed result
+        """
+        # Timing without tracing memory, since tracing slows everything down
+        calls = 0
+        elapsed = 0.0
+        while elapsed < self.min_time or calls == 0:
+            start = time.perf_counter()
+            function()
+            elapsed += time.perf_counter() - start
+            calls += 1
+
+        # Measuring memory with one more call, counting the blocks outside
+        # of the tracing so that tracemalloc's own blocks aren't counted
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        blocks_after = sys.getallocatedblocks()
+
+        result = {
+            "ops": ops * calls,
+            "seconds": elapsed,
+            "ops_per_second": (ops * calls) / elapsed if elapsed > 0 else None,
+            "seconds_per_op": elapsed / (ops * calls),
+            "unit": unit,
+            "peak_bytes": peak,
+            # Memory blocks still allocated after one call, a growing number
+            # means that every call keeps more objects alive
+            "allocated_blocks": blocks_after - blocks_before,
+        }
+        self.results[name] = result
+        print("{:<44} {:>14,.0f} {:<7} {:>12,} peak bytes".format(name,
+                result["ops_per_second"] or 0, unit + "/s", peak))
+        return result
+
+    def run_memory(self, name, function, count, unit="ops"):
+        """Measures the memory that the result of `function` keeps alive.
+
+        Unlike `run`, this is what stays allocated after `function` returns
+        (for as long as it's result is kept), not the peak while it runs.
+
+        Args:
+            name: the name of the result
+            function: the function to call once, it returns what it made
+            count: the amount of `unit` that `function` makes
+            unit: what one of `count` is, only used in the printed result
+        """
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        kept = function()
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+
+        result = {
+            "kept_bytes": after - before,
+            "kept_bytes_per_op": (after - before) / count,
+            "unit": unit,
+        }
+        self.results[name] = result
+        print("{:<44} {:>14,.0f} bytes/{}".format(name,
+                result["kept_bytes_per_op"], unit))
+        return result
+
+def bench_vectors(bench):
+    """Vector2f arithmetic."""
+    a = Vector2f((1.5, 2.5))
+    b = Vector2f((0.5, -0.5))
+
+    def add():
+        for _ in range(1000):
+            a + b
+    def iadd():
+        for _ in range(1000):
+            a.__iadd__(b)
+            a.__isub__(b)
+    def imul():
+        for _ in range(1000):
+            a.__imul__(1.0)
+    def to_tuple():
+        for _ in range(1000):
+            tuple(a)
+
+    bench.run("vector/add", add, 1000)
+    bench.run("vector/iadd_isub", iadd, 2000)
+    bench.run("vector/imul_scalar", imul, 1000)
+    bench.run("vector/tuple", to_tuple, 1000)
+
+def bench_collide_swept(bench):
+    """`collide_swept` and `collide_swept_batch` over N shapes."""
+    collider = Rectanglef(position=Vector2f((0, 0)), size=Vector2f((60, 60)))
+    velocity = Vector2f((4, -3))
+    generator = random.Random(1)
+    for count in (10, 100, 1000):
+        shapes = [Rectanglef(position=Vector2f((generator.uniform(100, 3000),
+                                                generator.uniform(100, 3000))),
+                                size=Vector2f(TILE_SIZE))
+                    for _ in range(count)]
+        bench.run("collide_swept/" + str(count),
+                    lambda: collide_swept(collider, velocity, shapes), count)
+        name = "collide_swept_batch/" + str(count)
+        if narrowphase.numpy is None:
+            name += "/no_numpy"
+        bench.run(name,
+                    lambda: collide_swept_batch(collider, velocity, shapes),
+                    count)
+
+def bench_shapes(bench):
+    """`collide_swept` and `collide_swept_batch` of a circle over N mixed
+    circles and rectangles, and physics steps of a world with both."""
+    collider = Circlef(30, Vector2f((0, 0)))
+    velocity = Vector2f((4, -3))
+    generator = random.Random(3)
+    for count in (100, 1000):
+        shapes = []
+        for index in range(count):
+            position = Vector2f((generator.uniform(100, 3000),
+                                    generator.uniform(100, 3000)))
+            if index % 2:
+                shapes.append(Circlef(TILE_SIZE[0] / 2.0, position))
+            else:
+                shapes.append(Rectanglef(position=position,
+                                            size=Vector2f(TILE_SIZE)))
+        bench.run("collide_swept_mixed/" + str(count),
+                    lambda: collide_swept(collider, velocity, shapes), count)
+        name = "collide_swept_batch_mixed/" + str(count)
+        if narrowphase.numpy is None:
+            name += "/no_numpy"
+        bench.run(name,
+                    lambda: collide_swept_batch(collider, velocity, shapes),
+                    count)
+
+    # The same crowd as `bench_crowd`, half of it circles
+    columns, rows = SIZES["medium"]
+    tilemap = TileMap.from_rows(generate_rows(columns, rows, 0.1), TILE_SIZE)
+    world = PhysicsWorld(tilemap)
+    # The world only keeps weak references, so keeping them alive here
+    bodies = []
+    for index in range(500):
+        position = Vector2f((generator.uniform(0, 4000),
+                                generator.uniform(0, 2000)))
+        if index % 2:
+            shape = Circlef(15, position)
+        else:
+            shape = Rectanglef(position=position, size=Vector2f((30, 30)))
+        body = RigidBody2D(shape, world)
+        body.velocity = (generator.uniform(-4, 4), generator.uniform(-4, 4))
+        bodies.append(body)
+    # Same as `bench_crowd`, every step sweeps the same crowd
+    start = (world.store.x[:], world.store.y[:])
+
+    def step():
+        world.Update(1.0 / 60.0)
+        world.store.x[:] = start[0]
+        world.store.y[:] = start[1]
+
+    bench.run("world_mixed_shapes/500", step)
+
+def bench_body_memory(bench):
+    """The memory of a rigidbody on it's own (a few separate Vector2fs),
+    and of one in a PhysicsWorld (views into the world's BodyStore, plus
+    the world's references to it and it's node in the broadphase)."""
+    count = 5000
+    generator = random.Random(4)
+    places = [(generator.uniform(0, 4000), generator.uniform(0, 2000))
+                for _ in range(count)]
+
+    def make(world):
+        bodies = []
+        for place in places:
+            body = RigidBody2D(Rectanglef(position=Vector2f(place),
+                                            size=Vector2f((30, 30))), world)
+            body.velocity = (1.0, 2.0)
+            bodies.append(body)
+        return bodies
+
+    bench.run_memory("body_memory/detached", lambda: make(None), count,
+                        "body")
+    # The world is made first, so that only what every body adds counts
+    world = PhysicsWorld()
+    bench.run_memory("body_memory/in_world", lambda: make(world), count,
+                        "body")
+
+def bench_sleeping(bench):
+    """Physics steps of a world where almost every rigidbody is asleep."""
+    for count in (100, 1000):
+        world = PhysicsWorld()
+        bodies = [RigidBody2D(Rectanglef(position=Vector2f((index * 40.0, 0)),
+                                        size=Vector2f((30, 30))), world)
+                    for index in range(count)]
+        # Letting every rigidbody fall asleep, then waking one up
+        for _ in range(SLEEP_FRAMES):
+            world.Update(1.0 / 60.0)
+        bodies[0].velocity = (1.0, 0.0)
+
+        def step():
+            for _ in range(100):
+                world.Update(1.0 / 60.0)
+        bench.run("world_idle/" + str(count), step, 100)
+
+def bench_broadphase(bench):
+    """Moving N bodies of many sizes and finding what each of them could
+    hit, with the UniformGrid and with the AABBTree."""
+    generator = random.Random(3)
+    for count in (100, 1000):
+        bodies = [[generator.uniform(0, 6000), generator.uniform(0, 3000),
+                    generator.uniform(10, 200), generator.uniform(10, 200),
+                    generator.uniform(-6, 6), generator.uniform(-6, 6)]
+                    for _ in range(count)]
+        grid = UniformGrid()
+        tree = AABBTree()
+        for index, (x, y, width, height, velocity_x, velocity_y) in \
+            enumerate(bodies):
+            grid.insert(index, x, y, width, height)
+            tree.insert(index, x, y, width, height, velocity_x, velocity_y)
+
+        def step(broadphase):
+            """Moves every body back and forth, and queries around it."""
+            def run():
+                for index, body in enumerate(bodies):
+                    # Bouncing off of the edges of the level
+                    if not 0 <= body[0] + body[4] <= 6000:
+                        body[4] = -body[4]
+                    if not 0 <= body[1] + body[5] <= 3000:
+                        body[5] = -body[5]
+                    body[0] += body[4]
+                    body[1] += body[5]
+                    x, y, width, height, velocity_x, velocity_y = body
+                    if broadphase is tree:
+                        tree.move(index, x, y, width, height, velocity_x,
+                                    velocity_y)
+                    else:
+                        grid.move(index, x, y, width, height)
+                for index, (x, y, width, height, velocity_x, velocity_y) in \
+                    enumerate(bodies):
+                    if broadphase is tree and tree.fat_contains(
+                        index, x + min(velocity_x, 0), y + min(velocity_y, 0),
+                        width + abs(velocity_x), height + abs(velocity_y)):
+                        tree.neighbors(index)
+                    else:
+                        broadphase.query_swept(x, y, width, height,
+                                                velocity_x, velocity_y)
+            return run
+
+        bench.run("broadphase/grid/" + str(count), step(grid), count)
+        bench.run("broadphase/tree/" + str(count), step(tree), count)
+
+def bench_queries(bench):
+    """Raycasts, sweeps and overlaps on a level with a crowd of moving
+    rigidbodies, one at a time and all at once with `query_batch`."""
+    columns, rows = SIZES["medium"]
+    tilemap = TileMap.from_rows(generate_rows(columns, rows, 0.1), TILE_SIZE)
+    world = PhysicsWorld(tilemap)
+    generator = random.Random(4)
+    bodies = []
+    for _ in range(1000):
+        body = RigidBody2D(Rectanglef(
+            position=Vector2f((generator.uniform(0, 4000),
+                                generator.uniform(0, 2000))),
+            size=Vector2f((30, 30))), world)
+        body.velocity = (generator.uniform(-4, 4), generator.uniform(-4, 4))
+        bodies.append(body)
+    world.Update(1.0 / 60.0)
+
+    # Line of sight checks, ground checks and projectiles
+    queries = []
+    for index in range(300):
+        x = generator.uniform(0, 4000)
+        y = generator.uniform(0, 2000)
+        if index % 3 == 0:
+            queries.append((x, y, 0.0, 0.0, generator.uniform(-300, 300),
+                            generator.uniform(-300, 300)))
+        elif index % 3 == 1:
+            queries.append((x, y, 30.0, 30.0, 0.0, -4.0))
+        else:
+            queries.append((x, y, 60.0, 60.0, 0.0, 0.0))
+
+    def one_by_one():
+        for query in queries:
+            world.query_batch([query])
+
+    bench.run("queries/300/one_by_one", one_by_one, len(queries))
+    bench.run("queries/300/batch", lambda: world.query_batch(queries),
+                len(queries))
+
+def bench_crowd(bench):
+    """Physics steps of a crowd of moving rigidbodies on a big level."""
+    columns, rows = SIZES["medium"]
+    tilemap = TileMap.from_rows(generate_rows(columns, rows, 0.1), TILE_SIZE)
+    generator = random.Random(2)
+    for count in (500, 2000):
+        world = PhysicsWorld(tilemap)
+        # The world only keeps weak references, so keeping them alive here
+        bodies = []
+        for _ in range(count):
+            body = RigidBody2D(Rectanglef(
+                position=Vector2f((generator.uniform(0, 4000),
+                                    generator.uniform(0, 2000))),
+                size=Vector2f((30, 30))), world)
+            body.velocity = (generator.uniform(-4, 4), generator.uniform(-4, 4))
+            bodies.append(body)
+        # Putting everything back after every step, so that every step
+        # sweeps the same crowd
+        start = (world.store.x[:], world.store.y[:])
+
+        def step():
+            world.Update(1.0 / 60.0)
+            world.store.x[:] = start[0]
+            world.store.y[:] = start[1]
+
+        bench.run("world_crowd/" + str(count), step)
+
+def bench_levels(bench, sizes, densities):
+    """TileMap building, sweeps, render meshes and physics steps on
+    synthetic levels."""
+    for size in sizes:
+        columns, rows = SIZES[size]
+        for density in densities:
+            level_rows = generate_rows(columns, rows, density)
+            prefix = "level/" + size + "/" + str(density) + "/"
+
+            bench.run(prefix + "tilemap_build",
+                        lambda: TileMap.from_rows(level_rows, TILE_SIZE),
+                        columns * rows, "tiles")
+
+            tilemap = TileMap.from_rows(level_rows, TILE_SIZE)
+            bench.run(prefix + "merge_colliders",
+                        lambda: merge_rects(tilemap.tiles, columns, rows),
+                        columns * rows, "tiles")
+            # Merging once before timing the sweeps
+            tilemap.colliders()
+            collider = Rectanglef(position=Vector2f((0, rows * TILE_SIZE[1] / 2)),
+                                    size=Vector2f((60, 60)))
+            velocity = Vector2f((4, -4))
+            bench.run(prefix + "tilemap_sweep",
+                        lambda: tilemap.sweep(collider, velocity))
+
+            level = LevelData("benchmark", level_rows)
+            bench.run(prefix + "world_steps", level_stepper(level, 100), 100,
+                        "steps")
+
+            bench.run(prefix + "tile_meshes",
+                        lambda: build_meshes(tilemap), columns * rows,
+                        "tiles")
+
+            # What the camera builds when it jumps to the middle of the level
+            camera = Camera(VIEW_SIZE, (columns * TILE_SIZE[0],
+                                        rows * TILE_SIZE[1]))
+            camera.follow(columns * TILE_SIZE[0] / 2, rows * TILE_SIZE[1] / 2)
+            bench.run(prefix + "chunk_index",
+                        lambda: ChunkIndex(tilemap), columns * rows, "tiles")
+            chunks = ChunkIndex(tilemap)
+            bench.run(prefix + "visible_meshes",
+                        lambda: [chunks.build(chunk) for chunk in
+                                    chunks.chunks_in(*camera.visible_rect())])
+
+            bench.run(prefix + "stream_scroll", scroller(chunks, 100), 100,
+                        "frames")
+
+def scroller(chunks, frames):
+    """Makes a function that scrolls a camera across the level for `frames`
+    frames, streaming in the chunks that it sees."""
+    tilemap = chunks.tilemap
+    camera = Camera(VIEW_SIZE, (tilemap.width * tilemap.tile_size[0],
+                                tilemap.height * tilemap.tile_size[1]))
+
+    def scroll():
+        streamer = ChunkStreamer(chunks)
+        for frame in range(frames):
+            camera.follow(frame * 20.0, tilemap.height * tilemap.tile_size[1]
+                            / 2)
+            view = camera.visible_rect()
+            streamer.Update(*view)
+            for chunk in chunks.chunks_in(*view):
+                streamer.get(chunk)
+        streamer.reset()
+    return scroll
+
+def level_stepper(level, steps):
+    """Builds the physics world of `level`.
+
+    Returns:
+        A function that runs `steps` physics steps of the world with the
+        player walking right.
+    """
+    world = PhysicsWorld(level.tilemap(TILE_SIZE))
+    player = PlayerController(START_POSITION, world)
+    keys = {"d"}
+    dt = 1.0 / 60.0
+
+    def step():
+        for _ in range(steps):
+            player.Update(keys, dt)
+            world.Update(dt)
+            player.PhysicsUpdate(dt)
+    return step
+
+def bench_read_levels(bench, sizes):
+    """Reading and starting a level file with one synthetic level of every
+    size."""
+    levels = [{"name": size, "data": generate_rows(*SIZES[size], 0.3)}
+                for size in sizes]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "levels.json")
+        with open(path, "w") as file:
+            json.dump(levels, file)
+        tiles = sum(SIZES[size][0] * SIZES[size][1] for size in sizes)
+        bench.run("read_levels/" + "+".join(sizes),
+                    lambda: read_levels(path), tiles, "tiles")
+
+        # Everything `load_levels` does before making widgets
+        def startup():
+            for level in read_levels(path):
+                PhysicsWorld(level.tilemap(TILE_SIZE))
+        bench.run("level_startup/" + "+".join(sizes), startup, tiles,
+                    "tiles")
+
+        # The same levels compiled into a level pack
+        pack_path = os.path.join(directory, "levels.lvlpack")
+        write_pack(read_levels(path), pack_path)
+        # Packed levels are only decoded when their tilemap is made, so
+        # making it to time the decoding too (reading 'levels.json' decodes
+        # everything). Every pack is closed again, a mapped file can't be
+        # deleted with the directory on Windows.
+        def read_pack():
+            pack = LevelPack(pack_path)
+            try:
+                for level in pack.levels:
+                    level.tilemap(TILE_SIZE)
+            finally:
+                pack.close()
+        bench.run("read_pack/" + "+".join(sizes), read_pack, tiles, "tiles")
+        def pack_startup():
+            pack = LevelPack(pack_path)
+            try:
+                for level in pack.levels:
+                    PhysicsWorld(level.tilemap(TILE_SIZE))
+            finally:
+                pack.close()
+        bench.run("pack_startup/" + "+".join(sizes), pack_startup, tiles,
+                    "tiles")
+
+def compare(results, baseline, tolerance):
+    """Prints how much faster or slower every result is than `baseline`.
+
+    Returns:
+        A list of the names of results that are slower by more than
+        `tolerance`.
+    """
+    regressions = []
+    print()
+    print("{:<44} {:>10} {:>10}".format("compared to baseline", "speed",
+                                        "memory"))
+    for name, result in sorted(results.items()):
+        old = baseline.get(name)
+        if not old or "ops_per_second" not in old or \
+            "ops_per_second" not in result:
+            continue
+        speed = result["ops_per_second"] / old["ops_per_second"]
+        memory = (result["peak_bytes"] / old["peak_bytes"]
+                    if old["peak_bytes"] else 1.0)
+        flag = ""
+        if speed < 1.0 - tolerance:
+            flag = "  SLOWER"
+            regressions.append(name)
+        print("{:<44} {:>9.2f}x {:>9.2f}x{}".format(name, speed, memory, flag))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the physics, \
+vector math and level loading.")
+    parser.add_argument("--sizes", default="small,medium,large",
+                        help="comma separated synthetic level sizes, out of "
+                        + ", ".join(SIZES))
+    parser.add_argument("--densities", default=",".join(map(str, DENSITIES)),
+                        help="comma separated fractions of solid tiles")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds to run every benchmark for")
+    parser.add_argument("--output", default=None,
+                        help="write the results to this json file")
+    parser.add_argument("--baseline", default=None,
+                        help="compare the results with this json file")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="how much slower than the baseline is allowed")
+    args = parser.parse_args(argv)
+
+    sizes = [size for size in args.sizes.split(",") if size]
+    for size in sizes:
+        if size not in SIZES:
+            parser.error("unknown size '" + size + "'")
+    densities = [float(density) for density in args.densities.split(",")]
+
+    bench = Benchmark(args.min_time)
+    bench_vectors(bench)
+    bench_collide_swept(bench)
+    bench_shapes(bench)
+    bench_body_memory(bench)
+    bench_sleeping(bench)
+    bench_broadphase(bench)
+    bench_queries(bench)
+    bench_crowd(bench)
+    bench_levels(bench, sizes, densities)
+    bench_read_levels(bench, sizes)
+
+    output = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": getattr(narrowphase.numpy, "__version__", None),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": bench.results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(output, file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)["results"]
+        if compare(bench.results, baseline, args.tolerance):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
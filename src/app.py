@@ -1,3 +1,4 @@
+import os
 import sys
 
 from kivy.app import App
@@ -5,13 +6,28 @@ from kivy.core.window import Window
 from kivy.uix.button import Button
 
 from game import Game
+from inputlatency import input_latency, LOG_VARIABLE
+from remote import SerialRemote, PORT_VARIABLE
+from timestep import PHYSICS_RATE, RATE_VARIABLE
 
 class Application(App):
     def build(self):
         self.title = "Mario 9000"
-        self.game = Game()
+        # Using the Arduino remote if it's port is set
+        port = os.environ.get(PORT_VARIABLE)
+        rate = os.environ.get(RATE_VARIABLE)
+        self.game = Game(remote=SerialRemote(port) if port else None,
+                            input_log=os.environ.get(LOG_VARIABLE),
+                            physics_rate=float(rate) if rate else PHYSICS_RATE)
         return self.game
 
+    def on_stop(self):
+        # Writing out the rest of the input log
+        input_latency.disable()
+        if self.game.remote is not None:
+            print(self.game.remote.report())
+            self.game.remote.close()
+
 if __name__ == "__main__":
     Application().run()
 
@@ -0,0 +1,141 @@
+from array import array
+
+# NumPy is optional, without it `integrate` loops over the bodies instead.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Flags stored for every body in `BodyStore.flags`
+FLAG_ACTIVE = 1 # The index is being used by a body
+FLAG_SLEEPING = 2 # The body is asleep, and not stepped until it wakes up
+
+# Moving fewer bodies than this is faster with a plain loop than with NumPy
+VECTORIZE_THRESHOLD = 32
+
+class BodyStore(object):
+    """Stores the physics data of many bodies in parallel arrays.
+
+    Every body gets an index, and it's x, y, width, height, velocity and flags
+    are stored at that index in one typed array each (structure of arrays),
+    so that `integrate` can move every body in one pass. RigidBody2D and
+    it's shape only hold views (see `ArrayVector2f`) into these arrays,
+    they still are a few small objects per body (see 'body_memory' in
+    bench/benchmark.py).
+
+    Members:
+        x, y: the position of every body
+        width, height: the size of every body
+        velocity_x, velocity_y: the velocity of every body
+        flags: combination of the FLAG_ constants for every body
+        rest_frames: the amount of steps in a row that every body didn't
+                        move, see `PhysicsWorld.Update`
+    """
+
+    def __init__(self):
+        """Initalizes the empty arrays."""
+        self.x = array("d")
+        self.y = array("d")
+        self.width = array("d")
+        self.height = array("d")
+        self.velocity_x = array("d")
+        self.velocity_y = array("d")
+        self.flags = array("B")
+        self.rest_frames = array("I")
+
+        # Indices of bodies that were released, and can be used again
+        self._free = []
+
+    def __len__(self):
+        """Returns the amount of bodies using an index."""
+        return len(self.flags) - len(self._free)
+
+    @property
+    def capacity(self):
+        """The amount of indices, including the ones that are not used."""
+        return len(self.flags)
+
+    def allocate(self, x, y, width, height, velocity_x=0.0, velocity_y=0.0,
+                    flags=FLAG_ACTIVE):
+        """Stores a new body.
+
+        Returns:
+            The index of the body in every array.
+        """
+        if self._free:
+            # Reusing an index of a released body
+            index = self._free.pop()
+            self.x[index] = x
+            self.y[index] = y
+            self.width[index] = width
+            self.height[index] = height
+            self.velocity_x[index] = velocity_x
+            self.velocity_y[index] = velocity_y
+            self.flags[index] = flags | FLAG_ACTIVE
+            self.rest_frames[index] = 0
+            return index
+
+        index = len(self.flags)
+        self.x.append(x)
+        self.y.append(y)
+        self.width.append(width)
+        self.height.append(height)
+        self.velocity_x.append(velocity_x)
+        self.velocity_y.append(velocity_y)
+        self.flags.append(flags | FLAG_ACTIVE)
+        self.rest_frames.append(0)
+        return index
+
+    def release(self, index):
+        """Frees the index of a body that is not used anymore."""
+        if not self.flags[index] & FLAG_ACTIVE:
+            return
+        self.flags[index] = 0
+        self.velocity_x[index] = 0.0
+        self.velocity_y[index] = 0.0
+        self.rest_frames[index] = 0
+        self._free.append(index)
+
+    def clear(self):
+        """Removes every body."""
+        for name in ("x", "y", "width", "height", "velocity_x", "velocity_y",
+                        "flags", "rest_frames"):
+            del getattr(self, name)[:]
+        self._free = []
+
+    def integrate(self, indices, times):
+        """Moves bodies by their velocity times their time.
+
+        Scales the velocities by `times` first, just like
+        `RigidBody2D.Update` does with the result of a sweep. When there are
+        enough bodies, all of them are moved at once with NumPy.
+
+        Args:
+            indices: list of the indices of the bodies to move, each index
+                        can only be in it once
+            times: list with one float (from 0 to 1) per index in `indices`,
+                    the fraction of the velocity that the body can move
+        """
+        if numpy is None or len(indices) < VECTORIZE_THRESHOLD:
+            velocity_x = self.velocity_x
+            velocity_y = self.velocity_y
+            for index, time in zip(indices, times):
+                velocity_x[index] *= time
+                velocity_y[index] *= time
+                self.x[index] += velocity_x[index]
+                self.y[index] += velocity_y[index]
+            return
+
+        indices = numpy.asarray(indices, dtype=numpy.intp)
+        times = numpy.asarray(times, dtype=numpy.float64)
+        # Views into the arrays without copying them. They must not be kept
+        # around, since an array.array can't grow while a view of it exists.
+        velocity_x = numpy.frombuffer(self.velocity_x, dtype=numpy.float64)
+        velocity_y = numpy.frombuffer(self.velocity_y, dtype=numpy.float64)
+        x = numpy.frombuffer(self.x, dtype=numpy.float64)
+        y = numpy.frombuffer(self.y, dtype=numpy.float64)
+        velocity_x[indices] *= times
+        velocity_y[indices] *= times
+        x[indices] += velocity_x[indices]
+        y[indices] += velocity_y[indices]
+        del velocity_x, velocity_y, x, y
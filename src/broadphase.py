@@ -0,0 +1,753 @@
+import math
+
+class UniformGrid(object):
+    """Spatial hash that buckets objects into square cells.
+
+    Used as a broadphase for `collide_swept`, so that only the objects near a
+    moving shape get tested instead of every object in the world.
+
+    Members:
+        cell_size: the width and height of every cell
+    """
+
+    def __init__(self, cell_size=120.0):
+        """Initalizes the cells.
+
+        Args:
+            cell_size: positive float/int, the width and height of every cell.
+                        Works best when it is a few times bigger than the
+                        objects that are put into the grid.
+        """
+        if cell_size <= 0:
+            raise ValueError("The cell size of a UniformGrid must be positive!")
+
+        self.cell_size = float(cell_size)
+
+        # Maps a (column, row) tuple to the set of items inside of that cell
+        self._cells = dict()
+        # Maps an item to the (first column, first row, last column, last row)
+        # range of cells that it is inside of
+        self._ranges = dict()
+
+    def __len__(self):
+        """Returns the amount of items inside of the grid."""
+        return len(self._ranges)
+
+    def __contains__(self, item):
+        """Checks if `item` has been inserted into the grid."""
+        return item in self._ranges
+
+    def cell_range(self, x, y, width, height):
+        """Gets the range of cells that a rectangle is inside of.
+
+        Args:
+            x: the x position of the rectangle
+            y: the y position of the rectangle
+            width: the width of the rectangle
+            height: the height of the rectangle
+
+        Returns:
+            A tuple of length four, (first column, first row, last column,
+            last row), the last column and row are included in the range.
+        """
+        cell_size = self.cell_size
+        return (math.floor(x / cell_size), math.floor(y / cell_size),
+                math.floor((x + width) / cell_size),
+                math.floor((y + height) / cell_size))
+
+    def insert(self, item, x, y, width, height):
+        """Adds `item` to every cell the rectangle (x, y, width, height) is in.
+
+        If `item` is already inside of the grid it is moved instead.
+        """
+        if item in self._ranges:
+            self.move(item, x, y, width, height)
+            return
+
+        cells = self.cell_range(x, y, width, height)
+        self._ranges[item] = cells
+        self._add_to_cells(item, cells)
+
+    def remove(self, item):
+        """Removes `item` from the grid, does nothing if it isn't in it."""
+        cells = self._ranges.pop(item, None)
+        if cells is not None:
+            self._remove_from_cells(item, cells)
+
+    def move(self, item, x, y, width, height):
+        """Updates the cells `item` is in after it has moved or resized.
+
+        Does nothing if `item` is still inside of the same cells, so calling
+        this every frame for a slow moving object is cheap.
+        """
+        old_cells = self._ranges.get(item)
+        if old_cells is None:
+            self.insert(item, x, y, width, height)
+            return
+
+        new_cells = self.cell_range(x, y, width, height)
+        # Still inside of the same cells, nothing needs to change
+        if new_cells == old_cells:
+            return
+
+        self._remove_from_cells(item, old_cells)
+        self._ranges[item] = new_cells
+        self._add_to_cells(item, new_cells)
+
+    def clear(self):
+        """Removes every item from the grid."""
+        self._cells.clear()
+        self._ranges.clear()
+
+    def query(self, x, y, width, height):
+        """Gets the items inside of the cells that a rectangle touches.
+
+        This is conservative, an item being returned does not mean that it
+        overlaps with the rectangle, only that it is close enough that it
+        might.
+
+        Returns:
+            A set of items.
+        """
+        result = set()
+        first_column, first_row, last_column, last_row = \
+            self.cell_range(x, y, width, height)
+
+        cells = self._cells
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = cells.get((column, row))
+                if cell:
+                    result.update(cell)
+        return result
+
+    def query_swept(self, x, y, width, height, velocity_x, velocity_y):
+        """Gets the items close to a rectangle moving by a velocity.
+
+        Queries the bounding box around the rectangle at it's current
+        position and at it's position after moving by the full velocity.
+
+        Returns:
+            A set of items.
+        """
+        # Growing the rectangle in the direction that it is moving
+        if velocity_x < 0:
+            x += velocity_x
+        if velocity_y < 0:
+            y += velocity_y
+        return self.query(x, y, width + abs(velocity_x),
+                            height + abs(velocity_y))
+
+    def query_many(self, rects):
+        """Same as calling `query` for every (x, y, width, height) in
+        `rects`.
+
+        Returns:
+            A list with a set of items for every rectangle.
+        """
+        return [self.query(x, y, width, height)
+                for x, y, width, height in rects]
+
+    def _add_to_cells(self, item, cells):
+        """Adds `item` to every cell in the range `cells`."""
+        first_column, first_row, last_column, last_row = cells
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = self._cells.get((column, row))
+                if cell is None:
+                    cell = self._cells[(column, row)] = set()
+                cell.add(item)
+
+    def _remove_from_cells(self, item, cells):
+        """Removes `item` from every cell in the range `cells`.
+
+        Cells that become empty are deleted so that the grid does not grow
+        forever as objects move around.
+        """
+        first_column, first_row, last_column, last_row = cells
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = self._cells.get((column, row))
+                if cell is None:
+                    continue
+                cell.discard(item)
+                if not cell:
+                    del self._cells[(column, row)]
+
+# How far (in pixels) the fat bounds of an AABBTree stick out around an
+# object on every side
+FAT_MARGIN = 8.0
+# How many frames of movement the fat bounds stretch ahead of an object
+VELOCITY_FRAMES = 4.0
+
+# Index of no node in an AABBTree
+_NULL = -1
+
+class AABBTree(object):
+    """Dynamic bounding volume tree of objects that move every frame.
+
+    Every object is a leaf with "fat" bounds, it's rectangle grown by
+    `margin` on every side and stretched ahead by it's velocity. Moving an
+    object only touches the tree once it leaves it's fat bounds, and nodes
+    are rotated as leaves go in and out to keep the tree balanced, so
+    finding what a rectangle overlaps takes O(log n) instead of looking at
+    every object.
+
+    The objects that every object's fat bounds overlap (it's neighbors) are
+    cached, and only looked up again for objects that were reinserted since
+    the last time, so `neighbors` and `pairs` mostly reuse the last frame's
+    results.
+
+    Same interface as UniformGrid, with an extra velocity for `insert` and
+    `move`.
+
+    Members:
+        margin: how far the fat bounds stick out around every object
+    """
+
+    def __init__(self, margin=FAT_MARGIN, velocity_frames=VELOCITY_FRAMES):
+        """Initalizes an empty tree.
+
+        Args:
+            margin: non-negative float/int, see `FAT_MARGIN`
+            velocity_frames: non-negative float/int, see `VELOCITY_FRAMES`
+        """
+        if margin < 0 or velocity_frames < 0:
+            raise ValueError("The margins of an AABBTree can't be negative!")
+
+        self.margin = float(margin)
+        self.velocity_frames = float(velocity_frames)
+
+        # Nodes are indices into these lists (structure of arrays). The
+        # bounds of a leaf are it's fat bounds, and the bounds of any other
+        # node are the bounds around both of it's children.
+        self._min_x = []
+        self._min_y = []
+        self._max_x = []
+        self._max_y = []
+        self._parent = []
+        self._left = []
+        self._right = []
+        # Leaves have a height of 0, and no children
+        self._height = []
+        self._items = []
+        # Nodes that were freed, and can be used again
+        self._free = []
+        self._root = _NULL
+
+        # Maps every item to it's leaf
+        self._leaves = dict()
+        # Maps every item to the set of items whose fat bounds overlap it's
+        # own, only up to date for items that aren't in `_moved`
+        self._neighbors = dict()
+        # Items that were (re)inserted since the neighbors were updated
+        self._moved = set()
+
+    def __len__(self):
+        """Returns the amount of items inside of the tree."""
+        return len(self._leaves)
+
+    def __contains__(self, item):
+        """Checks if `item` has been inserted into the tree."""
+        return item in self._leaves
+
+    @property
+    def height(self):
+        """The amount of levels below the root, 0 for an empty tree."""
+        return self._height[self._root] if self._root != _NULL else 0
+
+    def fat_bounds(self, item):
+        """Gets the fat bounds of `item` as (x, y, width, height)."""
+        leaf = self._leaves[item]
+        return (self._min_x[leaf], self._min_y[leaf],
+                self._max_x[leaf] - self._min_x[leaf],
+                self._max_y[leaf] - self._min_y[leaf])
+
+    def fat_contains(self, item, x, y, width, height):
+        """Checks if a rectangle is inside of the fat bounds of `item`."""
+        leaf = self._leaves[item]
+        return self._min_x[leaf] <= x and self._min_y[leaf] <= y and \
+            x + width <= self._max_x[leaf] and y + height <= self._max_y[leaf]
+
+    def insert(self, item, x, y, width, height, velocity_x=0.0,
+                velocity_y=0.0):
+        """Adds `item` to the tree with the rectangle (x, y, width, height).
+
+        If `item` is already inside of the tree it is moved instead.
+        """
+        if item in self._leaves:
+            self.move(item, x, y, width, height, velocity_x, velocity_y)
+            return
+
+        leaf = self._allocate()
+        self._items[leaf] = item
+        self._set_fat(leaf, x, y, width, height, velocity_x, velocity_y)
+        self._leaves[item] = leaf
+        self._insert_leaf(leaf)
+        self._moved.add(item)
+
+    def remove(self, item):
+        """Removes `item` from the tree, does nothing if it isn't in it."""
+        leaf = self._leaves.pop(item, None)
+        if leaf is None:
+            return
+        self._remove_leaf(leaf)
+        self._release(leaf)
+        self._moved.discard(item)
+        for other in self._neighbors.pop(item, ()):
+            neighbors = self._neighbors.get(other)
+            if neighbors is not None:
+                neighbors.discard(item)
+
+    def move(self, item, x, y, width, height, velocity_x=0.0,
+                velocity_y=0.0):
+        """Updates `item` after it has moved or resized.
+
+        Does nothing while the rectangle, and where it moves to by
+        `velocity`, is inside of the fat bounds of `item` (and they aren't
+        much bigger than they need to be anymore), so calling this every
+        frame for a moving object is cheap.
+
+        Returns:
+            True if `item` was reinserted into the tree.
+        """
+        leaf = self._leaves.get(item)
+        if leaf is None:
+            self.insert(item, x, y, width, height, velocity_x, velocity_y)
+            return True
+
+        min_x = self._min_x[leaf]
+        min_y = self._min_y[leaf]
+        max_x = self._max_x[leaf]
+        max_y = self._max_y[leaf]
+        # The rectangle grown by it's velocity, so that the next step's
+        # movement is inside of the fat bounds too (see `fat_contains`)
+        swept_x = x + min(velocity_x, 0.0)
+        swept_y = y + min(velocity_y, 0.0)
+        swept_max_x = x + width + max(velocity_x, 0.0)
+        swept_max_y = y + height + max(velocity_y, 0.0)
+        if min_x <= swept_x and min_y <= swept_y and \
+            swept_max_x <= max_x and swept_max_y <= max_y:
+            # Still inside, only reinserting if the fat bounds got a lot
+            # bigger than needed (like after stopping from going fast)
+            slack = self.margin * 4 + \
+                (abs(velocity_x) + abs(velocity_y)) * self.velocity_frames
+            if swept_x - min_x <= slack and swept_y - min_y <= slack and \
+                max_x - swept_max_x <= slack and max_y - swept_max_y <= slack:
+                return False
+
+        self._remove_leaf(leaf)
+        self._set_fat(leaf, x, y, width, height, velocity_x, velocity_y)
+        self._insert_leaf(leaf)
+        self._moved.add(item)
+        return True
+
+    def clear(self):
+        """Removes every item from the tree."""
+        for values in (self._min_x, self._min_y, self._max_x, self._max_y,
+                        self._parent, self._left, self._right, self._height,
+                        self._items):
+            del values[:]
+        del self._free[:]
+        self._root = _NULL
+        self._leaves.clear()
+        self._neighbors.clear()
+        self._moved.clear()
+
+    def query(self, x, y, width, height):
+        """Gets the items whose fat bounds overlap (or touch) a rectangle.
+
+        This is conservative, an item being returned does not mean that it
+        overlaps with the rectangle, only that it is close enough that it
+        might.
+
+        Returns:
+            A set of items.
+        """
+        result = set()
+        if self._root == _NULL:
+            return result
+        max_x = x + width
+        max_y = y + height
+
+        nodes_min_x = self._min_x
+        nodes_min_y = self._min_y
+        nodes_max_x = self._max_x
+        nodes_max_y = self._max_y
+        left = self._left
+        right = self._right
+        items = self._items
+
+        stack = [self._root]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            if nodes_min_x[node] > max_x or x > nodes_max_x[node] or \
+                nodes_min_y[node] > max_y or y > nodes_max_y[node]:
+                continue
+            if left[node] == _NULL:
+                result.add(items[node])
+            else:
+                push(left[node])
+                push(right[node])
+        return result
+
+    def query_many(self, rects):
+        """Same as calling `query` for every (x, y, width, height) in
+        `rects`, but in one walk down the tree.
+
+        Every node is only looked at once, with all of the rectangles that
+        overlap it's parent, so rectangles that are close to each other
+        share most of the work.
+
+        Returns:
+            A list with a set of items for every rectangle.
+        """
+        results = [set() for _ in rects]
+        if self._root == _NULL or not rects:
+            return results
+        bounds = [(x, y, x + width, y + height)
+                    for x, y, width, height in rects]
+
+        nodes_min_x = self._min_x
+        nodes_min_y = self._min_y
+        nodes_max_x = self._max_x
+        nodes_max_y = self._max_y
+        left = self._left
+        right = self._right
+        items = self._items
+
+        # Nodes to look at, with the indices of the rectangles that might
+        # overlap them
+        stack = [(self._root, range(len(rects)))]
+        while stack:
+            node, candidates = stack.pop()
+            node_min_x = nodes_min_x[node]
+            node_min_y = nodes_min_y[node]
+            node_max_x = nodes_max_x[node]
+            node_max_y = nodes_max_y[node]
+            overlapping = [index for index in candidates
+                            if bounds[index][0] <= node_max_x and
+                            node_min_x <= bounds[index][2] and
+                            bounds[index][1] <= node_max_y and
+                            node_min_y <= bounds[index][3]]
+            if not overlapping:
+                continue
+            if left[node] == _NULL:
+                item = items[node]
+                for index in overlapping:
+                    results[index].add(item)
+            else:
+                stack.append((left[node], overlapping))
+                stack.append((right[node], overlapping))
+        return results
+
+    def query_swept(self, x, y, width, height, velocity_x, velocity_y):
+        """Gets the items close to a rectangle moving by a velocity, see
+        `UniformGrid.query_swept`.
+
+        Returns:
+            A set of items.
+        """
+        if velocity_x < 0:
+            x += velocity_x
+        if velocity_y < 0:
+            y += velocity_y
+        return self.query(x, y, width + abs(velocity_x),
+                            height + abs(velocity_y))
+
+    def neighbors(self, item):
+        """Gets the items whose fat bounds overlap the fat bounds of `item`.
+
+        Returns:
+            A set of items, not including `item`. It belongs to the tree, so
+            it must not be changed.
+        """
+        if self._moved:
+            self.update_pairs()
+        return self._neighbors[item]
+
+    def pairs(self):
+        """Gets every pair of items whose fat bounds overlap.
+
+        Returns:
+            A list of (item, item) tuples, every pair only once.
+        """
+        if self._moved:
+            self.update_pairs()
+        leaves = self._leaves
+        result = []
+        for item, neighbors in self._neighbors.items():
+            leaf = leaves[item]
+            for other in neighbors:
+                if leaf < leaves[other]:
+                    result.append((item, other))
+        return result
+
+    def update_pairs(self):
+        """Looks up the neighbors of every item that was (re)inserted.
+
+        Whether two fat bounds overlap can only change when one of them was
+        reinserted, so the neighbors of everything else are kept.
+        """
+        neighbors = self._neighbors
+        moved = self._moved
+        # Forgetting the old neighbors of every moved item first
+        for item in moved:
+            for other in neighbors.pop(item, ()):
+                if other not in moved:
+                    neighbors[other].discard(item)
+
+        for item in moved:
+            found = self.query(*self.fat_bounds(item))
+            found.discard(item)
+            own = neighbors.get(item)
+            if own is None:
+                own = neighbors[item] = set()
+            own.update(found)
+            for other in found:
+                others = neighbors.get(other)
+                if others is None:
+                    others = neighbors[other] = set()
+                others.add(item)
+        moved.clear()
+
+    def _set_fat(self, leaf, x, y, width, height, velocity_x, velocity_y):
+        """Sets the bounds of a leaf to the fat bounds of a rectangle."""
+        margin = self.margin
+        min_x = x - margin
+        min_y = y - margin
+        max_x = x + width + margin
+        max_y = y + height + margin
+        # Stretching ahead in the direction that it is moving
+        ahead_x = velocity_x * self.velocity_frames
+        ahead_y = velocity_y * self.velocity_frames
+        if ahead_x < 0:
+            min_x += ahead_x
+        else:
+            max_x += ahead_x
+        if ahead_y < 0:
+            min_y += ahead_y
+        else:
+            max_y += ahead_y
+        self._min_x[leaf] = min_x
+        self._min_y[leaf] = min_y
+        self._max_x[leaf] = max_x
+        self._max_y[leaf] = max_y
+
+    def _allocate(self):
+        """Gets an unused node."""
+        if self._free:
+            node = self._free.pop()
+        else:
+            node = len(self._items)
+            for values in (self._min_x, self._min_y, self._max_x,
+                            self._max_y):
+                values.append(0.0)
+            self._items.append(None)
+            self._parent.append(_NULL)
+            self._left.append(_NULL)
+            self._right.append(_NULL)
+            self._height.append(0)
+        self._parent[node] = _NULL
+        self._left[node] = _NULL
+        self._right[node] = _NULL
+        self._height[node] = 0
+        return node
+
+    def _release(self, node):
+        """Frees a node so it can be used again."""
+        self._items[node] = None
+        self._free.append(node)
+
+    def _fit(self, node):
+        """Updates the bounds and height of a node from it's children."""
+        left = self._left[node]
+        right = self._right[node]
+        values = self._min_x
+        values[node] = values[left] if values[left] < values[right] else \
+            values[right]
+        values = self._min_y
+        values[node] = values[left] if values[left] < values[right] else \
+            values[right]
+        values = self._max_x
+        values[node] = values[left] if values[left] > values[right] else \
+            values[right]
+        values = self._max_y
+        values[node] = values[left] if values[left] > values[right] else \
+            values[right]
+        values = self._height
+        values[node] = 1 + (values[left] if values[left] > values[right]
+                            else values[right])
+
+    def _insert_leaf(self, leaf):
+        """Puts a leaf into the tree, next to the node where it makes the
+        bounds grow the least."""
+        if self._root == _NULL:
+            self._root = leaf
+            self._parent[leaf] = _NULL
+            return
+
+        nodes_min_x = self._min_x
+        nodes_min_y = self._min_y
+        nodes_max_x = self._max_x
+        nodes_max_y = self._max_y
+        left = self._left
+        right = self._right
+        leaf_min_x = nodes_min_x[leaf]
+        leaf_min_y = nodes_min_y[leaf]
+        leaf_max_x = nodes_max_x[leaf]
+        leaf_max_y = nodes_max_y[leaf]
+
+        # Walking down the cheapest way, by the surface area heuristic
+        # (with half perimeters, since it's 2D)
+        node = self._root
+        while left[node] != _NULL:
+            node_min_x = nodes_min_x[node]
+            node_min_y = nodes_min_y[node]
+            node_max_x = nodes_max_x[node]
+            node_max_y = nodes_max_y[node]
+            combined = (node_max_x if node_max_x > leaf_max_x else
+                        leaf_max_x) - \
+                (node_min_x if node_min_x < leaf_min_x else leaf_min_x) + \
+                (node_max_y if node_max_y > leaf_max_y else leaf_max_y) - \
+                (node_min_y if node_min_y < leaf_min_y else leaf_min_y)
+            # Cost of making a new parent for this node and the leaf
+            cost = 2.0 * combined
+            # Cost of going further down, every node above grows as well
+            inherited = 2.0 * (combined - (node_max_x - node_min_x +
+                                            node_max_y - node_min_y))
+
+            child_costs = []
+            for child in (left[node], right[node]):
+                child_min_x = nodes_min_x[child]
+                child_min_y = nodes_min_y[child]
+                child_max_x = nodes_max_x[child]
+                child_max_y = nodes_max_y[child]
+                child_cost = (child_max_x if child_max_x > leaf_max_x else
+                                leaf_max_x) - \
+                    (child_min_x if child_min_x < leaf_min_x else
+                        leaf_min_x) + \
+                    (child_max_y if child_max_y > leaf_max_y else
+                        leaf_max_y) - \
+                    (child_min_y if child_min_y < leaf_min_y else leaf_min_y)
+                if left[child] != _NULL:
+                    # Only how much it grows, it's a new parent further down
+                    child_cost -= child_max_x - child_min_x + \
+                        child_max_y - child_min_y
+                child_costs.append(child_cost + inherited)
+            if cost < child_costs[0] and cost < child_costs[1]:
+                break
+            node = left[node] if child_costs[0] < child_costs[1] else \
+                right[node]
+
+        # Making a new parent for the sibling and the leaf
+        sibling = node
+        old_parent = self._parent[sibling]
+        parent = self._allocate()
+        self._parent[parent] = old_parent
+        left[parent] = sibling
+        right[parent] = leaf
+        self._parent[sibling] = parent
+        self._parent[leaf] = parent
+        if old_parent == _NULL:
+            self._root = parent
+        elif left[old_parent] == sibling:
+            left[old_parent] = parent
+        else:
+            right[old_parent] = parent
+
+        self._refit(parent)
+
+    def _remove_leaf(self, leaf):
+        """Takes a leaf out of the tree, it's sibling takes it's parent's
+        place."""
+        if leaf == self._root:
+            self._root = _NULL
+            return
+
+        parent = self._parent[leaf]
+        grandparent = self._parent[parent]
+        sibling = self._right[parent] if self._left[parent] == leaf else \
+            self._left[parent]
+
+        self._parent[sibling] = grandparent
+        if grandparent == _NULL:
+            self._root = sibling
+        else:
+            if self._left[grandparent] == parent:
+                self._left[grandparent] = sibling
+            else:
+                self._right[grandparent] = sibling
+        self._release(parent)
+        self._parent[leaf] = _NULL
+        if grandparent != _NULL:
+            self._refit(grandparent)
+
+    def _refit(self, node):
+        """Updates the bounds and heights from `node` up to the root,
+        balancing every node on the way.
+
+        Every node is fitted before it is balanced, since `_balance` needs
+        it's height (a parent made by `_insert_leaf` starts at 0, and would
+        never be rotated).
+        """
+        while node != _NULL:
+            self._fit(node)
+            node = self._balance(node)
+            node = self._parent[node]
+
+    def _balance(self, a):
+        """Rotates the taller child of `a` up if it is more than one level
+        taller than the other one, then balances `a` in it's new place.
+
+        Returns:
+            The node that is now where `a` was.
+        """
+        left = self._left
+        right = self._right
+        height = self._height
+        if left[a] == _NULL or height[a] < 2:
+            return a
+
+        b = left[a]
+        c = right[a]
+        balance = height[c] - height[b]
+        if -1 <= balance <= 1:
+            return a
+
+        # Rotating the taller child up, into the place of `a`
+        up, other = (c, b) if balance > 1 else (b, c)
+        first = left[up]
+        second = right[up]
+
+        left[up] = a
+        parent = self._parent[a]
+        self._parent[up] = parent
+        self._parent[a] = up
+        if parent == _NULL:
+            self._root = up
+        elif left[parent] == a:
+            left[parent] = up
+        else:
+            right[parent] = up
+
+        # The taller grandchild stays with `up`, the other one goes to `a`
+        if height[first] > height[second]:
+            keep, give = first, second
+        else:
+            keep, give = second, first
+        right[up] = keep
+        if up == c:
+            right[a] = give
+        else:
+            left[a] = give
+        self._parent[give] = a
+
+        self._fit(a)
+        # `a` can still be out of balance (like a new leaf next to a much
+        # taller sibling), so it is balanced as well
+        self._balance(a)
+        self._fit(up)
+        return up
@@ -0,0 +1,76 @@
+# Extra space around the screen that is still drawn, so that tiles don't
+# pop in at the edges while the camera moves
+CULL_MARGIN = 64.0
+
+class Camera(object):
+    """The part of a level that is on screen.
+
+    Follows a target (the player) and stays inside of the level. Does not
+    use Kivy, the level moves it's canvas by (-x, -y) with one Translate
+    instead of moving any widgets.
+
+    Members:
+        x, y: the bottom left of the view, in level coordinates
+        width, height: the size of the view (the screen)
+        bounds: (width, height) of the level, the view never goes past it.
+                None if the camera can go anywhere.
+        margin: space around the view that is still counted as visible
+    """
+
+    def __init__(self, view_size, bounds=None, margin=CULL_MARGIN):
+        """Initalizes the view at (0, 0).
+
+        Args:
+            view_size: two element tuple/list, the size of the screen
+            bounds: two element tuple/list, the size of the level
+            margin: float, see `visible_rect`
+        """
+        self.x = 0.0
+        self.y = 0.0
+        self.width, self.height = float(view_size[0]), float(view_size[1])
+        self.bounds = bounds
+        self.margin = float(margin)
+
+    def resize(self, width, height):
+        """Changes the size of the view, when the window is resized."""
+        self.width = float(width)
+        self.height = float(height)
+
+    def follow(self, x, y, width=0.0, height=0.0):
+        """Centers the view on a rectangle.
+
+        Args:
+            x, y: the bottom left of the rectangle to follow
+            width, height: the size of it
+
+        Returns:
+            A tuple, the new (x, y) of the view.
+        """
+        view_x = x + width / 2.0 - self.width / 2.0
+        view_y = y + height / 2.0 - self.height / 2.0
+
+        if self.bounds is not None:
+            # Levels smaller than the screen stay at the bottom left
+            view_x = max(min(view_x, self.bounds[0] - self.width), 0.0)
+            view_y = max(min(view_y, self.bounds[1] - self.height), 0.0)
+
+        # Whole pixels, so that there are no seams in between the tiles
+        self.x = float(round(view_x))
+        self.y = float(round(view_y))
+        return self.x, self.y
+
+    def visible_rect(self):
+        """Gets the area that has to be drawn.
+
+        Returns:
+            A tuple (x, y, width, height), the view plus `margin` on every
+            side.
+        """
+        return (self.x - self.margin, self.y - self.margin,
+                self.width + self.margin * 2.0, self.height + self.margin * 2.0)
+
+    def is_visible(self, x, y, width, height):
+        """Checks if a rectangle is (partly) inside of `visible_rect`."""
+        left, bottom, view_width, view_height = self.visible_rect()
+        return (x < left + view_width and x + width > left and
+                y < bottom + view_height and y + height > bottom)
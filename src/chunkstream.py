@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# Chunks this far outside of the view (in chunks) are built ahead of time
+LOAD_MARGIN = 1
+# Chunks farther than this outside of the view are thrown away. Bigger than
+# `LOAD_MARGIN`, so that a chunk isn't thrown away and built again over and
+# over while the player walks back and forth on it's edge
+UNLOAD_MARGIN = 2
+
+# One background thread builds the chunks of every level
+_executor = None
+
+def _shared_executor():
+    """Gets the thread that chunks are built on, starting it the first time."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1)
+    return _executor
+
+class ChunkStreamer(object):
+    """Builds the meshes of the chunks around the view on a background
+    thread, and throws away the ones that are far away.
+
+    Only the chunks within `unload_margin` of the view are kept, so the
+    memory used by meshes stays the same however big the level is. Does not
+    use Kivy, the meshes are turned into Kivy Meshes by TileLayer on the
+    main thread.
+
+    Members:
+        chunks: the ChunkIndex of the level
+        uvs: dict of block name to it's texture coordinates in the atlas
+        load_margin: chunks around the view that are built ahead of time
+        unload_margin: chunks around the view that are kept once built
+        loaded: dict of (column, row) to the meshes of every built chunk,
+                see `tilemesh.build_meshes`
+    """
+
+    def __init__(self, chunks, uvs=None, load_margin=LOAD_MARGIN,
+                    unload_margin=UNLOAD_MARGIN, executor=None):
+        """Initalizes the streamer without building anything.
+
+        Args:
+            chunks: the ChunkIndex of the level
+            uvs: dict of block name to it's (u0, v0, u1, v1) in the atlas
+            load_margin: int, see `LOAD_MARGIN`
+            unload_margin: int, see `UNLOAD_MARGIN`, at least `load_margin`
+            executor: concurrent.futures Executor to build the chunks on, a
+                        shared background thread if it is None
+        """
+        if unload_margin < load_margin:
+            raise ValueError("Chunks can't be unloaded closer to the view \
+than they are loaded!")
+        self.chunks = chunks
+        self.uvs = uvs
+        self.load_margin = int(load_margin)
+        self.unload_margin = int(unload_margin)
+        self._executor = executor
+
+        self.loaded = dict()
+        # Chunks being built, (column, row) to their Future
+        self._pending = dict()
+
+    def _submit(self, chunk):
+        """Starts building a chunk on the background thread."""
+        if self._executor is None:
+            self._executor = _shared_executor()
+        self._pending[chunk] = self._executor.submit(self._build, chunk,
+                                                        self.chunks.version)
+
+    def _build(self, chunk, version):
+        """Builds one chunk, runs on the background thread.
+
+        Returns:
+            A tuple (version, meshes), the version of the tilemap that the
+            meshes were built from.
+        """
+        return version, self.chunks.build(chunk, self.uvs)
+
+    def _expand(self, rect, margin):
+        """Makes a rectangle bigger by `margin` chunks on every side."""
+        x, y, width, height = rect
+        chunk_width, chunk_height = self.chunks.chunk_pixels
+        return (x - margin * chunk_width, y - margin * chunk_height,
+                width + margin * 2 * chunk_width,
+                height + margin * 2 * chunk_height)
+
+    def Update(self, x, y, width, height):
+        """Starts building the chunks around the view, and unloads the ones
+        that are too far from it.
+
+        Args:
+            x, y, width, height: the view, in level coordinates
+        """
+        if self.chunks.refresh():
+            # Some tiles changed, every chunk has to be built again
+            self.reset()
+
+        # Keeping the chunks that finished building
+        version = self.chunks.version
+        for chunk, future in list(self._pending.items()):
+            if future.done():
+                del self._pending[chunk]
+                built_version, meshes = future.result()
+                if built_version == version:
+                    self.loaded[chunk] = meshes
+
+        view = (x, y, width, height)
+        for chunk in self.chunks.chunks_in(*self._expand(view,
+                                                        self.load_margin)):
+            if chunk not in self.loaded and chunk not in self._pending:
+                self._submit(chunk)
+
+        first_column, first_row, last_column, last_row = \
+            self.chunks.chunk_range(*self._expand(view, self.unload_margin))
+        def far(chunk):
+            return not (first_column <= chunk[0] < last_column and
+                        first_row <= chunk[1] < last_row)
+        for chunk in [chunk for chunk in self.loaded if far(chunk)]:
+            del self.loaded[chunk]
+        for chunk in [chunk for chunk in self._pending if far(chunk)]:
+            self._pending.pop(chunk).cancel()
+
+    def get(self, chunk):
+        """Gets the meshes of a chunk that is needed right now.
+
+        Waits for it if it is still being built, and builds it on this
+        thread if it wasn't started (the view moved faster than the chunks
+        were built).
+
+        Args:
+            chunk: (column, row) of the chunk
+
+        Returns:
+            The meshes of the chunk, see `tilemesh.build_meshes`.
+        """
+        meshes = self.loaded.get(chunk)
+        if meshes is not None:
+            return meshes
+
+        future = self._pending.pop(chunk, None)
+        if future is not None and not future.cancel():
+            version, meshes = future.result()
+            if version != self.chunks.version:
+                meshes = None
+        if meshes is None:
+            meshes = self.chunks.build(chunk, self.uvs)
+        self.loaded[chunk] = meshes
+        return meshes
+
+    def reset(self):
+        """Throws away every built chunk, and stops building the rest."""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self.loaded.clear()
+
+    def __len__(self):
+        """Returns the amount of built chunks."""
+        return len(self.loaded)
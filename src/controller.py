@@ -0,0 +1,85 @@
+from mathf import RigidBody2D, Rectanglef, Vector2f
+
+# The width and height of the player
+PLAYER_SIZE = (60, 60)
+# Where the player starts in every level
+START_POSITION = (0, 120) # HACK: Testing player's position at 61
+
+class PlayerController(object):
+    """Movement logic of the player, without anything to draw it.
+
+    Used by the Player widget, and on it's own when running levels
+    without a window (see headless.py).
+    """
+
+    def __init__(self, inital_position=START_POSITION, world=None):
+        """Initalizes the rigidbody.
+
+        Args:
+            inital_position: two element tuple for the player's inital position
+            world: the PhysicsWorld of the level that the player is in
+        """
+        # Initalizing the player's rigidbody with a rectangle (AABB) collider
+        collider = Rectanglef(position=Vector2f(inital_position), size=\
+                                Vector2f(PLAYER_SIZE))
+        self.rb = RigidBody2D(collider, world)
+
+        # The rigidbody's position after the last two physics steps, the
+        # player is drawn in between them
+        self.previous_position = tuple(inital_position)
+        self.current_position = tuple(inital_position)
+
+        # Setting the player movement speed (per second)
+        self.speed = 240
+
+    def Update(self, keys, dt=1.0/60.0):
+        """Handles key presses.
+
+        Moves the player with keys A, D,
+        and spacebar.
+
+        Args:
+            keys: the current keys that are pressed down
+            dt: the length of one physics step
+        """
+        # Checking if A and/or D is pressed
+        # if they are, call move.
+
+        # Setting amount to delta-time * speed
+        amount = self.speed * dt
+
+        if 'a' in keys:
+            # Calling with -amount since A should move the player backwards
+            self.rb.velocity.x = -amount
+        if 'd' in keys:
+            # Calling with positive amount this time since D should move the
+            # player forward.
+            self.rb.velocity.x = amount
+
+    def PhysicsUpdate(self, dt):
+        """Remembers where the physics calculations put the player.
+
+        Runs AFTER Update has changed the player's
+        properties, and the level's physics world
+        has moved the player's rigidbody.
+
+        Args:
+            dt: float, the length of one physics step.
+        """
+        self.previous_position = self.current_position
+        self.current_position = tuple(self.rb.position)
+
+    def interpolate(self, alpha):
+        """Gets the position in between the last two physics steps.
+
+        Args:
+            alpha: 0 to 1, how far the current frame is between the last
+                    physics step and the next one
+
+        Returns:
+            A tuple, the (x, y) position.
+        """
+        previous_x, previous_y = self.previous_position
+        current_x, current_y = self.current_position
+        return (previous_x + (current_x - previous_x) * alpha,
+                previous_y + (current_y - previous_y) * alpha)
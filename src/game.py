@@ -1,4 +1,5 @@
 import sys
+import time
 
 from kivy.uix.screenmanager import ScreenManager
 from kivy.uix.floatlayout import FloatLayout
@@ -6,12 +7,30 @@ from kivy.uix.label import Label
 from kivy.core.window import Window
 from kivy.clock import Clock
 
-from level import Level, load_levels
+from level import Level, build_level, load_levels
+from levelcache import LevelCache, MAX_BUILT_LEVELS
+from timestep import PHYSICS_RATE, MAX_SUBSTEPS
+from inputlatency import input_latency
+from profiler import frame_profiler
+from profileroverlay import ProfilerOverlay
+
+# Key that shows and hides the profiler overlay (and turns profiling on/off)
+PROFILER_KEY = "f3"
+# Key that writes the profiler's percentiles to `PROFILE_PATH` (.json/.csv)
+EXPORT_PROFILE_KEY = "f4"
+PROFILE_PATH = "./profile"
+INPUT_LATENCY_PATH = "./input_latency.csv"
 
 
 class Game(ScreenManager):
-    """Contains Levels and other gameplay screens."""
-    def __init__(self, **kwargs):
+    """Contains Levels and other gameplay screens.
+
+    Levels are only built when `current` is set to them, and the least
+    recently used ones are torn down once more than `max_levels` are built.
+    """
+    def __init__(self, max_levels=MAX_BUILT_LEVELS, remote=None,
+                    input_log=None, physics_rate=PHYSICS_RATE,
+                    max_substeps=MAX_SUBSTEPS, **kwargs):
         """Initalization method of game class.
 
         Binds keyboard methods _keyboard_closed, _keyup, and _keydown,
@@ -19,8 +38,26 @@ class Game(ScreenManager):
         initalizes a list for keys pressed, and sets up the levels.
 
         Args:
+            max_levels: the most Level screens that are kept built
+            remote: a SerialRemote (see remote.py) whose buttons press keys
+                    too, or None to only use the keyboard
+            input_log: a csv file to log the latency of every input event
+                        to (see inputlatency.py), or None
+            physics_rate: the amount of physics steps per second of every
+                            level (see timestep.py)
+            max_substeps: the most physics steps that a level runs in one
+                            frame
             **kwargs: anything needed for base class ScreenManager
         """
+        # Reading what levels there are, without building any of them. Has
+        # to be set before the base class, which can set `current`.
+        self.physics_rate = physics_rate
+        self.levels = LevelCache(load_levels(),
+                                    lambda level: build_level(level,
+                                                                physics_rate,
+                                                                max_substeps),
+                                    self._unload_level, max_levels)
+
         # Calling the base class (ScreenManager) __init__ method with **kwargs
         super(Game, self).__init__(**kwargs)
 
@@ -32,25 +69,94 @@ class Game(ScreenManager):
 
         # Set of currently pressed keys
         self.keys = set()
-
-        # Loading all levels from json file
-        self.levels = load_levels()
-
-        # Looping through all of the levels and adding them
-        for level in self.levels:
-            self.add_widget(level)
-
-        # Setting the current level to the first one
-        self.current = self.levels[0].name
+        # The Arduino remote, it's buttons are added to `keys` every frame
+        # in `input_keys`
+        self.remote = remote
+        self.input_keys = set()
+        if remote is not None:
+            remote.start()
+
+        # Shows where the time of every frame goes, toggled with F3
+        self.profiler_overlay = ProfilerOverlay(frame_profiler, input_latency)
+        # Logging input events from the start, not only with the profiler on
+        if input_log is not None:
+            input_latency.enable(input_log)
+        # When the last Update ended, the time until the next one is spent
+        # by Kivy (drawing and events)
+        self._update_end = None
+
+        # Setting the current level to the first one, which builds it
+        self.current = self.levels.names[0]
 
         # Scheduling the clock to run 'Update' every 1/60th of a second
         Clock.schedule_interval(self.Update, 1.0 / 60.0)
 
+    def on_current(self, instance, value):
+        """Builds the level that is switched to before showing it."""
+        if value in self.levels.descriptors and value not in self.levels:
+            # Keeping the level on screen, it is still needed while the
+            # transition to the new one runs
+            keep = (self.current_screen.name,) if self.current_screen else ()
+            self.add_widget(self.levels.get(value, keep))
+        elif value in self.levels:
+            # Marking it as the most recently used level
+            self.levels.get(value)
+        super(Game, self).on_current(instance, value)
+
+    def _unload_level(self, level):
+        """Tears down a level that was evicted from `levels`."""
+        self.remove_widget(level)
+        level.Unload()
+
     def Update(self, dt):
         """Runs all update methods in children through recrusion."""
+        start = time.perf_counter()
+        if self._update_end is not None:
+            frame_profiler.add_time("kivy", start - self._update_end)
+        frame_profiler.begin_frame()
+
+        # Taking the packets that the remote sent since the last frame
+        if self.remote is not None:
+            frame_profiler.start("remote")
+            self.input_keys = self.keys | self.remote.poll(start)
+            for read_time, key, pressed in self.remote.changes:
+                input_latency.event(key, pressed, "remote", read_time)
+            frame_profiler.stop("remote")
+        else:
+            self.input_keys = self.keys
+
         # Updating current level
         self.current_screen.Update(dt)
 
+        # Kivy draws the frame right after this
+        input_latency.frame()
+        frame_profiler.end_frame()
+        if self.profiler_overlay.parent is not None:
+            self.profiler_overlay.Update(dt)
+        self._update_end = time.perf_counter()
+
+    def toggle_profiler(self):
+        """Turns the profiler on and shows it's overlay, or the other way
+        around."""
+        if frame_profiler.toggle():
+            frame_profiler.reset()
+            input_latency.reset()
+            input_latency.enable()
+            Window.add_widget(self.profiler_overlay)
+        else:
+            Window.remove_widget(self.profiler_overlay)
+            self._update_end = None
+            # Still logging if that was asked for when the game started
+            if input_latency.log_path is None:
+                input_latency.disable()
+
+    def export_profile(self, path=PROFILE_PATH):
+        """Writes the profiler's percentiles to `path`.json and `path`.csv,
+        and the input latencies to `INPUT_LATENCY_PATH`."""
+        frame_profiler.write_json(path + ".json")
+        frame_profiler.write_csv(path + ".csv")
+        input_latency.write_csv(INPUT_LATENCY_PATH)
+
     def _keyboard_closed(self):
         """Closes the keyboard and unbinds it."""
         # Unbinding keyboard
@@ -61,15 +167,26 @@ class Game(ScreenManager):
 
     def _keydown(self, keyboard, keycode, text, modifiers):
         """Adds to the key list whenever a key is pressed down."""
+        frame_profiler.start("keyboard")
+        if keycode[1] == PROFILER_KEY:
+            self.toggle_profiler()
+        elif keycode[1] == EXPORT_PROFILE_KEY:
+            self.export_profile()
+
         # Only append if it is not already in the list
         if not keycode[1] in self.keys:
             self.keys.add(keycode[1]) # Using keycode[1] since keycode
                                       # looks like this (100, 'd')
+            input_latency.event(keycode[1], True)
+        frame_profiler.stop("keyboard")
 
     def _keyup(self, keyboard, keycode, *args):
         """Removes from the key list whenever a key is pulled down."""
+        frame_profiler.start("keyboard")
         # Making sure that the key is in 'keys' so that remove does
         # not through an exception
         if keycode[1] in self.keys:
             self.keys.remove(keycode[1]) # Using keycode[1] since keycode
                                          # looks like this (100, 'd')
+            input_latency.event(keycode[1], False)
+        frame_profiler.stop("keyboard")
@@ -0,0 +1,216 @@
+"""Runs levels without a Kivy window.
+
+Loads the levels into plain data (a TileMap and rigidbodies, no widgets),
+steps the physics as fast as possible with keys from an input script, and
+prints where everything ended up. Made for testing levels and physics on
+computers without a display.
+
+Input scripts have one instruction per line, the amount of physics steps
+followed by the keys that are held down during them, for example:
+
+    # Walk right for two seconds, wait, then walk back
+    120 d
+    30
+    120 a
+
+Usage:
+    python src/headless.py --level "Level 1" --input walk.txt
+"""
+import argparse
+import json
+import sys
+import time
+
+from controller import PlayerController, START_POSITION
+from leveldata import levels_path, read_levels, TILE_SIZE
+from mathf import PhysicsWorld
+import physicstrace
+from profiler import frame_profiler
+from timestep import PHYSICS_RATE
+
+class HeadlessLevel(object):
+    """A level without any widgets, just it's physics world and player."""
+
+    def __init__(self, level_data, physics_rate=PHYSICS_RATE):
+        """Builds the physics world and player of a level.
+
+        Args:
+            level_data: the LevelData of the level
+            physics_rate: the amount of physics steps per second
+        """
+        self.name = level_data.name
+        self.world = PhysicsWorld(level_data.tilemap(TILE_SIZE))
+        self.player = PlayerController(START_POSITION, self.world)
+
+        # The length of one physics step
+        self.dt = 1.0 / physics_rate
+        # The amount of physics steps run so far
+        self.steps = 0
+
+    def PhysicsUpdate(self, keys):
+        """Runs one physics step, the same as Level.PhysicsUpdate().
+
+        Args:
+            keys: the keys that are pressed down during this step
+        """
+        frame_profiler.begin_frame()
+        frame_profiler.start("player_input")
+        self.player.Update(keys, self.dt)
+        frame_profiler.stop("player_input")
+        frame_profiler.start("physics")
+        self.world.Update(self.dt)
+        frame_profiler.stop("physics")
+        frame_profiler.start("player_physics")
+        self.player.PhysicsUpdate(self.dt)
+        frame_profiler.stop("player_physics")
+        frame_profiler.end_frame()
+        self.steps += 1
+
+    def run(self, inputs):
+        """Runs one physics step for every set of keys in `inputs`.
+
+        Args:
+            inputs: iterable of sets of keys, one for every step
+        """
+        for keys in inputs:
+            self.PhysicsUpdate(keys)
+
+    def state(self):
+        """Gets where the level is at right now.
+
+        Returns:
+            A dict that can be converted to json.
+        """
+        return {
+            "level": self.name,
+            "steps": self.steps,
+            "time": self.steps * self.dt,
+            "player": {
+                "position": list(self.player.rb.position),
+                "velocity": list(self.player.rb.velocity),
+            },
+            "rigidbodies": len(self.world),
+            "awake": len(self.world.awake),
+        }
+
+def parse_inputs(lines):
+    """Converts the lines of an input script into one set of keys per step.
+
+    Args:
+        lines: iterable of strings, the lines of the script
+
+    Returns:
+        A generator of frozensets of keys.
+
+    Raises:
+        ValueError: a line doesn't start with the amount of steps, or it is
+                    negative.
+    """
+    for number, line in enumerate(lines, 1):
+        # Ignoring comments and empty lines
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+
+        parts = line.split()
+        try:
+            count = int(parts[0])
+        except ValueError:
+            raise ValueError("Line "+str(number)+" of the input script must \
+start with the amount of steps, not '"+parts[0]+"'!")
+        if count < 0:
+            raise ValueError("Line "+str(number)+" of the input script can't \
+run a negative amount of steps!")
+        keys = frozenset(parts[1:])
+        for _ in range(count):
+            yield keys
+
+def main(argv=None):
+    """Runs a level headless from the command line and prints a report."""
+    parser = argparse.ArgumentParser(description="Runs a level without a \
+window, as fast as possible.")
+    parser.add_argument("--levels", default=None,
+                        help="the file with the levels, 'levels.json' or the \
+level pack if it is up to date when not given")
+    parser.add_argument("--level", default=None,
+                        help="name of the level to run, the first one if not \
+given")
+    parser.add_argument("--input", default=None,
+                        help="input script, '-' for stdin, nothing pressed if \
+not given")
+    parser.add_argument("--steps", type=int, default=None,
+                        help="the amount of steps to run when there is no input \
+script, or the most steps to run with one")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="run the level this many times from the start")
+    parser.add_argument("--rate", type=float, default=PHYSICS_RATE,
+                        help="physics steps per second")
+    parser.add_argument("--trace", default=None,
+                        help="record collisions and write them to this file")
+    parser.add_argument("--trace-capacity", type=int,
+                        default=physicstrace.TRACE_CAPACITY,
+                        help="the most collisions to keep, the newest ones are \
+kept")
+    parser.add_argument("--profile", default=None,
+                        help="time every step and write the percentiles to \
+this file, csv if it ends with '.csv' and json if it doesn't")
+    args = parser.parse_args(argv)
+
+    levels = read_levels(args.levels if args.levels is not None else
+                            levels_path())
+    if args.level is None:
+        level_data = levels[0]
+    else:
+        matches = [level for level in levels if level.name == args.level]
+        if not matches:
+            parser.error("there is no level named '"+args.level+"'")
+        level_data = matches[0]
+
+    # Reading the script once, so that it can be repeated
+    if args.input is None:
+        script = [frozenset()] * (args.steps if args.steps is not None else
+                                    int(args.rate))
+    elif args.input == "-":
+        script = list(parse_inputs(sys.stdin))
+    else:
+        with open(args.input, "r") as file:
+            script = list(parse_inputs(file))
+    if args.steps is not None:
+        script = script[:args.steps]
+
+    if args.trace is not None:
+        physicstrace.enable(args.trace_capacity)
+    if args.profile is not None:
+        frame_profiler.enable()
+
+    start = time.perf_counter()
+    for _ in range(max(args.repeat, 1)):
+        level = HeadlessLevel(level_data, args.rate)
+        level.run(script)
+    elapsed = time.perf_counter() - start
+
+    report = level.state()
+    total_steps = len(script) * max(args.repeat, 1)
+    report["benchmark"] = {
+        "repeat": max(args.repeat, 1),
+        "total_steps": total_steps,
+        "seconds": elapsed,
+        "steps_per_second": total_steps / elapsed if elapsed > 0 else None,
+        "realtime_factor": (total_steps / args.rate) / elapsed if elapsed > 0
+                            else None,
+    }
+    if args.profile is not None:
+        if args.profile.endswith(".csv"):
+            frame_profiler.write_csv(args.profile)
+        else:
+            frame_profiler.write_json(args.profile)
+        report["profile"] = args.profile
+    if args.trace is not None:
+        report["trace"] = {
+            "path": args.trace,
+            "events": physicstrace.dump(args.trace),
+        }
+    print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
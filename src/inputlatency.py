@@ -0,0 +1,222 @@
+"""Measures how long key presses take to move the player.
+
+Every input event (a key going down or up, on the keyboard or the Arduino
+remote) is timestamped where it comes from, and followed through the frame:
+
+    to step     until the first physics step that gave it to the player
+                (Player.Update), which is where it turns into velocity
+    to frame    until the end of the first frame after that step, whose
+                drawing shows where the player moved to
+
+The game has one InputLatency, `input_latency`. Like the FrameProfiler it is
+off by default (then every call returns right away), and turned on with the
+profiler (F3). The percentiles and histograms are shown in the profiler's
+overlay and written with F4, and every event can be logged to a csv file.
+"""
+from collections import OrderedDict
+import csv
+import time
+
+from profiler import RollingStats, FRAME_WINDOW, PERCENTILES
+
+# Environment variable with a csv file to log every input event to
+LOG_VARIABLE = "MARIO9000_INPUT_LOG"
+# Width of every histogram bucket in seconds, and the amount of buckets.
+# The last bucket has everything slower than the ones before it.
+HISTOGRAM_BUCKET = 0.002
+HISTOGRAM_BUCKETS = 25
+
+# Columns of the per event log
+LOG_HEADER = ["source", "key", "pressed", "to_step_ms", "to_frame_ms",
+                "frames"]
+
+class InputLatency(object):
+    """Follows input events from where they come from to the screen.
+
+    Members:
+        enabled: whether anything is being measured
+        events: the amount of events measured
+        to_step: RollingStats of the seconds to the first physics step
+        to_frame: RollingStats of the seconds to the first frame after it
+        frames: RollingStats of the amount of frames it took
+        step_histogram, frame_histogram: the amount of events in every
+                                            bucket of HISTOGRAM_BUCKET seconds
+        log_path: the csv file every event is logged to, or None
+    """
+
+    def __init__(self, window=FRAME_WINDOW):
+        """Initalizes an InputLatency that is off.
+
+        Args:
+            window: the amount of events that the percentiles are taken over
+        """
+        self.enabled = False
+        self.window = int(window)
+        self.events = 0
+        self.to_step = RollingStats(self.window)
+        self.to_frame = RollingStats(self.window)
+        self.frames = RollingStats(self.window)
+        self.step_histogram = [0] * HISTOGRAM_BUCKETS
+        self.frame_histogram = [0] * HISTOGRAM_BUCKETS
+
+        self.log_path = None
+        self._log_file = None
+        self._log = None
+
+        # Events on their way to the screen, as lists of
+        # [time, source, key, pressed, to step, frames]
+        self._pending = []
+
+    def enable(self, log_path=None):
+        """Starts measuring.
+
+        Args:
+            log_path: a csv file to write every event to, or None
+        """
+        self.enabled = True
+        if log_path is not None and log_path != self.log_path:
+            self._close_log()
+            self.log_path = log_path
+            self._log_file = open(log_path, "w", newline="")
+            self._log = csv.writer(self._log_file)
+            self._log.writerow(LOG_HEADER)
+
+    def disable(self):
+        """Stops measuring and closes the log, the measured events are
+        kept."""
+        self.enabled = False
+        del self._pending[:]
+        self._close_log()
+
+    def _close_log(self):
+        """Closes the per event log."""
+        if self._log_file is not None:
+            self._log_file.close()
+        self._log_file = self._log = None
+        self.log_path = None
+
+    def reset(self):
+        """Throws away every measured event."""
+        self.events = 0
+        for stats in (self.to_step, self.to_frame, self.frames):
+            stats.clear()
+        self.step_histogram = [0] * HISTOGRAM_BUCKETS
+        self.frame_histogram = [0] * HISTOGRAM_BUCKETS
+        del self._pending[:]
+
+    def event(self, key, pressed, source="keyboard", timestamp=None):
+        """Starts following an input event.
+
+        Args:
+            key: the name of the key, like "a"
+            pressed: True if the key went down, False if it went up
+            source: where it came from, like "keyboard" or "remote"
+            timestamp: time.perf_counter() of when it happened, now if None
+        """
+        if not self.enabled:
+            return
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self._pending.append([timestamp, source, key, pressed, None, 0])
+
+    def step(self):
+        """Marks that a physics step gave the pressed keys to the player."""
+        if not self.enabled or not self._pending:
+            return
+        now = time.perf_counter()
+        for event in self._pending:
+            if event[4] is None:
+                event[4] = now - event[0]
+                self.to_step.add(event[4])
+                self.step_histogram[_bucket(event[4])] += 1
+
+    def frame(self):
+        """Marks the end of a frame, finishing every event that was given
+        to the player before it."""
+        if not self.enabled or not self._pending:
+            return
+        now = time.perf_counter()
+        pending = []
+        for event in self._pending:
+            event[5] += 1
+            if event[4] is None:
+                # No physics step ran since the event, waiting for the next
+                pending.append(event)
+                continue
+            to_frame = now - event[0]
+            self.events += 1
+            self.to_frame.add(to_frame)
+            self.frames.add(event[5])
+            self.frame_histogram[_bucket(to_frame)] += 1
+            if self._log is not None:
+                self._log.writerow([event[1], event[2], int(event[3]),
+                                    round(event[4] * 1000.0, 3),
+                                    round(to_frame * 1000.0, 3), event[5]])
+        self._pending = pending
+
+    def summary(self):
+        """Gets the percentiles (in milliseconds) and histograms.
+
+        Returns:
+            A dict that can be converted to json.
+        """
+        return OrderedDict((
+            ("events", self.events),
+            ("to_step_ms", self.to_step.summary(1000.0)),
+            ("to_frame_ms", self.to_frame.summary(1000.0)),
+            ("frames", self.frames.summary()),
+            ("bucket_ms", HISTOGRAM_BUCKET * 1000.0),
+            ("step_histogram", list(self.step_histogram)),
+            ("frame_histogram", list(self.frame_histogram)),
+        ))
+
+    def rows(self):
+        """Gets the summary as table rows, see `write_csv`.
+
+        The percentile rows are followed by one row per histogram bucket,
+        with the bucket's upper end in milliseconds ("inf" for the last one)
+        and the amount of events in it for both latencies.
+        """
+        header = ["kind", "name", "count", "mean"] + \
+                    ["p" + str(percent) for percent in PERCENTILES] + ["max"]
+        rows = [header]
+        summary = self.summary()
+        for key in ("to_step_ms", "to_frame_ms", "frames"):
+            rows.append(["latency", key] + list(summary[key].values()))
+        rows.append(["histogram", "upper_ms", "to_step", "to_frame"])
+        for index in range(HISTOGRAM_BUCKETS):
+            upper = "inf" if index == HISTOGRAM_BUCKETS - 1 else \
+                round((index + 1) * HISTOGRAM_BUCKET * 1000.0, 3)
+            rows.append(["histogram", upper, self.step_histogram[index],
+                            self.frame_histogram[index]])
+        return rows
+
+    def write_csv(self, path):
+        """Writes `rows` to a csv file."""
+        with open(path, "w", newline="") as file:
+            csv.writer(file).writerows(self.rows())
+
+    def report(self):
+        """Gets a short text version of the summary for the in-game
+        overlay."""
+        lines = ["input events: " + str(self.events)]
+        if not self.events:
+            return lines[0]
+        for name, stats in (("to step", self.to_step),
+                            ("to frame", self.to_frame)):
+            summary = stats.summary(1000.0)
+            lines.append("{:<18} p50 {:6.2f}  p95 {:6.2f}  p99 {:6.2f} ms"
+                            .format(name, summary["p50"], summary["p95"],
+                                    summary["p99"]))
+        summary = self.frames.summary()
+        lines.append("{:<18} p50 {:6.0f}  p95 {:6.0f}  p99 {:6.0f}"
+                        .format("frames", summary["p50"], summary["p95"],
+                                summary["p99"]))
+        return "\n".join(lines)
+
+def _bucket(seconds):
+    """Gets the histogram bucket of a latency."""
+    return min(int(seconds / HISTOGRAM_BUCKET), HISTOGRAM_BUCKETS - 1)
+
+# The input latency of the game
+input_latency = InputLatency()
@@ -1,188 +1,173 @@
-from typing import List
-import json
-
 from kivy.uix.screenmanager import Screen
 from kivy.uix.floatlayout import FloatLayout
-from kivy.properties import StringProperty
-from kivy.properties import ListProperty
+from kivy.graphics import PushMatrix, PopMatrix, Translate
 
-from mathf import RigidBody2D, Rectanglef, Vector2f
+from camera import Camera
+from controller import START_POSITION
+from inputlatency import input_latency
+from leveldata import levels_path, read_levels, TILE_SIZE
+from mathf import PhysicsWorld
 from player import Player
+from profiler import frame_profiler
+from tilelayer import TileLayer
+from timestep import FixedTimestep, PHYSICS_RATE, MAX_SUBSTEPS
 
 class Level(Screen):
-    """Contains all blocks in current level and player."""
-    # Using a list property so that the player can access them for collision
-    # through self.parent
-    blocks = ListProperty()
+    """Contains all blocks in current level and player.
+
+    Everything in the level is drawn through a Camera that follows the
+    player, only the tiles and entities that it sees are drawn.
+    """
 
-    def __init__(self, blocks, **kwargs):
+    def __init__(self, world, physics_rate=PHYSICS_RATE,
+                    max_substeps=MAX_SUBSTEPS, **kwargs):
         """Adds all blocks to the level.
 
-        Sets up Camera. (not yet!)
+        Sets up Camera.
 
         Args:
-            blocks: set of blocks for the level,
-                    all positioned correctly
+            world: the PhysicsWorld containing the level's TileMap, the
+                    player is added to it as well
+            physics_rate: the amount of physics steps per second
+            max_substeps: the most physics steps that are run in one frame
             **kwargs: anything that needs to be passed into
                       base class Screen
         """
         # Calling the base class (Screen) __init__ method with **kwargs
         super(Level,self).__init__(**kwargs)
 
+        # The physics world only containing this level's rigidbodies
+        self.world = world
+        # Runs the physics at the same rate no matter how long frames take
+        self.timestep = FixedTimestep(physics_rate, max_substeps)
+
+        tilemap = world.tilemap
+        # Follows the player and never shows anything outside of the level
+        self.camera = Camera(self.size, (tilemap.width * tilemap.tile_size[0],
+                                tilemap.height * tilemap.tile_size[1]))
+
         # Setting root widget since a screen can't
         # have multiple widgets
         root_wid = FloatLayout()
 
-        # Looping through all of the blocks...
-        for block in blocks:
-            # Making sure that it is not an air block
-            if block is not None:
-                # ...and adding them to root_wid
-                root_wid.add_widget(block)
-                # Appending all of the blocks to the ListProperty blocks
-                self.blocks.append(block)
+        # Moving everything in the level by the camera with one transform,
+        # instead of moving every widget
+        with root_wid.canvas.before:
+            PushMatrix()
+            self._translate = Translate(0, 0)
+        with root_wid.canvas.after:
+            PopMatrix()
+
+        # Drawing all of the blocks at once
+        self.tile_layer = TileLayer(world.tilemap)
+        root_wid.add_widget(self.tile_layer)
 
         # Creating a player and adding it to root_wid
-        self.player = Player((0,120)) # HACK: Testing player's position at 61
+        self.player = Player(START_POSITION, world=self.world)
         root_wid.add_widget(self.player)
 
+        # Widgets that move around the level, they are only drawn while the
+        # camera can see them
+        self.entities = [self.player]
+
         self.add_widget(root_wid)
+        self.root_wid = root_wid
 
     def Update(self, dt):
-        """Calls Player.Update(). And then Player.PhysicsUpdate()
+        """Runs as many physics steps as fit into `dt`. And then moves the
+        player in between it's last two physics steps, and the camera to
+        the player.
 
         Args:
             dt: delta-time, (1/60)-(amount of time that actually passed)
         """
-        # Calling player.Update with currently pressed keys
-        self.player.Update(self.parent.keys)
-        self.player.PhysicsUpdate(dt)
-
-class Block(FloatLayout):
-    """Contains sprite for block."""
-    file_name = StringProperty("./res/blocks/invalid.png")
-    # The size of every block
-    block_size = [30,30]
+        alpha = self.timestep.advance(dt, self.PhysicsUpdate)
+        frame_profiler.start("render")
+        self.player.Render(alpha)
+        self.Render()
+        frame_profiler.stop("render")
+
+    def Render(self):
+        """Moves the camera to the player, and only draws what it sees."""
+        camera = self.camera
+        camera.resize(*self.size)
+        camera.follow(*(tuple(self.player.pos) + tuple(self.player.size)))
+        self._translate.xy = (-camera.x, -camera.y)
+
+        self.tile_layer.Update(camera)
+
+        # Adding entities that came into view and removing the ones that left
+        for entity in self.entities:
+            visible = camera.is_visible(*(tuple(entity.pos) +
+                                            tuple(entity.size)))
+            if visible and entity.parent is None:
+                self.root_wid.add_widget(entity)
+            elif not visible and entity.parent is not None:
+                self.root_wid.remove_widget(entity)
+
+    def PhysicsUpdate(self, dt):
+        """Calls Player.Update(), steps the physics world. And then
+        Player.PhysicsUpdate()
 
-    def __init__(self, name: str, **kwargs):
-        """Sets up block to use file image passed in with name.
+        Args:
+            dt: the length of one physics step, always the same
+        """
+        # Calling player.Update with currently pressed keys (and buttons of
+        # the remote)
+        frame_profiler.start("player_input")
+        self.player.Update(self.parent.input_keys, dt)
+        input_latency.step()
+        frame_profiler.stop("player_input")
+        # Moving every rigidbody in this level
+        frame_profiler.start("physics")
+        self.world.Update(dt)
+        frame_profiler.stop("physics")
+        frame_profiler.start("player_physics")
+        self.player.PhysicsUpdate(dt)
+        frame_profiler.stop("player_physics")
 
-        IMPORTANT: must pass in size to **kwargs, can't change it later.
+    def Unload(self):
+        """Tears down the level.
 
-        Args:
-            name: string, name of the block representing the end of the filename
-                  (ex. file is 'block_dirt.png' name is 'dirt') also supports
-                  passing in full filename.
-            **kwargs: any arguments that need to be passed into base class
-                      BoxLayout
+        Unregisters all of the level's rigidbodies from it's physics world
+        and removes all of it's widgets.
         """
-        self.hi = "hi"
-        # Calling the base class (FloatLayout) __init__ method with **kwargs
-        # not using super so that it will not interfere with RigidBody2D
-        super().__init__(**kwargs)
-
-        # Creating a collider and RigidBody2D for each block
-        collider = Rectanglef(position = Vector2f(self.pos), size = \
-                                Vector2f(self.size))
-        self.rb = RigidBody2D(collider)
-
-        # Disabling size hint
-        self.size_hint_x = None
-        self.size_hint_y = None
-
-        # Setting size to block size
-        self.size = Block.block_size
-
-        # Check to see how the user passed in name, and format it correctly
-        # depending on that
-        if ".png" in name:
-            self.file_name = "./res/blocks/"+name
-        else:
-            # TODO: Support passing in full filepath
-            self.file_name = "./res/blocks/"+name+".png"
+        self.world.clear()
+        self.tile_layer.Unload()
+        self.root_wid.clear_widgets()
+        self.entities = []
 
 def load_levels():
-    """Loads levels found in file 'levels.json'
+    """Loads levels found in file 'levels.json', or the compiled level pack
+    if it is up to date (see levelpack.py).
 
-    Takes the name and data from the level in the
-    json file and then parses it.
+    Only reads the name and data of every level, the Level screens are
+    built later by build_level() when they are opened (see Game).
 
     Returns:
-        An array of levels in the seqental order of how they are found in the
-        json file
+        A list of LevelData in the seqental order of how they are found in
+        the json file
 
     Raises:
         ioerror: could not find 'levels.json' or error reading it.
     """
     # TODO: load levels through images and implement level editor
+    return read_levels(levels_path())
 
-    # The resullt is a list of levels
-    result = list()
-
-    data = None
-
-    # Opening the 'levels.json' file in read mode
-    # and converting it to a python dict
-    with open("./res/levels.json", "r") as file:
-        data = json.load(file)
-
-    for level in data:
-        # Retreiving the level name
-        level_name = level["name"]
-        # Retreiving temporary level data
-        _level_data = level["data"]
-        # Converting the format of the block array into a flat array, and
-        # positioning each block into the correct location.
-        level_data = load_blocks(_level_data)
-        # Appending to result a new level with
-        # level_name and the correct data
-        result.append(Level(level_data, name=level_name))
-
-    return result
-
-def load_blocks(block_data: List):
-    """Converts [y][x] blocks to [x][y].
-
-    Also converts block names into their
-    respective blocks.
+def build_level(level, physics_rate=PHYSICS_RATE, max_substeps=MAX_SUBSTEPS):
+    """Builds the Level screen of one level.
 
     Args:
-        block_data: array of blocks in above format
+        level: the LevelData of the level
+        physics_rate: the amount of physics steps per second
+        max_substeps: the most physics steps that are run in one frame
 
     Returns:
-        2 dimensional array representing blocks arranged in x,y from [0,0]
+        A new Level named after the level.
     """
-    def position_block(x_pos, y_pos):
-        """Positions a block according to it's x and y positions in the array.
-
-        Returns:
-            A tuple representing the blocks (x,y) position.
-        """
-        # Multiply the x/y positions by the width/height of a block
-        x_pos = x_pos*Block.block_size[0]
-        y_pos = y_pos*Block.block_size[1]
-        return x_pos, y_pos
-    # First, reverse the list since it comes in the incorrect order.
-    # (only the first dimension)
-    block_data = list(reversed(block_data))
-
-    # Initalizing the one dimensional array (set)
-    result = set()
-
-    # Loop through the 2D list:
-    for y in range(len(block_data)):
-        for x in range(len(block_data[0])):
-            # Four steps:
-            #   1. Get text at current position in list
-            #   2. Get correct position, in kivy coordinates.
-            #   3. Create a `Block` with the correct position
-            #   4. Add the block to result.
-            text = block_data[y][x]
-            # If "None", don't put a block there! (skip)
-            if text == "None":
-                continue
-            # Get the block position
-            block_pos = position_block(x, y)
-            block = Block(text, pos=block_pos)
-            result.add(block)
-    return result
+    # Every level gets it's own physics world, so that nothing collides
+    # with the blocks of another level. The blocks are all on a grid, so
+    # collisions with them are done with a TileMap, which is also what
+    # the level draws.
+    world = PhysicsWorld(level.tilemap(TILE_SIZE))
+    return Level(world, physics_rate, max_substeps, name=level.name)
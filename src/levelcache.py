@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+# The most levels that are built at once, by default
+MAX_BUILT_LEVELS = 3
+
+class LevelCache(object):
+    """Builds levels the first time they are needed, and only keeps the
+    most recently used ones.
+
+    The LevelData of every level is known from the start, but building a
+    level (it's TileMap, physics world and widgets) waits until it is
+    opened. When more than `capacity` levels are built, the least recently
+    used one is torn down, so that startup time and memory don't grow with
+    the amount of levels.
+
+    Members:
+        descriptors: ordered dict of level name to LevelData
+        capacity: the most levels that are kept built
+    """
+
+    def __init__(self, level_data, build, unload=None,
+                    capacity=MAX_BUILT_LEVELS):
+        """Initalizes the cache without building anything.
+
+        Args:
+            level_data: list of LevelData, in the order of the levels
+            build: function taking a LevelData and returning the built level
+            unload: function taking a built level that tears it down, called
+                    when it is evicted
+            capacity: positive int, the most levels that are kept built
+        """
+        if capacity < 1:
+            raise ValueError("A LevelCache must be able to keep at least one \
+level!")
+        self.descriptors = OrderedDict((level.name, level)
+                                        for level in level_data)
+        self.capacity = int(capacity)
+        self._build = build
+        self._unload = unload
+        # Built levels by name, least recently used first
+        self._built = OrderedDict()
+
+    @property
+    def names(self):
+        """The names of every level, built or not, in order."""
+        return list(self.descriptors)
+
+    def __len__(self):
+        """Returns the amount of built levels."""
+        return len(self._built)
+
+    def __contains__(self, name):
+        """Checks if the level called `name` is built right now."""
+        return name in self._built
+
+    def get(self, name, keep=()):
+        """Gets a built level, building it if it isn't.
+
+        Makes it the most recently used level, and evicts the least recently
+        used ones over `capacity`.
+
+        Args:
+            name: the name of the level
+            keep: names of built levels that must not be evicted (like the
+                    one on screen right now)
+
+        Returns:
+            The built level.
+
+        Raises:
+            KeyError: there is no level called `name`.
+        """
+        level = self._built.get(name)
+        if level is not None:
+            self._built.move_to_end(name)
+            return level
+
+        level = self._build(self.descriptors[name])
+        self._built[name] = level
+        self.evict(keep=set(keep) | {name})
+        return level
+
+    def evict(self, keep=()):
+        """Tears down the least recently used levels over `capacity`.
+
+        Args:
+            keep: names of built levels that must not be evicted
+
+        Returns:
+            A list of the evicted levels.
+        """
+        evicted = []
+        for name in list(self._built):
+            if len(self._built) <= self.capacity:
+                break
+            if name in keep:
+                continue
+            evicted.append(self._built.pop(name))
+        if self._unload is not None:
+            for level in evicted:
+                self._unload(level)
+        return evicted
+
+    def clear(self):
+        """Tears down every built level."""
+        evicted = list(self._built.values())
+        self._built.clear()
+        if self._unload is not None:
+            for level in evicted:
+                self._unload(level)
@@ -0,0 +1,91 @@
+import json
+import os
+
+from tilemap import TileMap
+
+# The width and height of every block
+TILE_SIZE = (30, 30)
+# Where the levels are stored
+LEVELS_PATH = "./res/levels.json"
+# Where the compiled levels are stored, see levelpack.py
+PACK_PATH = "./res/levels.lvlpack"
+
+class LevelData(object):
+    """The name and blocks of one level, without any widgets.
+
+    Members:
+        name: the name of the level
+        rows: [y][x] list of block names, the first row is the top of the
+                level (same as 'levels.json')
+    """
+
+    def __init__(self, name, rows):
+        """Initalizes the name and rows.
+
+        Args:
+            name: the name of the level
+            rows: [y][x] list of block names, top row first
+        """
+        self.name = name
+        self.rows = rows
+
+    @property
+    def width(self):
+        """The amount of columns in the level."""
+        return len(self.rows[0]) if self.rows else 0
+
+    @property
+    def height(self):
+        """The amount of rows in the level."""
+        return len(self.rows)
+
+    def tilemap(self, tile_size=TILE_SIZE):
+        """Creates a TileMap collider out of the level's blocks."""
+        return TileMap.from_rows(self.rows, tile_size)
+
+def levels_path():
+    """Gets the file that the levels should be read from.
+
+    Returns:
+        `PACK_PATH` if the level pack was compiled from the 'levels.json'
+        that is there now (it stores the file's SHA-1, modified times change
+        with every checkout and copy), `LEVELS_PATH` if it wasn't.
+    """
+    # Imported here since levelpack builds on this module
+    from levelpack import LevelPack, file_digest
+    if not os.path.exists(PACK_PATH):
+        return LEVELS_PATH
+    if not os.path.exists(LEVELS_PATH):
+        return PACK_PATH
+    try:
+        pack = LevelPack(PACK_PATH)
+    except ValueError:
+        return LEVELS_PATH
+    up_to_date = pack.source_digest == file_digest(LEVELS_PATH)
+    pack.close()
+    return PACK_PATH if up_to_date else LEVELS_PATH
+
+def read_levels(path=LEVELS_PATH):
+    """Reads every level in a levels file.
+
+    Args:
+        path: the path of the json file with the levels, or of a compiled
+                level pack
+
+    Returns:
+        A list of LevelData in the order that they are in the file. The
+        levels of a level pack are only decoded when their tilemap is made.
+
+    Raises:
+        ioerror: could not find the file or error reading it.
+    """
+    # Imported here since levelpack builds on this module
+    from levelpack import is_level_pack, read_pack
+    if is_level_pack(path):
+        return read_pack(path)
+
+    # Opening the file in read mode and converting it to a python dict
+    with open(path, "r") as file:
+        data = json.load(file)
+
+    return [LevelData(level["name"], level["data"]) for level in data]
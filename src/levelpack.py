@@ -0,0 +1,356 @@
+"""Compiled level packs, a small binary version of 'levels.json'.
+
+Every level is stored as a palette of block names and it's tiles (one or
+two bytes each, bottom row first like TileMap), run-length encoded row by
+row. A header at the start of the file has the name, size and place of
+every level, so a level can be decoded straight out of a memory-mapped
+file without reading any of the others.
+
+Layout (little-endian):
+
+    header:  magic "MLVL", version (uint16), amount of levels (uint16),
+             then the SHA-1 of the 'levels.json' it was compiled from (20
+             bytes, all zero if it wasn't compiled from a file)
+    index:   for every level, offset (uint32) and length (uint32) of it's
+             record, width and height (uint32), then it's name (uint16
+             length + utf-8)
+    record:  amount of palette names (uint16), every name (uint16 length +
+             utf-8), bytes per tile (uint8), amount of runs (uint32), then
+             the runs, a count (uint16) and a tile (uint8 or uint16) each.
+             Runs never go past the end of a row. Then the amount of
+             collision rectangles (uint32) and every rectangle as column,
+             row, columns and rows (uint32 each), see `tilemap.merge_rects`.
+
+Convert 'levels.json' again whenever it changes (the game checks the SHA-1
+and reads 'levels.json' itself until then):
+
+    python src/levelpack.py
+"""
+from array import array
+import argparse
+import hashlib
+import mmap
+import struct
+
+from leveldata import LevelData, read_levels, LEVELS_PATH, PACK_PATH, \
+    TILE_SIZE
+from tilemap import TileMap
+
+# NumPy is optional, without it the runs are decoded one at a time.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The first bytes of every level pack
+MAGIC = b"MLVL"
+VERSION = 3
+# The longest run, runs of the same tile longer than this are split
+MAX_RUN = 0xffff
+
+_HEADER = struct.Struct("<4sHH")
+_SOURCE = struct.Struct("<20s")
+_INDEX_ENTRY = struct.Struct("<IIIIH")
+_LENGTH = struct.Struct("<H")
+# Runs, the count and the tile for one and two byte tiles
+_RUNS = {1: struct.Struct("<HB"), 2: struct.Struct("<HH")}
+_COUNT = struct.Struct("<I")
+_RECT = struct.Struct("<IIII")
+
+def is_level_pack(path):
+    """Checks if the file at `path` starts like a level pack."""
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+def file_digest(path):
+    """Gets the SHA-1 of the file at `path`, as stored in the header of a
+    level pack.
+
+    Windows line endings are hashed as plain newlines, so that git
+    converting them on checkout doesn't make the pack look out of date.
+    """
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read().replace(b"\r\n", b"\n")).digest()
+
+def encode_runs(tiles, width, height):
+    """Run-length encodes tiles row by row.
+
+    Args:
+        tiles: flat array of palette indices, `width` per row
+        width, height: the amount of columns and rows
+
+    Returns:
+        A list of (count, tile) tuples.
+    """
+    runs = []
+    for row in range(height):
+        start = row * width
+        column = 0
+        while column < width:
+            tile = tiles[start + column]
+            end = column + 1
+            while end < width and tiles[start + end] == tile and \
+                end - column < MAX_RUN:
+                end += 1
+            runs.append((end - column, tile))
+            column = end
+    return runs
+
+def encode_level(tilemap):
+    """Converts a TileMap into a level record, see the module docstring.
+
+    Returns:
+        bytes of the record.
+    """
+    parts = [_LENGTH.pack(len(tilemap.palette))]
+    for name in tilemap.palette:
+        encoded = name.encode("utf-8")
+        parts.append(_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+
+    tile_bytes = 1 if len(tilemap.palette) <= 256 else 2
+    runs = encode_runs(tilemap.tiles, tilemap.width, tilemap.height)
+    parts.append(struct.pack("<BI", tile_bytes, len(runs)))
+    run = _RUNS[tile_bytes]
+    parts.extend(run.pack(count, tile) for count, tile in runs)
+
+    # Merging the tiles into collision rectangles now, so that loading the
+    # level doesn't have to
+    colliders = tilemap.colliders()
+    parts.append(_COUNT.pack(len(colliders)))
+    parts.extend(_RECT.pack(*rect) for rect in colliders)
+    return b"".join(parts)
+
+def write_pack(levels, path=PACK_PATH, source_digest=None):
+    """Compiles levels into a level pack.
+
+    Args:
+        levels: list of LevelData
+        path: the path of the file to write
+        source_digest: the `file_digest` of the file that the levels were
+                        read from, None if they weren't
+    """
+    names = []
+    records = []
+    for level in levels:
+        tilemap = level.tilemap(TILE_SIZE)
+        names.append((level.name.encode("utf-8"), tilemap.width,
+                        tilemap.height))
+        records.append(encode_level(tilemap))
+
+    # The records start right after the header and index
+    offset = _HEADER.size + _SOURCE.size + sum(_INDEX_ENTRY.size + len(name)
+                                                for name, _, _ in names)
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, len(levels)))
+        file.write(_SOURCE.pack(source_digest or bytes(_SOURCE.size)))
+        for (name, width, height), record in zip(names, records):
+            file.write(_INDEX_ENTRY.pack(offset, len(record), width, height,
+                                            len(name)))
+            file.write(name)
+            offset += len(record)
+        for record in records:
+            file.write(record)
+
+class LevelPack(object):
+    """A memory-mapped level pack.
+
+    Only the header is read when it is opened, the levels are decoded one at
+    a time by `decode`.
+
+    Members:
+        levels: list of PackedLevelData, one for every level in the pack
+        source_digest: the SHA-1 of the 'levels.json' that the pack was
+                        compiled from, None if it is unknown
+    """
+
+    def __init__(self, path=PACK_PATH):
+        """Maps the file into memory and reads the index.
+
+        Raises:
+            ValueError: the file is not a level pack, is from another
+                        version or is cut off.
+        """
+        with open(path, "rb") as file:
+            try:
+                self._data = mmap.mmap(file.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped
+                raise ValueError(path+" is not a level pack!")
+
+        data = self._data
+        if len(data) < _HEADER.size:
+            raise ValueError(path+" is not a level pack!")
+        magic, version, count = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(path+" is not a level pack!")
+        if version != VERSION:
+            raise ValueError(path+" is from another version of the game, \
+compile it again!")
+
+        position = _HEADER.size
+        if len(data) < position + _SOURCE.size:
+            raise ValueError(path+" is cut off!")
+        digest, = _SOURCE.unpack_from(data, position)
+        position += _SOURCE.size
+        self.source_digest = digest if digest != bytes(_SOURCE.size) else None
+
+        self.levels = []
+        for _ in range(count):
+            if len(data) < position + _INDEX_ENTRY.size:
+                raise ValueError(path+" is cut off!")
+            offset, length, width, height, name_length = \
+                _INDEX_ENTRY.unpack_from(data, position)
+            position += _INDEX_ENTRY.size
+            if len(data) < position + name_length or \
+                len(data) < offset + length:
+                raise ValueError(path+" is cut off!")
+            name = data[position:position + name_length].decode("utf-8")
+            position += name_length
+            self.levels.append(PackedLevelData(self, name, offset, length,
+                                                width, height))
+
+    def close(self):
+        """Unmaps the file, no more levels can be decoded after this."""
+        self._data.close()
+
+    def decode(self, offset, length, width, height):
+        """Decodes one level record.
+
+        Args:
+            offset, length: where the record is in the file
+            width, height: the size of the level, from the index
+
+        Returns:
+            A tuple (palette, tiles, colliders), tiles being a flat array of
+            palette indices bottom row first and colliders the merged
+            collision rectangles.
+
+        Raises:
+            ValueError: the record is cut off, or it's runs don't add up to
+                        `width` * `height` tiles.
+        """
+        data = self._data
+        end = offset + length
+        position = offset
+
+        count, = _LENGTH.unpack_from(data, position)
+        position += _LENGTH.size
+        palette = []
+        for _ in range(count):
+            name_length, = _LENGTH.unpack_from(data, position)
+            position += _LENGTH.size
+            palette.append(data[position:position + name_length].decode(
+                                "utf-8"))
+            position += name_length
+
+        tile_bytes, run_count = struct.unpack_from("<BI", data, position)
+        position += 5
+        run = _RUNS[tile_bytes]
+        typecode = "B" if tile_bytes == 1 else "H"
+        if position + run_count * run.size > end:
+            raise ValueError("A level in the level pack is cut off!")
+
+        if numpy is not None:
+            runs = numpy.frombuffer(data, dtype=[("count", "<u2"),
+                                        ("tile", "<u" + str(tile_bytes))],
+                                    count=run_count, offset=position)
+            tiles = numpy.repeat(runs["tile"], runs["count"])
+            tiles = array(typecode, tiles.astype(typecode).tobytes())
+            del runs
+        else:
+            tiles = array(typecode)
+            for count, tile in run.iter_unpack(data[position:position +
+                                                    run_count * run.size]):
+                tiles.extend(array(typecode, (tile,)) * count)
+        position += run_count * run.size
+        if len(tiles) != width * height:
+            raise ValueError("A level in the level pack has "+str(len(tiles))+
+                                " tiles instead of "+str(width * height)+"!")
+
+        if position + _COUNT.size > end:
+            raise ValueError("A level in the level pack is cut off!")
+        rect_count, = _COUNT.unpack_from(data, position)
+        position += _COUNT.size
+        if position + rect_count * _RECT.size > end:
+            raise ValueError("A level in the level pack is cut off!")
+        colliders = list(_RECT.iter_unpack(
+                            data[position:position + rect_count * _RECT.size]))
+        return palette, tiles, colliders
+
+class PackedLevelData(LevelData):
+    """A level in a LevelPack, it's tiles are only decoded when needed."""
+
+    def __init__(self, pack, name, offset, length, width, height):
+        """Initalizes the level from it's entry in the index.
+
+        Args:
+            pack: the LevelPack that the level is in
+            name: the name of the level
+            offset, length: where the level's record is in the file
+            width, height: the amount of columns and rows
+        """
+        self.name = name
+        self._pack = pack
+        self._offset = offset
+        self._length = length
+        self._width = width
+        self._height = height
+
+    @property
+    def width(self):
+        """The amount of columns in the level."""
+        return self._width
+
+    @property
+    def height(self):
+        """The amount of rows in the level."""
+        return self._height
+
+    @property
+    def rows(self):
+        """[y][x] list of block names, top row first (same as
+        'levels.json'). Decodes the whole level, use `tilemap` instead."""
+        palette, tiles, _ = self._pack.decode(self._offset, self._length,
+                                                self._width, self._height)
+        width = self._width
+        return [[palette[index] for index in tiles[row * width:
+                                                    (row + 1) * width]]
+                for row in reversed(range(self._height))]
+
+    def tilemap(self, tile_size=TILE_SIZE):
+        """Creates a TileMap collider straight from the compiled tiles."""
+        palette, tiles, colliders = self._pack.decode(self._offset,
+                                                        self._length,
+                                                        self._width,
+                                                        self._height)
+        tilemap = TileMap(self._width, self._height, tile_size, palette,
+                            tiles)
+        tilemap.set_colliders(colliders)
+        return tilemap
+
+def read_pack(path=PACK_PATH):
+    """Opens a level pack.
+
+    Returns:
+        A list of PackedLevelData in the order of the levels in the pack.
+    """
+    return LevelPack(path).levels
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compiles 'levels.json' \
+into a level pack.")
+    parser.add_argument("--input", default=LEVELS_PATH,
+                        help="the json file with the levels")
+    parser.add_argument("--output", default=PACK_PATH,
+                        help="the level pack to write")
+    args = parser.parse_args(argv)
+
+    levels = read_levels(args.input)
+    write_pack(levels, args.output, file_digest(args.input))
+    for level in levels:
+        print(level.name, str(level.width)+"x"+str(level.height))
+
+if __name__ == "__main__":
+    main()
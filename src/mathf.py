@@ -1,56 +1,55 @@
 import math
+import weakref
+
+from bodystore import BodyStore, FLAG_SLEEPING
+from broadphase import AABBTree, UniformGrid
+from narrowphase import RECT, CIRCLE, OVERLAP_TESTS, SWEPT_TESTS, \
+    swept_aabb, swept_rect_circle, overlap_circle_rect, circle_normal, \
+    collide_swept_batch, entry_normal, overlap_normal, trace_shapes
+import physicstrace
+from profiler import frame_profiler
 
 # Downward acceleration due to gravity
 # 9.8 meters per second per second or (m/s)^2
 GRAVITY = -9.8
 
-class Vector2f(object):
-    """Vector2f: stores two floats, x and y, for easier creation of velocities and positions."""
+# When the broadphase finds at least this many shapes close to a moving
+# rigidbody, they are all tested at once with `collide_swept_batch`
+BATCH_THRESHOLD = 16
 
-    @property
-    def x(self):
-        """The x value of the Vector."""
-        return self._x
-    @x.setter
-    def x(self, value):
-        """The x value of the Vector.
+# Kinds of rigidbodies, see `RigidBody2D.body_type`
+STATIC = "static" # Never moves, other rigidbodies collide with it
+KINEMATIC = "kinematic" # Moves by it's velocity, without colliding
+DYNAMIC = "dynamic" # Moves by it's velocity, and stops at what it hits
+BODY_TYPES = (STATIC, KINEMATIC, DYNAMIC)
 
-        Args:
-            value: a float, representing the x value of the vector."""
-        self._x = float(value)
+# A rigidbody that hasn't moved for this many physics steps falls asleep,
+# and isn't stepped anymore until it is woken up
+SLEEP_FRAMES = 30
 
-    @property
-    def y(self):
-        """The y value of the Vector."""
-        return self._y
-    @y.setter
-    def y(self, value):
-        """The y value of the Vector.
+class BaseVector2f(object):
+    """The methods and operators shared by every 2D vector.
 
-        Args:
-            value: a float, representing the y value of the vector."""
-        self._y = float(value)
+    Has no storage of it's own (empty `__slots__`), Vector2f keeps x and y
+    in two slots of it's own and ArrayVector2f reads them from two arrays.
+    A class derived from it only has to have x and y.
+    """
+    __slots__ = ()
 
-    def __init__(self, convert_from=None, *, x=0, y=0):
-        """"Initalizes x and y positions.
+    def set(self, x, y):
+        """Sets both x and y, without creating a new vector.
 
-        Args:
-            convert_from: a tuple, list, or array of length two representing a \
-                            vector2.
-            x: a float representing the x-coordinate of the vector.
-            y: a float representing the y-coordinate of the vector.
+        Returns:
+            The vector itself.
         """
-        self.x = x
-        self.y = y
-
-        # If `convert_from` is None then do nothing with it
-        if convert_from is None:
-            return
-        # Setting the x and y to their positions in the list/tuple/array
-        self.x = convert_from[0]
-        self.y = convert_from[1]
+        self.x = float(x)
+        self.y = float(y)
+        return self
 
     ########## OPERATORS ##########
+    # Every operator checks for float and int first with `type() is`, since
+    # that is much faster than `isinstance`, and falls back to any
+    # BaseVector2f. Anything else is NotImplemented.
     def __add__(self, other):
         """(+) Adds a vector and vector, or vector and scalar.
 
@@ -60,60 +59,62 @@ class Vector2f(object):
         Args:
             other: float or Vector2f representing what you want added
         """
-        # Result, since __add__ should not change this directly
-        result = Vector2f()
-
         # If it is a float then add it to both
         if type(other) is float or type(other) is int:
-            result.x = (other+self.x)
-            result.y += (other+self.y)
-        elif isinstance(other, Vector2f):
-            result.x = (other.x+self.x)
-            result.y += (other.y+self.y)
-
-        return result
+            return Vector2f(x=self.x+other, y=self.y+other)
+        if isinstance(other, BaseVector2f):
+            return Vector2f(x=self.x+other.x, y=self.y+other.y)
+        return NotImplemented
     def __iadd__(self, other):
         """(+=) Adds a vector and vector, or vector and scalar.
 
         Will add components of vectors, or a scalar to both components of
-        the vector. Then assigns this to the result and returns it.
+        the vector. Changes this vector and returns it.
 
         Args:
             other: float or Vector2f representing what you want added
         """
-        self = self+other
+        if type(other) is float or type(other) is int:
+            self.x += other
+            self.y += other
+        elif isinstance(other, BaseVector2f):
+            self.x += other.x
+            self.y += other.y
+        else:
+            return NotImplemented
         return self
     def __sub__(self, other):
         """(-) Subtracts a vector and vector, or vector and scalar.
 
-        Will subtact components of vectors, or a scalar to both components of
-        the vector.
+        Will subtact components of vectors, or a scalar from both components
+        of the vector.
 
         Args:
             other: float or Vector2f representing what you want subtracted
         """
-        # Result, since __add__ should not change this directly
-        result = Vector2f()
-
         # If it is a float then subtract it from both
         if type(other) is float or type(other) is int:
-            result.x = (other-self.x)
-            result.y += (other-self.y)
-        elif isinstance(other, Vector2f):
-            result.x = (other.x-self.x)
-            result.y += (other.y-self.y)
-
-        return result
+            return Vector2f(x=self.x-other, y=self.y-other)
+        if isinstance(other, BaseVector2f):
+            return Vector2f(x=self.x-other.x, y=self.y-other.y)
+        return NotImplemented
     def __isub__(self, other):
         """(-=) Subtracts a vector and vector, or vector and scalar.
 
-        Will subtract components of vectors, or a scalar to both components of
-        the vector. Then assigns this to the result and returns it.
+        Will subtract components of vectors, or a scalar from both components
+        of the vector. Changes this vector and returns it.
 
         Args:
             other: float or Vector2f representing what you want subtracted
         """
-        self = self-other
+        if type(other) is float or type(other) is int:
+            self.x -= other
+            self.y -= other
+        elif isinstance(other, BaseVector2f):
+            self.x -= other.x
+            self.y -= other.y
+        else:
+            return NotImplemented
         return self
     def __mul__(self, other):
         """(*) Multiplies a vector and vector, or vector and scalar.
@@ -124,60 +125,64 @@ class Vector2f(object):
         Args:
             other: float or Vector2f representing what you want multiplied
         """
-        # Result, since __add__ should not change this directly
-        result = Vector2f()
-
         # If it is a float then multiply it to both
         if type(other) is float or type(other) is int:
-            result.x = (other*self.x)
-            result.y += (other*self.y)
-        elif isinstance(other, Vector2f):
-            result.x = (other.x*self.x)
-            result.y += (other.y*self.y)
-
-        return result
+            return Vector2f(x=self.x*other, y=self.y*other)
+        if isinstance(other, BaseVector2f):
+            return Vector2f(x=self.x*other.x, y=self.y*other.y)
+        return NotImplemented
+    # Multiplying is the same in both orders (2*vector)
+    __rmul__ = __mul__
     def __imul__(self, other):
         """(*=) Multipies a vector and vector, or vector and scalar.
 
         Will multiply components of vectors, or a scalar to both components of
-        the vector. Then assigns this to the result and returns it.
+        the vector. Changes this vector and returns it.
 
         Args:
             other: float or Vector2f representing what you want multiplied
         """
-        self = self*other
+        if type(other) is float or type(other) is int:
+            self.x *= other
+            self.y *= other
+        elif isinstance(other, BaseVector2f):
+            self.x *= other.x
+            self.y *= other.y
+        else:
+            return NotImplemented
         return self
-    def __div__(self, other):
+    def __truediv__(self, other):
         """(/) Divides a vector and vector, or vector and scalar.
 
-        Will divide components of vectors, or a scalar to both components of
-        the vector.
+        Will divide components of vectors, or both components of the vector
+        by a scalar.
 
         Args:
-            other: float or Vector2f representing what you want divided
+            other: float or Vector2f representing what you want divided by
         """
-        # Result, since __add__ should not change this directly
-        result = Vector2f()
-
         # If it is a float then divide both
         if type(other) is float or type(other) is int:
-            result.x = (other/self.x)
-            result.y += (other/self.y)
-        elif isinstance(other, Vector2f):
-            result.x = (other.x/self.x)
-            result.y += (other.y/self.y)
-
-        return result
-    def __idiv__(self, other):
+            return Vector2f(x=self.x/other, y=self.y/other)
+        if isinstance(other, BaseVector2f):
+            return Vector2f(x=self.x/other.x, y=self.y/other.y)
+        return NotImplemented
+    def __itruediv__(self, other):
         """(/=) Divides a vector and vector, or vector and scalar.
 
-        Will divide components of vectors, or a scalar to both components of
-        the vector. Then assigns this to the result and returns it.
+        Will divide components of vectors, or both components of the vector
+        by a scalar. Changes this vector and returns it.
 
         Args:
-            other: float or Vector2f representing what you want divided
+            other: float or Vector2f representing what you want divided by
         """
-        self = self/other
+        if type(other) is float or type(other) is int:
+            self.x /= other
+            self.y /= other
+        elif isinstance(other, BaseVector2f):
+            self.x /= other.x
+            self.y /= other.y
+        else:
+            return NotImplemented
         return self
 
     def __iter__(self):
@@ -185,10 +190,14 @@ class Vector2f(object):
         # First element is x, second element is y
         yield self.x
         yield self.y
-    def __len__(self):
+    def __repr__(self):
+        """Shows the vector like `Vector2f(x=1.0, y=2.0)`."""
+        return "Vector2f(x="+repr(self.x)+", y="+repr(self.y)+")"
+    def length(self):
         """Gets the length of the vector.
 
-        Uses the pythagoream theorm `a^2+b^2=c^2`
+        Uses the pythagoream theorm `a^2+b^2=c^2`. It isn't `__len__`, since
+        `len()` only allows ints.
 
         Returns:
             A float, representing the length of the Vector.
@@ -196,23 +205,150 @@ class Vector2f(object):
         # Solve `a^2+b^2=c^2` to c = sqrt(a^2+b^2)
         return math.sqrt((self.x * self.x) + (self.y * self.y))
 
+class Vector2f(BaseVector2f):
+    """Vector2f: stores two floats, x and y, for easier creation of velocities and positions.
+
+    Uses `__slots__` so that a vector is one small object without a
+    `__dict__`, and the in-place operators (+=, -=, *=, /=) change the vector
+    itself instead of creating a new one.
+    """
+    __slots__ = ("x", "y")
+
+    def __init__(self, convert_from=None, *, x=0, y=0):
+        """"Initalizes x and y positions.
+
+        Args:
+            convert_from: a tuple, list, or array of length two representing a \
+                            vector2.
+            x: a float representing the x-coordinate of the vector.
+            y: a float representing the y-coordinate of the vector.
+        """
+        # If `convert_from` is None then use x and y
+        if convert_from is None:
+            self.x = float(x)
+            self.y = float(y)
+            return
+        # Setting the x and y to their positions in the list/tuple/array
+        self.x = float(convert_from[0])
+        self.y = float(convert_from[1])
+
+class ArrayVector2f(BaseVector2f):
+    """A vector whose x and y are stored in two arrays at an index.
+
+    Used as a view into a BodyStore, so that changing the vector changes
+    the arrays (and the other way around) without copying anything. It is
+    not derived from Vector2f, so it doesn't carry Vector2f's two slots
+    around unused.
+    """
+    __slots__ = ("_xs", "_ys", "_index")
+
+    def __init__(self, xs, ys, index):
+        """Initalizes the view.
+
+        Args:
+            xs: the array (or list) with the x values
+            ys: the array (or list) with the y values
+            index: the index of this vector in `xs` and `ys`
+        """
+        self._xs = xs
+        self._ys = ys
+        self._index = index
+
+    @property
+    def x(self):
+        """The x value of the Vector."""
+        return self._xs[self._index]
+    @x.setter
+    def x(self, value):
+        self._xs[self._index] = value
+
+    @property
+    def y(self):
+        """The y value of the Vector."""
+        return self._ys[self._index]
+    @y.setter
+    def y(self, value):
+        self._ys[self._index] = value
+
+class VelocityVector2f(ArrayVector2f):
+    """The velocity of a rigidbody in a BodyStore.
+
+    Changing it wakes the rigidbody up (see `RigidBody2D`), so that scripts
+    can set `velocity.x` or `velocity.y` without calling `wake()`.
+    """
+    __slots__ = ("_flags", "_ref")
+
+    def __init__(self, xs, ys, index, flags, ref):
+        """Initalizes the view.
+
+        Args:
+            xs, ys, index: same as ArrayVector2f
+            flags: the flags of every body, `BodyStore.flags`
+            ref: a weak reference to the rigidbody, so that the view doesn't
+                    keep it alive
+        """
+        ArrayVector2f.__init__(self, xs, ys, index)
+        self._flags = flags
+        self._ref = ref
+
+    def _wake(self):
+        """Wakes the rigidbody up if it is asleep."""
+        if self._flags[self._index] & FLAG_SLEEPING:
+            rigidbody = self._ref()
+            if rigidbody is not None:
+                rigidbody.wake()
+
+    @property
+    def x(self):
+        """The x value of the Vector."""
+        return self._xs[self._index]
+    @x.setter
+    def x(self, value):
+        if self._xs[self._index] != value:
+            self._xs[self._index] = value
+            self._wake()
+
+    @property
+    def y(self):
+        """The y value of the Vector."""
+        return self._ys[self._index]
+    @y.setter
+    def y(self, value):
+        if self._ys[self._index] != value:
+            self._ys[self._index] = value
+            self._wake()
+
 class Shapef(object):
     """Base class for all shapes.
 
     Members:
         position: (x,y) Vector2f representing the shapes position
+        kind: RECT or CIRCLE, which narrowphase tests the shape uses
     """
+    # No `__dict__`, every shape of a rigidbody is one small object holding
+    # two vectors
+    __slots__ = ("_position", "_size")
+    kind = RECT
+
     @property
     def position(self):
         """The Vector2f position (x,y) of the shape."""
         return self._position
     @position.setter
     def position(self, value):
-        """Sets the shape's position."""
-        self._position = value
+        """Sets the shape's position.
+
+        If the position is a view into a BodyStore, the values are copied
+        into it instead, so that the shape stays connected to the store.
+        """
+        if isinstance(getattr(self, "_position", None), ArrayVector2f):
+            self._position.set(*value)
+        else:
+            self._position = value
 
 class Rectanglef(Shapef):
     """Used to represent a 2D rectangle."""
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         """Initalizes rectangle position and size.
@@ -288,27 +424,60 @@ class Rectanglef(Shapef):
             value: a Vector2f representing the size (width/height) of the
                     rectangle.
         """
-        self._size = value
+        # Same as `Shapef.position`
+        if isinstance(getattr(self, "_size", None), ArrayVector2f):
+            self._size.set(*value)
+        else:
+            self._size = value
 
 class Circlef(Shapef):
     """Used to represent a 2D circle.
 
+    Like a Rectanglef (and Kivy widgets), `position` is the bottom-left
+    corner, of the square around the circle. `size` is that square, so a
+    circle can go into a BodyStore and the broadphase like any other shape.
+
     Contains:
         radius: the radius of the circle
+        center: the center of the circle
     """
+    __slots__ = ()
+    kind = CIRCLE
 
-    def __init__(self, radius=1.0):
-        """Initalizes radius.
+    def __init__(self, radius=1.0, position=None):
+        """Initalizes radius and position.
 
         Args:
             radius: positive float/int representing the radius of the circle
+            position: a Vector2f, the bottom-left corner of the square
+                        around the circle
         """
+        self.position = position if position is not None else Vector2f()
+        self._size = Vector2f()
         self.radius = radius
 
+    @property
+    def size(self):
+        """The size (diameter, diameter) of the square around the circle."""
+        return self._size
+    @size.setter
+    def size(self, value):
+        """Sets the diameter to the width of `value`, a circle's square has
+        the same width and height."""
+        width, _ = value
+        self.diameter = width
+
+    @property
+    def center(self):
+        """A new Vector2f with the center (x,y) of the circle."""
+        radius = self.radius
+        return Vector2f(x=self.position.x + radius,
+                        y=self.position.y + radius)
+
     @property
     def radius(self):
         """The radius (half the diameter) of the circle."""
-        return self._radius
+        return self._size.x * 0.5
     @radius.setter
     def radius(self, value):
         """Sets the radius variable, max is 500.
@@ -318,11 +487,14 @@ class Circlef(Shapef):
         """
         # If 'value' is negative, use its absolute value instead (abs)
         if value < 0:
-            value = math.abs(value)
+            value = abs(value)
         # Max 'value' out at 500
         if value > 500:
             value = 500
-        self._radius = float(value)
+        # Setting x and y one at a time, so that a size that is a view into
+        # a BodyStore stays one
+        self._size.x = float(value) * 2.0
+        self._size.y = float(value) * 2.0
     @property
     def diameter(self):
         """The diameter (twice the radius) of the circle."""
@@ -336,16 +508,16 @@ class Circlef(Shapef):
         """
         # If 'value' is negative, use its absolute value instead (abs)
         if value < 0:
-            value = math.abs(value)
-        # Max 'value' out at 500
-        if value > 500:
+            value = abs(value)
+        # Max 'value' out at 1000
+        if value > 1000:
             value = 1000
-        self._radius = (float(value)/2.0)
+        self.radius = (float(value)/2.0)
 
     @property
     def area(self):
         """Returns area of the circle calculated with PI*r^2."""
-        return float(math.pi * math.pow(self.radius))
+        return float(math.pi * math.pow(self.radius, 2))
     @property
     def circumference(self):
         """The circumference (area around/perimeter) of the circle.
@@ -354,7 +526,20 @@ class Circlef(Shapef):
         return float(2*math.pi*self.radius)
 
 class RigidBody2D():
-    """Better movement and collision."""
+    """Better movement and collision.
+
+    Once registered to a PhysicsWorld, the position, size and velocity of a
+    rigidbody are stored in the world's BodyStore, and the rigidbody is only
+    a thin view into it at index `_index`.
+
+    Dynamic rigidbodies fall asleep after not moving for `SLEEP_FRAMES`
+    physics steps. Changing `velocity` (or `velocity.x` and `velocity.y`)
+    wakes a rigidbody up, and so does a dynamic rigidbody moving into it.
+    Static and kinematic rigidbodies never sleep, static ones are never
+    stepped and kinematic ones are moved by scripts (like platforms).
+    """
+    __slots__ = ("_velocity", "_collider", "_world", "_index", "_body_type",
+                    "__weakref__")
 
     @property
     def position(self):
@@ -365,40 +550,627 @@ class RigidBody2D():
         """Returns this rigidbody's collider's size."""
         return self._collider.size
 
+    @property
+    def kind(self):
+        """Returns this rigidbody's collider's kind, RECT or CIRCLE."""
+        return self._collider.kind
+
     @property
     def velocity(self):
         return self._velocity
     @velocity.setter
     def velocity(self, value):
-        self._velocity = value
+        # Same as `Shapef.position`, the view wakes the rigidbody up
+        if isinstance(self._velocity, ArrayVector2f):
+            self._velocity.set(*value)
+        else:
+            self._velocity = value
 
-    # A set of all registered rigidbodies
-    rigidbodies = set()
+    @property
+    def world(self):
+        """The PhysicsWorld this rigidbody is registered to, or None."""
+        return self._world
 
-    def __init__(self, collide_shape):
-        """Registers to rigidbodies set. And sets up colliders.
+    @property
+    def body_type(self):
+        """STATIC, KINEMATIC or DYNAMIC."""
+        return self._body_type
+    @body_type.setter
+    def body_type(self, value):
+        if value not in BODY_TYPES:
+            raise ValueError("Unknown body type '"+str(value)+"'!")
+        self._body_type = value
+        if self._world is not None:
+            self._world.classify(self)
+
+    @property
+    def sleeping(self):
+        """Whether this rigidbody is asleep, only dynamic ones can be."""
+        if self._world is None:
+            return False
+        return bool(self._world.store.flags[self._index] & FLAG_SLEEPING)
+
+    def wake(self):
+        """Wakes this rigidbody up, so that it is stepped again."""
+        if self._world is not None:
+            self._world.wake(self)
+
+    def __init__(self, collide_shape, world=None, body_type=DYNAMIC):
+        """Sets up colliders. And registers to `world`.
 
         Args:
             collide_shape: an instance of Shapef or derived. Represents the
                             collision area of the object.
+            world: the PhysicsWorld that this rigidbody should collide with
+                    the other rigidbodies of, if it is None this rigidbody
+                    will not collide with anything.
+            body_type: STATIC, KINEMATIC or DYNAMIC, see `body_type`
         """
+        if body_type not in BODY_TYPES:
+            raise ValueError("Unknown body type '"+str(body_type)+"'!")
 
         self._velocity = Vector2f()
         self._collider = collide_shape
+        self._world = None
+        self._index = None
+        self._body_type = body_type
 
-        # Adds self to set 'rigidbodies'
-        RigidBody2D.rigidbodies.add(self)
+        # Adds self to the world's rigidbodies and broadphase
+        if world is not None:
+            world.add(self)
 
     def Update(self, dt: float):
-        # Multiplying the velocity by how long it takes to collide
-        self.velocity *= collide_swept(self._collider, self.velocity, RigidBody2D.rigidbodies)
+        # Static rigidbodies never move
+        if self._body_type == STATIC:
+            return
+        # Multiplying the velocity by how long it takes to collide with
+        # anything in the same world
+        if self._world is not None and self._body_type == DYNAMIC:
+            self.velocity *= self._world.sweep(self)
         self._collider.position += self.velocity
 
+        # Moving self into the cells of it's new position
+        if self._world is not None:
+            self._world.moved(self)
+
+class Hit(object):
+    """Something that a query of a PhysicsWorld found.
+
+    Members:
+        body: the RigidBody2D that was hit, or None for the level's tiles
+        time: 0 to 1, the fraction of the ray or sweep before the hit, always
+                0 for overlaps
+        normal: (x, y) normal of the side that was hit, pointing out of it
+                towards the query. For overlaps, the way out of it that is
+                the shortest.
+        rect: the (x, y, width, height) that was hit, for tiles the merged
+                collision rectangle and for circles the square around them
+    """
+    __slots__ = ("body", "time", "normal", "rect")
+
+    def __init__(self, body, time, normal, rect):
+        self.body = body
+        self.time = time
+        self.normal = normal
+        self.rect = rect
+
+    def __repr__(self):
+        return "Hit(" + repr(self.body) + ", " + str(self.time) + ", " + \
+            str(self.normal) + ", " + str(self.rect) + ")"
+
+class PhysicsWorld(object):
+    """Contains and steps all of the rigidbodies of one level.
+
+    Rigidbodies are only kept through weak references, so a rigidbody is
+    unregistered as soon as nothing else (like the widget owning it) uses it.
+
+    Only awake kinematic and dynamic rigidbodies are stepped, static and
+    sleeping ones cost nothing per step until something wakes them up.
+    """
+
+    def __init__(self, tilemap=None, cell_size=120.0):
+        """Initalizes the broadphase.
+
+        Args:
+            tilemap: a TileMap with the level's blocks, or None. Collisions
+                        with it are done directly on the tiles, without any
+                        rigidbodies.
+            cell_size: the cell size of the UniformGrid broadphase of the
+                        static rigidbodies
+        """
+        self.tilemap = tilemap
+        if tilemap is not None:
+            # Merging the tiles into collision rectangles now, instead of in
+            # the middle of the first physics step
+            tilemap.colliders()
+        # Broadphases containing all registered rigidbodies, so that only
+        # the rigidbodies close to a moving one have to be tested for
+        # collisions. Static rigidbodies never move, so they are in a grid,
+        # and kinematic and dynamic ones are in a tree that is cheap to move
+        # things around in. They contain weak references to the rigidbodies,
+        # not the rigidbodies themselves.
+        self.grid = UniformGrid(cell_size)
+        self.tree = AABBTree()
+        # Positions, sizes and velocities of all registered rigidbodies
+        self.store = BodyStore()
+        # Maps every registered rigidbody to it's weak reference
+        self._refs = weakref.WeakKeyDictionary()
+        # Maps every weak reference to the index of it's rigidbody in `store`
+        self._indices = dict()
+        # Weak references of the rigidbodies that are stepped
+        self._awake = set()
+
+    def __len__(self):
+        """Returns the amount of registered rigidbodies."""
+        return len(self._refs)
+
+    def __contains__(self, rigidbody):
+        """Checks if `rigidbody` is registered to this world."""
+        return rigidbody in self._refs
+
+    @property
+    def rigidbodies(self):
+        """A list of all registered rigidbodies."""
+        return list(self._refs.keys())
+
+    @property
+    def awake(self):
+        """A list of the rigidbodies that are stepped, the kinematic and
+        dynamic ones that aren't asleep."""
+        result = []
+        for ref in self._awake:
+            rigidbody = ref()
+            if rigidbody is not None:
+                result.append(rigidbody)
+        return result
+
+    def add(self, rigidbody):
+        """Registers `rigidbody` to this world.
+
+        A rigidbody can only be in one world, so it is removed from it's
+        previous world first.
+        """
+        if rigidbody.world is self:
+            return
+        if rigidbody.world is not None:
+            rigidbody.world.remove(rigidbody)
+
+        ref = weakref.ref(rigidbody, self._forget)
+        self._refs[rigidbody] = ref
+        rigidbody._world = self
+
+        # Moving the rigidbody's data into the store, and replacing it with
+        # views into the store
+        collider = rigidbody._collider
+        position = collider.position
+        size = collider.size
+        velocity = rigidbody.velocity
+        index = self.store.allocate(position.x, position.y, size.x, size.y,
+                                    velocity.x, velocity.y)
+        self._indices[ref] = index
+        rigidbody._index = index
+        if rigidbody.body_type != STATIC:
+            self._awake.add(ref)
+        collider._position = ArrayVector2f(self.store.x, self.store.y, index)
+        collider._size = ArrayVector2f(self.store.width, self.store.height,
+                                        index)
+        rigidbody._velocity = VelocityVector2f(self.store.velocity_x,
+                                                self.store.velocity_y, index,
+                                                self.store.flags, ref)
+
+        self._broadphase(rigidbody).insert(ref, position.x, position.y,
+                                            size.x, size.y)
+
+    def remove(self, rigidbody):
+        """Unregisters `rigidbody` from this world."""
+        ref = self._refs.pop(rigidbody, None)
+        if ref is None:
+            return
+        self.grid.remove(ref)
+        self.tree.remove(ref)
+        self._awake.discard(ref)
+        self._detach(rigidbody)
+        self.store.release(self._indices.pop(ref))
+
+    def clear(self):
+        """Unregisters every rigidbody, used when a level is torn down."""
+        for rigidbody in self.rigidbodies:
+            self._detach(rigidbody)
+        self._refs.clear()
+        self._indices.clear()
+        self._awake.clear()
+        self.grid.clear()
+        self.tree.clear()
+        self.store.clear()
+
+    def wake(self, rigidbody):
+        """Wakes up a sleeping kinematic or dynamic rigidbody."""
+        ref = self._refs.get(rigidbody)
+        if ref is None or rigidbody.body_type == STATIC:
+            return
+        index = rigidbody._index
+        self.store.flags[index] &= ~FLAG_SLEEPING
+        self.store.rest_frames[index] = 0
+        self._awake.add(ref)
+
+    def sleep(self, rigidbody):
+        """Puts a dynamic rigidbody to sleep, it isn't stepped until it is
+        woken."""
+        ref = self._refs.get(rigidbody)
+        if ref is None or rigidbody.body_type != DYNAMIC:
+            return
+        self.store.flags[rigidbody._index] |= FLAG_SLEEPING
+        self._awake.discard(ref)
+
+    def classify(self, rigidbody):
+        """Updates what is stepped after the body type of `rigidbody`
+        changed."""
+        ref = self._refs.get(rigidbody)
+        if ref is None:
+            return
+        # Moving it into the broadphase for it's new body type
+        position = rigidbody.position
+        size = rigidbody.size
+        self.grid.remove(ref)
+        self.tree.remove(ref)
+        self._broadphase(rigidbody).insert(ref, position.x, position.y,
+                                            size.x, size.y)
+        if rigidbody.body_type == STATIC:
+            self.store.flags[rigidbody._index] &= ~FLAG_SLEEPING
+            self.store.velocity_x[rigidbody._index] = 0.0
+            self.store.velocity_y[rigidbody._index] = 0.0
+            self._awake.discard(ref)
+        else:
+            self.wake(rigidbody)
+
+    def _wake_hit(self, rigidbody, nearby):
+        """Wakes up the sleeping dynamic rigidbodies in `nearby` that
+        `rigidbody` hits this step."""
+        flags = self.store.flags
+        collider = rigidbody._collider
+        velocity = rigidbody.velocity
+        for other in nearby:
+            if not flags[other._index] & FLAG_SLEEPING or \
+                other.body_type != DYNAMIC:
+                continue
+            if SWEPT_TESTS[collider.kind, other.kind](collider, velocity.x,
+                                                        velocity.y, other) < 1:
+                self.wake(other)
+
+    def nearby(self, rigidbody):
+        """Gets the rigidbodies that `rigidbody` could hit this frame.
+
+        Returns:
+            A list of the rigidbodies close to the movement of `rigidbody`
+            by it's velocity.
+        """
+        position = rigidbody.position
+        size = rigidbody.size
+        velocity = rigidbody.velocity
+
+        refs = self.grid.query_swept(position.x, position.y, size.x, size.y,
+                                        velocity.x, velocity.y)
+        if self.tree:
+            x = position.x + min(velocity.x, 0.0)
+            y = position.y + min(velocity.y, 0.0)
+            width = size.x + abs(velocity.x)
+            height = size.y + abs(velocity.y)
+            ref = self._refs.get(rigidbody)
+            if ref in self.tree and \
+                self.tree.fat_contains(ref, x, y, width, height):
+                # Everything that could be hit overlaps it's fat bounds, and
+                # those are kept from the last step
+                refs.update(self.tree.neighbors(ref))
+            else:
+                refs.update(self.tree.query(x, y, width, height))
+        result = []
+        for ref in refs:
+            other = ref()
+            # Skipping rigidbodies that are being garbage collected, and
+            # `rigidbody` itself
+            if other is not None and other is not rigidbody:
+                result.append(other)
+        return result
+
+    def sweep(self, rigidbody):
+        """Gets how much of it's velocity `rigidbody` can move this frame.
+
+        Returns:
+            A float between 0 and 1, the earliest time `rigidbody` collides
+            with the tilemap or any of the other rigidbodies.
+        """
+        nearby = self.nearby(rigidbody)
+        if nearby:
+            self._wake_hit(rigidbody, nearby)
+        if frame_profiler.enabled:
+            # Every body found by the broadphase is tested by the narrowphase
+            frame_profiler.count("broadphase_candidates", len(nearby))
+            frame_profiler.count("narrowphase_tests", len(nearby))
+            if self.tilemap is not None:
+                frame_profiler.count("tilemap_sweeps")
+        if len(nearby) >= BATCH_THRESHOLD:
+            time, _ = collide_swept_batch(rigidbody._collider,
+                                            rigidbody.velocity, nearby)
+        else:
+            time = collide_swept(rigidbody._collider, rigidbody.velocity,
+                                    nearby)
+        if self.tilemap is not None:
+            time = min(time, self.tilemap.sweep(rigidbody._collider,
+                                                rigidbody.velocity))
+        return time
+
+    def raycast(self, x, y, direction_x, direction_y, ignore=None):
+        """Finds the first thing that the line from (x, y) to
+        (x + direction_x, y + direction_y) hits.
+
+        Things that the line starts inside of are not hit.
+
+        Args:
+            ignore: a rigidbody that can't be hit (like the one casting)
+
+        Returns:
+            A Hit, or None if nothing is hit.
+        """
+        return self.query_batch([(x, y, 0.0, 0.0, direction_x, direction_y,
+                                    ignore)])[0]
+
+    def cast_rect(self, x, y, width, height, velocity_x, velocity_y,
+                    ignore=None):
+        """Finds the first thing that a rectangle moving by a velocity
+        hits, the same way that rigidbodies collide.
+
+        Args:
+            ignore: a rigidbody that can't be hit (like the one casting)
+
+        Returns:
+            A Hit, or None if nothing is hit.
+        """
+        return self.query_batch([(x, y, width, height, velocity_x,
+                                    velocity_y, ignore)])[0]
+
+    def overlap_rect(self, x, y, width, height, ignore=None):
+        """Finds everything that overlaps a rectangle, only touching
+        doesn't count.
+
+        Args:
+            ignore: a rigidbody that isn't returned
+
+        Returns:
+            A list of Hits, rigidbodies first and then tiles.
+        """
+        return self.query_batch([(x, y, width, height, 0.0, 0.0, ignore)])[0]
+
+    def query_batch(self, queries):
+        """Runs many queries at once, with one walk over the broadphase.
+
+        Every query is a rectangle moving by a velocity, as a tuple (x, y,
+        width, height, velocity_x, velocity_y), with an optional rigidbody
+        to ignore at the end. A rectangle of size 0 is a raycast (see
+        `raycast`), and a velocity of 0 is an overlap (see `overlap_rect`).
+
+        Returns:
+            A list with the result of every query, a Hit or None for
+            raycasts and sweeps, a list of Hits for overlaps.
+        """
+        if frame_profiler.enabled:
+            frame_profiler.count("queries", len(queries))
+        # Bounds around the whole movement of every query
+        bounds = []
+        for query in queries:
+            x, y, width, height, velocity_x, velocity_y = query[:6]
+            bounds.append((x + min(velocity_x, 0.0), y + min(velocity_y, 0.0),
+                            width + abs(velocity_x), height + abs(velocity_y)))
+        moving = self.tree.query_many(bounds) if self.tree else None
+
+        results = []
+        for index, query in enumerate(queries):
+            x, y, width, height, velocity_x, velocity_y = query[:6]
+            ignore = query[6] if len(query) > 6 else None
+            refs = self.grid.query(*bounds[index])
+            if moving is not None:
+                refs.update(moving[index])
+            bodies = []
+            for ref in refs:
+                body = ref()
+                if body is not None and body is not ignore:
+                    bodies.append(body)
+            # Going over them in the order they were added, so that the
+            # results don't depend on the order of the sets
+            bodies.sort(key=lambda body: body._index)
+
+            if velocity_x == 0 and velocity_y == 0:
+                results.append(self._overlap(x, y, width, height, bodies))
+            else:
+                results.append(self._cast(x, y, width, height, velocity_x,
+                                            velocity_y, bodies))
+        return results
+
+    def _cast(self, x, y, width, height, velocity_x, velocity_y, bodies):
+        """Finds the first of `bodies` (or tiles) that a moving rectangle
+        hits, see `cast_rect`."""
+        minimum_time = 1
+        hit_body = None
+        hit_rect = None
+        for body in bodies:
+            position = body.position
+            size = body.size
+            if body.kind == CIRCLE:
+                radius = size.x * 0.5
+                time = swept_rect_circle(x, y, width, height, velocity_x,
+                                            velocity_y, position.x + radius,
+                                            position.y + radius, radius)
+            else:
+                time = swept_aabb(x, y, width, height, velocity_x,
+                                    velocity_y, position.x, position.y,
+                                    size.x, size.y)
+            if time < minimum_time:
+                minimum_time = time
+                hit_body = body
+                hit_rect = (position.x, position.y, size.x, size.y)
+        if self.tilemap is not None:
+            time, collider = self.tilemap.sweep_collider(x, y, width, height,
+                                                            velocity_x,
+                                                            velocity_y)
+            if time < minimum_time:
+                minimum_time = time
+                hit_body = None
+                hit_rect = self.tilemap.collider_rect(collider)
+        if hit_rect is None:
+            return None
+        normal = None
+        if hit_body is not None and hit_body.kind == CIRCLE:
+            # Towards where the rectangle touches the circle
+            radius = hit_rect[2] * 0.5
+            normal = circle_normal(hit_rect[0] + radius, hit_rect[1] + radius,
+                                    x + velocity_x * minimum_time,
+                                    y + velocity_y * minimum_time, width,
+                                    height)
+        if normal is None:
+            normal = entry_normal(x, y, width, height, velocity_x, velocity_y,
+                                    *hit_rect)
+        return Hit(hit_body, minimum_time, normal, hit_rect)
+
+    def _overlap(self, x, y, width, height, bodies):
+        """Finds the `bodies` (and tiles) that overlap a rectangle, see
+        `overlap_rect`."""
+        hits = []
+        for body in bodies:
+            position = body.position
+            size = body.size
+            rect = (position.x, position.y, size.x, size.y)
+            if body.kind == CIRCLE:
+                radius = size.x * 0.5
+                if overlap_circle_rect(position.x + radius,
+                                        position.y + radius, radius, x, y,
+                                        width, height):
+                    normal = circle_normal(position.x + radius,
+                                            position.y + radius, x, y, width,
+                                            height)
+                    if normal is None:
+                        # The center is inside of the rectangle
+                        normal = overlap_normal(x, y, width, height, *rect)
+                    hits.append(Hit(body, 0.0, normal, rect))
+            elif x < position.x + size.x and position.x < x + width and \
+                y < position.y + size.y and position.y < y + height:
+                hits.append(Hit(body, 0.0,
+                                overlap_normal(x, y, width, height, *rect),
+                                rect))
+        if self.tilemap is not None:
+            for collider in self.tilemap.overlap(x, y, width, height):
+                rect = self.tilemap.collider_rect(collider)
+                hits.append(Hit(None, 0.0,
+                                overlap_normal(x, y, width, height, *rect),
+                                rect))
+        return hits
+
+    def moved(self, rigidbody):
+        """Updates the broadphase after `rigidbody` has moved."""
+        ref = self._refs.get(rigidbody)
+        if ref is None:
+            return
+        position = rigidbody.position
+        size = rigidbody.size
+        if rigidbody.body_type == STATIC:
+            self.grid.move(ref, position.x, position.y, size.x, size.y)
+        else:
+            velocity = rigidbody.velocity
+            self.tree.move(ref, position.x, position.y, size.x, size.y,
+                            velocity.x, velocity.y)
+
+    def _broadphase(self, rigidbody):
+        """Gets the broadphase that `rigidbody` goes into."""
+        return self.grid if rigidbody.body_type == STATIC else self.tree
+
+    def Update(self, dt: float):
+        """Steps every awake rigidbody.
+
+        Every moving dynamic rigidbody is swept and moved one at a time, so
+        that the ones after it are swept against where it ended up (sweeping
+        two rigidbodies that move towards each other against where the other
+        one started lets both of them move into each other). The moving
+        kinematic ones go through everything, so they are moved at once with
+        `BodyStore.integrate` afterwards. Rigidbodies that are not moving are
+        skipped, since stepping them would not change anything, and dynamic
+        ones fall asleep after `SLEEP_FRAMES` steps of that.
+
+        Args:
+            dt: float delta-time, the amount of time that passed between the
+                last frame and this one.
+        """
+        store = self.store
+        velocity_x = store.velocity_x
+        velocity_y = store.velocity_y
+        rest_frames = store.rest_frames
+
+        stepped = 0
+        # The moving kinematic rigidbodies, and their indices
+        kinematic = []
+        indices = []
+        resting = []
+        # In the order of their indices, so that the same world always steps
+        # the same way (the order changes where the rigidbodies end up)
+        indices_of = self._indices
+        for ref in sorted(self._awake, key=indices_of.__getitem__):
+            rigidbody = ref()
+            if rigidbody is None:
+                continue
+            index = rigidbody._index
+            if velocity_x[index] == 0 and velocity_y[index] == 0:
+                if rigidbody._body_type == DYNAMIC:
+                    resting.append(rigidbody)
+                continue
+            rest_frames[index] = 0
+            stepped += 1
+            if rigidbody._body_type == DYNAMIC:
+                store.integrate((index,), (self.sweep(rigidbody),))
+                self.moved(rigidbody)
+            else:
+                kinematic.append(rigidbody)
+                indices.append(index)
+
+        # Putting the rigidbodies that stayed still for long enough to sleep
+        for rigidbody in resting:
+            rest_frames[rigidbody._index] += 1
+            if rest_frames[rigidbody._index] >= SLEEP_FRAMES:
+                self.sleep(rigidbody)
+
+        if frame_profiler.enabled:
+            frame_profiler.count("bodies_awake", len(self._awake))
+        if not stepped:
+            return
+        if frame_profiler.enabled:
+            frame_profiler.count("bodies_stepped", stepped)
+        # Kinematic rigidbodies go through everything
+        store.integrate(indices, [1.0] * len(indices))
+
+        # Moving the rigidbodies into the cells of their new positions
+        for rigidbody in kinematic:
+            self.moved(rigidbody)
+
+    def _detach(self, rigidbody):
+        """Copies the data of `rigidbody` out of the store into it's own
+        Vector2fs, so it keeps working after leaving the world."""
+        collider = rigidbody._collider
+        collider._position = Vector2f(tuple(collider.position))
+        collider._size = Vector2f(tuple(collider.size))
+        rigidbody._velocity = Vector2f(tuple(rigidbody.velocity))
+        rigidbody._world = None
+        rigidbody._index = None
+
+    def _forget(self, ref):
+        """Removes the weak reference of a garbage collected rigidbody."""
+        self.grid.remove(ref)
+        self.tree.remove(ref)
+        self._awake.discard(ref)
+        index = self._indices.pop(ref, None)
+        if index is not None:
+            self.store.release(index)
+
 def collide_shapes(collider_shape, *shapes):
     """Checks if the first shape collides with any others.
 
     IMPORTANT: does not do collisions between shapes other
-    than the first one specified.
+    than the first one specified. Shapes that only touch don't collide.
 
     Args:
         collider_shape: a shape that will be tested against the list `shapes`
@@ -413,85 +1185,22 @@ def collide_shapes(collider_shape, *shapes):
     assert (len(shapes) > 0), "You must pass in at least than one shape for \
                                 `*shapes`"
 
-    # Function checking collisions between circles
-    def circle_to_circle(circle1, circle2):
-        """Checks for collisions between two circles."""
-        # Distance between the two circles on the x and y axes, squared
-        x_distance = ((circle1.position.x-circle2.position.x)**2)
-        y_distance = ((circle1.position.y-circle2.position.y)**2)
-        # Sum of the radii of the two circles
-        radii_distance = ((circle1.radius+circle2.radius)**2)
-        # If the distance between the two centers is less than sum of radii
-        # then COLLIDED!
-        return (x_distance+y_distance) <= radii_distance
-    # Function checking collisions between rectangles
-    def rect_to_rect(rect1, rect2):
-        """Checks for collisions between two rectangles."""
-        # The x-coordinate of the left side of each rectangle
-        left1 = (rect1.position.x + rect1.size.x) # Add x and width
-        left2 = (rect2.position.x + rect2.size.x)
-        # The y-coordinate of the top of each rectangle
-        top1 = (rect1.position.y + rect1.size.y) # Add y and height
-        top2 = (rect2.position.y + rect2.size.y)
-        ########## COLLISIONS ##########
-        if rect1.position.y > top2:
-            return False # Rect1 above
-        if top1 < rect2.position.y:
-            return False # Rect1 below
-        if rect1.position.x > left2:
-            return False # Rect1 to the left of Rect2
-        if left1 < rect2.position.x:
-            return False # Rect1 to the right of Rect2
-        ########## /COLLISIONS/ ##########
-        # No collision!
-        return True
-    # Function checking collisions between rectangles and circles
-    def rect_to_circle(rect, circle):
-        """Check for collisions between a rectangle and a circle."""
-        # Closest point within/outside of the rectangle to the
-        # center of the circle.
-        closestX = 0.0
-        closestY = 0.0
-
-        if circle.position.x < rect.position.x:
-            # If the circle is to the left of the rectangle
-            # then the closestX is the rectangle's left side
-            closestX = rect.position.x
-        elif circle.position.x > (rect.position.x + rect.size.x):
-            # If the circle is to the right of the rectangle
-            # then the closestX is the rectangle's right side
-            closestX = (rect.position.x + rect.size.width)
-        else:
-            # The center of the circle is between the left and right sides
-            # of the rectangle, so the closest x is it's own
-            closestX = circle.position.x
-
-        # Exact same logic with y values
-        if circle.position.y < rect.position.y:
-            closestY = rect.position.y
-        elif circle.position.y > (rect.position.y + rect.size.y):
-            closestY = (rect.position.y + rect.size.width)
-        else:
-            closestY = circle.position.y
-
-        # Check how far the center of the circle is to the closest x and y
-        closeX = math.abs(circle.position.x-closestX) # Don't want it negative
-        closeY = math.abs(circle.position.y-closestY)
-        # Length of the closest x/y vector is how far it is
-        distance = len(Vector2f(closeX, closeY))
-        # If the distance is less than the circles radius then it is collided
-        return (distance < circle.radius)
-
-
+    # The test for every pair of kinds (circle to circle, rectangle to
+    # rectangle and rectangle to circle) is in `narrowphase.OVERLAP_TESTS`
+    kind = collider_shape.kind
+    collided = set()
     # Looping through `*shapes` and checking for collisions with `collide_shape`
     for shape in shapes:
-        pass
+        if OVERLAP_TESTS[kind, shape.kind](collider_shape, shape):
+            collided.add(shape)
+    return collided or None
 
 def collide_swept(collider_shape, collider_velocity, shapes):
     """Calculates sweeping collisions for the given object(s) and velocity.
 
     Takes in the current velocity of the collide shape and checks if it will
-    'go through' any of the shapes this current frame.
+    'go through' any of the shapes this current frame. Works for any mix of
+    rectangles and circles, see `narrowphase.SWEPT_TESTS`.
 
     Args:
         collider_shape: an instance of a class derived from `Shapef`\
@@ -505,94 +1214,16 @@ def collide_swept(collider_shape, collider_velocity, shapes):
         the current velocity that the `collider_shape` should move this frame
         so that it will not collide with any `*shapes`.
     """
-    # TODO: Implement swept circle colliders, currently only have AABB
-
-    def get_time(shape):
-        """Gets the entry and exit time for `collider_shape` colliding with\
-        shape.
-
-        Returns:
-            A tuple of length two, with the entry time as element one, and the
-            exit time as element two.
-        """
-        # Getting the distance between `collider_shape` and shape
-        entry_distance = Vector2f()
-        exit_distance = Vector2f()
-        ### X ###
-        if collider_velocity.x > 0:
-            # If `collider_shape` is traveling forward on the x-axis
-            entry_distance.x = shape.position.x - (collider_shape.position.x + \
-                                                    collider_shape.size.x)
-            exit_distance.x = (shape.position.x + shape.size.x) - \
-                                collider_shape.position.x
-        else:
-            # If `collider_shape` is traveling backwards on the x-axis,
-            # do the opposite.
-            entry_distance.x = (shape.position.x + shape.size.x) - \
-                                collider_shape.position.x
-            exit_distance.x = shape.position.x - (collider_shape.position.x + \
-                                                    collider_shape.size.x)
-        ### /X/ ###
-        ### Y ###
-        # Same as x
-        if collider_velocity.y > 0:
-            # If `collider_shape` is traveling forward on the y-ayis
-            entry_distance.y = shape.position.y - (collider_shape.position.y + \
-                                                    collider_shape.size.y)
-            exit_distance.y = (shape.position.y + shape.size.y) - \
-                                collider_shape.position.y
-        else:
-            # If `collider_shape` is traveling backwards on the y-ayis,
-            # do the opposite.
-            entry_distance.y = (shape.position.y + shape.size.y) - \
-                                collider_shape.position.y
-            exit_distance.y = shape.position.y - (collider_shape.position.y + \
-                                                    collider_shape.size.y)
-        ### /Y/ ###
-        # The actual entry and exit times, the x and y a floating point number 0
-        # to 1 relative to how much of the velocity can be traveled.
-
-        # Initalize as negative and positive infinity
-        entry = Vector2f(x=float("-inf"), y=float("-inf"))
-        exit = Vector2f(x=float("inf"), y=float("inf"))
-
-        # No dividing by zero!
-        if collider_velocity.x != 0:
-            # Divide distance by speed to get decimal representing how much
-            # of velocity should be travled.
-            entry.x = entry_distance.x / collider_velocity.x
-            exit.x = exit_distance.x / collider_velocity.x
-        if collider_velocity.y != 0:
-            # Divide distance by speed to get decimal representing how much
-            # of velocity should be travled.
-            entry.y = entry_distance.y / collider_velocity.y
-            exit.y = exit_distance.y / collider_velocity.y
-
-        # Time (0 to 1) will always be greatest x or y value
-        entryTime = max(entry.x, entry.y)
-        exitTime = min(exit.x, exit.y)
-
-        # No Collision!
-        # Conditions for collision to happen:
-        #   1. Entry must come before exit
-        #   2. Entry-time and exit-time must be between 1 and 0
-        if (entryTime > exitTime) or (entry.x < 0 and entry.y < 0) or \
-            (entry.x > 1) or (entry.y > 1):
-            # `return 1`: full velocity can be made without colliding into
-            # anything.
-            return 1
-        else:
-            print("Distance: "+str([tuple(entry_distance),tuple(exit_distance)]))
-            print("Entries/Exits: "+str([tuple(entry),tuple(exit)]))
-            print("Times: "+str([entryTime, exitTime]))
-            print("Velocity: "+str(tuple(collider_velocity)))
-            print("Shapes:\n\tCollider:\n\t\tPosition: "+str(tuple(collider_shape.position))+
-                    "\n\t\tSize: "+str(tuple(collider_shape.size))+"\n\tBlock: "+
-                    "\n\t\tPosition: "+str(tuple(shape.position))+"\n\t\tSize: "+
-                    str(tuple(shape.size)))
-            # `return entryTime`: number between one and 0 times velocity is how
-            # far `shape` can travel this frame
-            return entryTime
+    velocity_x = collider_velocity.x
+    velocity_y = collider_velocity.y
+    kind = collider_shape.kind
+    if kind == RECT:
+        # Rectangles are the most common, so their fields are read only once
+        # and rectangle to rectangle goes straight to `swept_aabb`
+        x = collider_shape.position.x
+        y = collider_shape.position.y
+        width = collider_shape.size.x
+        height = collider_shape.size.y
 
     # Want the earliest point that `collider_shape` collides with any one
     # of `*shapes`. One means that the shape `collider_shape` should travel
@@ -602,11 +1233,22 @@ def collide_swept(collider_shape, collider_velocity, shapes):
 
     # Loop through the list of shapes
     for shape in shapes:
-        collideTime = get_time(shape)
+        shape_kind = shape.kind
+        if kind == RECT and shape_kind == RECT:
+            position = shape.position
+            size = shape.size
+            collideTime = swept_aabb(x, y, width, height, velocity_x,
+                                        velocity_y, position.x, position.y,
+                                        size.x, size.y)
+        else:
+            collideTime = SWEPT_TESTS[kind, shape_kind](collider_shape,
+                                                        velocity_x,
+                                                        velocity_y, shape)
+        # Recording the hit, only if tracing is on (see physicstrace.py)
+        if collideTime < 1 and physicstrace.enabled:
+            trace_shapes("collide_swept", collideTime, collider_shape,
+                            velocity_x, velocity_y, shape)
         # Only set `minimum_collision_time` if this is the smallest time so far
-        if collideTime == 0.0:
-            print(collideTime)
-            print(tuple(shape.position))
         if collideTime < minimum_collision_time:
             minimum_collision_time = collideTime
 
@@ -0,0 +1,683 @@
+import math
+
+# NumPy is optional, without it the batch functions fall back to looping
+# over the shapes one by one.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import physicstrace
+
+# Kinds of shapes, every shape has one as `kind`. The narrowphase test used
+# for two shapes is looked up by the pair of their kinds.
+RECT = "rect" # Axis aligned rectangle, from `position` to `position + size`
+CIRCLE = "circle" # Circle inside of the square from `position` to
+                    # `position + size`
+
+def swept_aabb(x, y, width, height, velocity_x, velocity_y,
+                other_x, other_y, other_width, other_height):
+    """Gets the entry time of a moving rectangle into a still rectangle.
+
+    Works on plain floats, so that it can be used for colliders that are not
+    shapes (like the tiles of a TileMap).
+
+    Args:
+        x, y, width, height: the moving rectangle
+        velocity_x, velocity_y: how far the moving rectangle moves this frame
+        other_x, other_y, other_width, other_height: the still rectangle
+
+    Returns:
+        A float between 0 and 1, the fraction of the velocity that can be
+        traveled before colliding, or 1 if they don't collide.
+    """
+    # Getting the distance between the two rectangles
+    ### X ###
+    if velocity_x > 0:
+        # If the rectangle is traveling forward on the x-axis
+        entry_distance_x = other_x - (x + width)
+        exit_distance_x = (other_x + other_width) - x
+    else:
+        # If the rectangle is traveling backwards on the x-axis,
+        # do the opposite.
+        entry_distance_x = (other_x + other_width) - x
+        exit_distance_x = other_x - (x + width)
+    ### /X/ ###
+    ### Y ###
+    # Same as x
+    if velocity_y > 0:
+        entry_distance_y = other_y - (y + height)
+        exit_distance_y = (other_y + other_height) - y
+    else:
+        entry_distance_y = (other_y + other_height) - y
+        exit_distance_y = other_y - (y + height)
+    ### /Y/ ###
+    # The actual entry and exit times, the x and y a floating point number 0
+    # to 1 relative to how much of the velocity can be traveled.
+
+    # No dividing by zero!
+    if velocity_x != 0:
+        # Divide distance by speed to get decimal representing how much
+        # of velocity should be travled.
+        entry_x = entry_distance_x / velocity_x
+        exit_x = exit_distance_x / velocity_x
+    elif other_x >= (x + width) or x >= (other_x + other_width):
+        # Not moving on the x-axis and not lined up with the other rectangle
+        # on it, so it can never be reached this frame.
+        return 1
+    else:
+        # Lined up for the whole frame
+        entry_x = float("-inf")
+        exit_x = float("inf")
+    if velocity_y != 0:
+        entry_y = entry_distance_y / velocity_y
+        exit_y = exit_distance_y / velocity_y
+    elif other_y >= (y + height) or y >= (other_y + other_height):
+        # Same as x
+        return 1
+    else:
+        entry_y = float("-inf")
+        exit_y = float("inf")
+
+    # Time (0 to 1) will always be greatest x or y value
+    entry_time = max(entry_x, entry_y)
+    exit_time = min(exit_x, exit_y)
+
+    # No Collision!
+    # Conditions for collision to happen:
+    #   1. Entry must come before exit
+    #   2. Entry-time and exit-time must be between 1 and 0
+    if (entry_time > exit_time) or (entry_x < 0 and entry_y < 0) or \
+        (entry_x > 1) or (entry_y > 1):
+        # `return 1`: full velocity can be made without colliding into
+        # anything.
+        return 1
+    # `return entry_time`: number between one and 0 times velocity is how
+    # far the rectangle can travel this frame
+    return entry_time
+
+def entry_normal(x, y, width, height, velocity_x, velocity_y,
+                    other_x, other_y, other_width, other_height):
+    """Gets the side of a still rectangle that a moving one hits.
+
+    Only meaningful when `swept_aabb` found a hit (a time below 1).
+
+    Returns:
+        A tuple of length two, the normal of the side that is hit, pointing
+        out of the still rectangle (like (0, 1) for landing on top of it).
+    """
+    # Same entry times as `swept_aabb`, the axis entered last is the one hit
+    if velocity_x > 0:
+        entry_x = (other_x - (x + width)) / velocity_x
+    elif velocity_x < 0:
+        entry_x = ((other_x + other_width) - x) / velocity_x
+    else:
+        entry_x = float("-inf")
+    if velocity_y > 0:
+        entry_y = (other_y - (y + height)) / velocity_y
+    elif velocity_y < 0:
+        entry_y = ((other_y + other_height) - y) / velocity_y
+    else:
+        entry_y = float("-inf")
+
+    if entry_x > entry_y:
+        return (-1.0 if velocity_x > 0 else 1.0, 0.0)
+    return (0.0, -1.0 if velocity_y > 0 else 1.0)
+
+def overlap_normal(x, y, width, height, other_x, other_y, other_width,
+                    other_height):
+    """Gets which way a rectangle has to be pushed out of another one.
+
+    Returns:
+        A tuple of length two, the normal of the side of the other rectangle
+        that the first one is the least deep into.
+    """
+    depths = ((x + width) - other_x, (other_x + other_width) - x,
+                (y + height) - other_y, (other_y + other_height) - y)
+    normals = ((-1.0, 0.0), (1.0, 0.0), (0.0, -1.0), (0.0, 1.0))
+    return normals[depths.index(min(depths))]
+
+def circle_normal(center_x, center_y, x, y, width, height):
+    """Gets which way a rectangle is from a circle that it touches.
+
+    Returns:
+        A tuple of length two, the normal pointing out of the circle at the
+        point of the rectangle closest to the center, or None if the center
+        is inside of the rectangle.
+    """
+    distance_x = min(max(center_x, x), x + width) - center_x
+    distance_y = min(max(center_y, y), y + height) - center_y
+    length = math.sqrt(distance_x * distance_x + distance_y * distance_y)
+    if length == 0:
+        return None
+    return (distance_x / length, distance_y / length)
+
+def overlap_rect_rect(x, y, width, height, other_x, other_y, other_width,
+                        other_height):
+    """Checks if two rectangles overlap, only touching doesn't count."""
+    return x < other_x + other_width and other_x < x + width and \
+        y < other_y + other_height and other_y < y + height
+
+def overlap_circle_circle(center_x, center_y, radius, other_center_x,
+                            other_center_y, other_radius):
+    """Checks if two circles overlap, only touching doesn't count."""
+    # Comparing squared distances, so no square root is needed
+    distance_x = center_x - other_center_x
+    distance_y = center_y - other_center_y
+    radii = radius + other_radius
+    return distance_x * distance_x + distance_y * distance_y < radii * radii
+
+def overlap_circle_rect(center_x, center_y, radius, x, y, width, height):
+    """Checks if a circle and a rectangle overlap, only touching doesn't
+    count."""
+    # Distance from the center to the closest point of the rectangle
+    distance_x = center_x - min(max(center_x, x), x + width)
+    distance_y = center_y - min(max(center_y, y), y + height)
+    return distance_x * distance_x + distance_y * distance_y < \
+        radius * radius
+
+def _ray_circle(distance_x, distance_y, velocity_x, velocity_y, radius):
+    """Gets the entry time of a moving point into a still circle.
+
+    Args:
+        distance_x, distance_y: the point minus the center of the circle
+        velocity_x, velocity_y: how far the point moves this frame
+
+    Returns:
+        A float between 0 and 1, or 1 if the point doesn't enter the circle
+        (or starts inside of it, or only grazes it).
+    """
+    # Solving |distance + time * velocity|^2 = radius^2 for time
+    b = distance_x * velocity_x + distance_y * velocity_y
+    if b >= 0:
+        # Moving away from (or past) the center
+        return 1
+    a = velocity_x * velocity_x + velocity_y * velocity_y
+    c = distance_x * distance_x + distance_y * distance_y - radius * radius
+    if c < 0:
+        # Already inside
+        return 1
+    discriminant = b * b - a * c
+    if discriminant <= 0:
+        return 1
+    time = (-b - math.sqrt(discriminant)) / a
+    return time if time < 1 else 1
+
+def swept_circle_circle(center_x, center_y, radius, velocity_x, velocity_y,
+                        other_center_x, other_center_y, other_radius):
+    """Gets the entry time of a moving circle into a still circle.
+
+    The same as a point moving into a circle with both of their radii.
+
+    Returns:
+        A float between 0 and 1, the fraction of the velocity that can be
+        traveled before colliding, or 1 if they don't collide (like
+        `swept_aabb`, circles that already overlap don't collide).
+    """
+    return _ray_circle(center_x - other_center_x, center_y - other_center_y,
+                        velocity_x, velocity_y, radius + other_radius)
+
+def swept_circle_rect(center_x, center_y, radius, velocity_x, velocity_y,
+                        x, y, width, height):
+    """Gets the entry time of a moving circle into a still rectangle.
+
+    The center of the circle hits the rectangle grown by the radius on
+    every side with rounded corners. The center is first swept into the
+    grown rectangle with square corners. If it enters on a side, that is the
+    time, and if it enters in a corner square it hits the rounded corner
+    only if it hits the circle on that corner (going from the corner square
+    to a side always goes through that circle).
+
+    Returns:
+        A float between 0 and 1, the fraction of the velocity that can be
+        traveled before colliding, or 1 if they don't collide (or already
+        overlap).
+    """
+    if overlap_circle_rect(center_x, center_y, radius, x, y, width, height):
+        return 1
+    right = x + width
+    top = y + height
+    if x - radius < center_x < right + radius and \
+        y - radius < center_y < top + radius:
+        # Starting in a corner square, outside of the circle in it
+        time = 0.0
+    else:
+        time = swept_aabb(center_x, center_y, 0.0, 0.0, velocity_x,
+                            velocity_y, x - radius, y - radius,
+                            width + radius * 2, height + radius * 2)
+        if time >= 1:
+            return 1
+    hit_x = center_x + velocity_x * time
+    hit_y = center_y + velocity_y * time
+    if x <= hit_x <= right or y <= hit_y <= top:
+        # Entered on a side
+        return time
+    corner_x = x if hit_x < x else right
+    corner_y = y if hit_y < y else top
+    return _ray_circle(center_x - corner_x, center_y - corner_y, velocity_x,
+                        velocity_y, radius)
+
+def swept_rect_circle(x, y, width, height, velocity_x, velocity_y,
+                        center_x, center_y, radius):
+    """Gets the entry time of a moving rectangle into a still circle.
+
+    The same as the circle moving the other way into the rectangle.
+    """
+    return swept_circle_rect(center_x, center_y, radius, -velocity_x,
+                                -velocity_y, x, y, width, height)
+
+def swept_aabb_exit(x, y, width, height, velocity_x, velocity_y,
+                    other_x, other_y, other_width, other_height):
+    """Gets the exit time of a moving rectangle out of a still rectangle.
+
+    Only used for tracing (see physicstrace.py), `swept_aabb` doesn't need
+    it to find the entry time.
+
+    Returns:
+        A float, the fraction of the velocity after which they stop
+        overlapping, inf if they never stop.
+    """
+    exit_times = []
+    for position, size, other, other_size, velocity in (
+        (x, width, other_x, other_width, velocity_x),
+        (y, height, other_y, other_height, velocity_y)):
+        if velocity > 0:
+            exit_times.append(((other + other_size) - position) / velocity)
+        elif velocity < 0:
+            exit_times.append((other - (position + size)) / velocity)
+    return min(exit_times) if exit_times else float("inf")
+
+def trace_collision(source, entry_time, x, y, width, height, velocity_x,
+                    velocity_y, other_x, other_y, other_width, other_height):
+    """Records a collision found by `swept_aabb` in physicstrace.
+
+    Only call it when `physicstrace.enabled` is True.
+    """
+    physicstrace.collision(source, entry_time,
+                            swept_aabb_exit(x, y, width, height, velocity_x,
+                                            velocity_y, other_x, other_y,
+                                            other_width, other_height),
+                            (x, y, width, height), (velocity_x, velocity_y),
+                            (other_x, other_y, other_width, other_height))
+
+def trace_shapes(source, entry_time, shape, velocity_x, velocity_y, other):
+    """Records a collision between two shapes in physicstrace, with their
+    bounds as the rectangles.
+
+    Only call it when `physicstrace.enabled` is True.
+    """
+    position = shape.position
+    size = shape.size
+    other_position = other.position
+    other_size = other.size
+    trace_collision(source, entry_time, position.x, position.y, size.x,
+                    size.y, velocity_x, velocity_y, other_position.x,
+                    other_position.y, other_size.x, other_size.y)
+
+# The narrowphase tests on shapes (anything with a `kind`, `position` and
+# `size`, including rigidbodies). A circle is the circle inside of it's
+# `position` and `size`. They are plain functions looked up in the tables
+# below, so that testing a pair is one dict lookup and one call.
+def _overlap_rect_rect(shape, other):
+    position = shape.position
+    size = shape.size
+    other_position = other.position
+    other_size = other.size
+    return overlap_rect_rect(position.x, position.y, size.x, size.y,
+                                other_position.x, other_position.y,
+                                other_size.x, other_size.y)
+
+def _overlap_circle_circle(shape, other):
+    position = shape.position
+    radius = shape.size.x * 0.5
+    other_position = other.position
+    other_radius = other.size.x * 0.5
+    return overlap_circle_circle(position.x + radius, position.y + radius,
+                                    radius, other_position.x + other_radius,
+                                    other_position.y + other_radius,
+                                    other_radius)
+
+def _overlap_circle_rect(shape, other):
+    position = shape.position
+    radius = shape.size.x * 0.5
+    other_position = other.position
+    other_size = other.size
+    return overlap_circle_rect(position.x + radius, position.y + radius,
+                                radius, other_position.x, other_position.y,
+                                other_size.x, other_size.y)
+
+def _overlap_rect_circle(shape, other):
+    return _overlap_circle_rect(other, shape)
+
+def _swept_rect_rect(shape, velocity_x, velocity_y, other):
+    position = shape.position
+    size = shape.size
+    other_position = other.position
+    other_size = other.size
+    return swept_aabb(position.x, position.y, size.x, size.y, velocity_x,
+                        velocity_y, other_position.x, other_position.y,
+                        other_size.x, other_size.y)
+
+def _swept_circle_circle(shape, velocity_x, velocity_y, other):
+    position = shape.position
+    radius = shape.size.x * 0.5
+    other_position = other.position
+    other_radius = other.size.x * 0.5
+    return swept_circle_circle(position.x + radius, position.y + radius,
+                                radius, velocity_x, velocity_y,
+                                other_position.x + other_radius,
+                                other_position.y + other_radius,
+                                other_radius)
+
+def _swept_circle_rect(shape, velocity_x, velocity_y, other):
+    position = shape.position
+    radius = shape.size.x * 0.5
+    other_position = other.position
+    other_size = other.size
+    return swept_circle_rect(position.x + radius, position.y + radius,
+                                radius, velocity_x, velocity_y,
+                                other_position.x, other_position.y,
+                                other_size.x, other_size.y)
+
+def _swept_rect_circle(shape, velocity_x, velocity_y, other):
+    # The circle moving the other way into the rectangle
+    return _swept_circle_rect(other, -velocity_x, -velocity_y, shape)
+
+# (kind, other kind) to function(shape, other), see `overlap_shapes`
+OVERLAP_TESTS = {
+    (RECT, RECT): _overlap_rect_rect,
+    (CIRCLE, CIRCLE): _overlap_circle_circle,
+    (CIRCLE, RECT): _overlap_circle_rect,
+    (RECT, CIRCLE): _overlap_rect_circle,
+}
+# (kind, other kind) to function(shape, velocity_x, velocity_y, other), see
+# `swept_shapes`
+SWEPT_TESTS = {
+    (RECT, RECT): _swept_rect_rect,
+    (CIRCLE, CIRCLE): _swept_circle_circle,
+    (CIRCLE, RECT): _swept_circle_rect,
+    (RECT, CIRCLE): _swept_rect_circle,
+}
+
+def overlap_shapes(shape, other):
+    """Checks if two shapes overlap, only touching doesn't count."""
+    return OVERLAP_TESTS[shape.kind, other.kind](shape, other)
+
+def swept_shapes(shape, velocity_x, velocity_y, other):
+    """Gets the entry time of a moving shape into a still shape.
+
+    Returns:
+        A float between 0 and 1, the fraction of the velocity that can be
+        traveled before colliding, or 1 if they don't collide.
+    """
+    return SWEPT_TESTS[shape.kind, other.kind](shape, velocity_x, velocity_y,
+                                                other)
+
+def swept_aabb_times(x, y, width, height, velocity_x, velocity_y,
+                        other_x, other_y, other_width, other_height):
+    """Same as `swept_aabb`, for many rectangles at once with NumPy.
+
+    Every argument but the velocity can be an array (or a float), and they
+    are broadcast against each other, so either rectangle can be many.
+
+    Returns:
+        An array with the entry time of every pair, 1 where they don't
+        collide.
+    """
+    # The arithmetic broadcasts by itself, only the shape of the result is
+    # needed for the arrays made here
+    shape = numpy.broadcast(x, y, width, height, other_x, other_y,
+                            other_width, other_height).shape
+    other_right = other_x + other_width
+    other_top = other_y + other_height
+    right = x + width
+    top = y + height
+
+    # Rectangles that can never be reached, because they aren't lined up on
+    # an axis that the moving rectangle isn't moving on
+    missed = numpy.zeros(shape, dtype=bool)
+
+    # Same steps as `swept_aabb`, one axis at a time
+    ### X ###
+    if velocity_x != 0:
+        if velocity_x > 0:
+            entry_x = (other_x - right) / velocity_x
+            exit_x = (other_right - x) / velocity_x
+        else:
+            entry_x = (other_right - x) / velocity_x
+            exit_x = (other_x - right) / velocity_x
+    else:
+        missed |= (other_x >= right) | (x >= other_right)
+        entry_x = numpy.full(shape, float("-inf"))
+        exit_x = numpy.full(shape, float("inf"))
+    ### /X/ ###
+    ### Y ###
+    if velocity_y != 0:
+        if velocity_y > 0:
+            entry_y = (other_y - top) / velocity_y
+            exit_y = (other_top - y) / velocity_y
+        else:
+            entry_y = (other_top - y) / velocity_y
+            exit_y = (other_y - top) / velocity_y
+    else:
+        missed |= (other_y >= top) | (y >= other_top)
+        entry_y = numpy.full(shape, float("-inf"))
+        exit_y = numpy.full(shape, float("inf"))
+    ### /Y/ ###
+
+    entry_time = numpy.maximum(entry_x, entry_y)
+    exit_time = numpy.minimum(exit_x, exit_y)
+
+    missed |= (entry_time > exit_time) | ((entry_x < 0) & (entry_y < 0)) | \
+                (entry_x > 1) | (entry_y > 1)
+    return numpy.where(missed, 1.0, entry_time)
+
+def swept_rounded_times(x, y, velocity_x, velocity_y, other_x, other_y,
+                        other_width, other_height, radius):
+    """Gets the entry times of moving points into still rectangles with
+    rounded corners, with NumPy.
+
+    Every swept test with circles is one of these (see `swept_circle_rect`,
+    this does the same steps on arrays): a circle into rectangles is it's
+    center into the rectangles grown by it's radius, a rectangle into
+    circles is the centers moving the other way into the rectangle grown by
+    their radii, and a circle into circles is it's center into the other
+    centers grown by both radii (rectangles of size 0). Every argument but
+    the velocity can be an array, and they are broadcast against each other.
+
+    Returns:
+        An array with the entry time of every pair, 1 where they don't
+        collide (or already overlap).
+    """
+    x = numpy.asarray(x, dtype=numpy.float64)
+    y = numpy.asarray(y, dtype=numpy.float64)
+    right = other_x + other_width
+    top = other_y + other_height
+    diameter = radius * 2
+
+    # Starting in the grown rectangle is either overlapping (which doesn't
+    # collide) or starting in a corner square
+    inside = (other_x - radius < x) & (x < right + radius) & \
+        (other_y - radius < y) & (y < top + radius)
+    times = numpy.where(inside, 0.0,
+                        swept_aabb_times(x, y, 0.0, 0.0, velocity_x,
+                                            velocity_y, other_x - radius,
+                                            other_y - radius,
+                                            other_width + diameter,
+                                            other_height + diameter))
+    hit_x = x + velocity_x * times
+    hit_y = y + velocity_y * times
+    corner = ((hit_x < other_x) | (hit_x > right)) & \
+        ((hit_y < other_y) | (hit_y > top)) & (times < 1)
+
+    if corner.any():
+        # The circle on the corner that it entered next to, the same steps
+        # as `_ray_circle`
+        distance_x = x - numpy.where(hit_x < other_x, other_x, right)
+        distance_y = y - numpy.where(hit_y < other_y, other_y, top)
+        a = velocity_x * velocity_x + velocity_y * velocity_y
+        b = distance_x * velocity_x + distance_y * velocity_y
+        c = distance_x * distance_x + distance_y * distance_y - \
+            radius * radius
+        discriminant = b * b - a * c
+        hit = (b < 0) & (c >= 0) & (discriminant > 0)
+        corner_times = numpy.where(
+            hit, (-b - numpy.sqrt(numpy.maximum(discriminant, 0.0))) /
+            (a if a > 0 else 1.0), 1.0)
+        times = numpy.where(corner, numpy.minimum(corner_times, 1.0), times)
+
+    # Points that start inside don't collide, like in `swept_aabb`
+    distance_x = x - numpy.clip(x, other_x, right)
+    distance_y = y - numpy.clip(y, other_y, top)
+    overlapping = distance_x * distance_x + distance_y * distance_y < \
+        radius * radius
+    return numpy.where(overlapping, 1.0, times)
+
+def swept_aabb_batch(x, y, width, height, velocity_x, velocity_y,
+                        positions, sizes):
+    """Gets the earliest entry time of a moving rectangle into many others.
+
+    Does the same thing as calling `swept_aabb` on every still rectangle, but
+    all of them at once in a few NumPy operations.
+
+    Args:
+        x, y, width, height: the moving rectangle
+        velocity_x, velocity_y: how far the moving rectangle moves this frame
+        positions: (n, 2) array of the (x, y) of every still rectangle
+        sizes: (n, 2) array of the (width, height) of every still rectangle
+
+    Returns:
+        A tuple of length two, the earliest entry time (the same as the
+        smallest `swept_aabb` result) and the index of the rectangle that is
+        hit first, or (1, -1) if none of them are hit.
+    """
+    if numpy is None:
+        return _swept_aabb_loop(x, y, width, height, velocity_x, velocity_y,
+                                positions, sizes)
+
+    positions = numpy.asarray(positions, dtype=numpy.float64)
+    sizes = numpy.asarray(sizes, dtype=numpy.float64)
+    if len(positions) == 0:
+        return 1, -1
+    times = swept_aabb_times(x, y, width, height, velocity_x, velocity_y,
+                                positions[:, 0], positions[:, 1],
+                                sizes[:, 0], sizes[:, 1])
+    return _earliest(times)
+
+def _earliest(times):
+    """Gets the smallest time of an array and it's index, or (1, -1) if
+    every time is 1."""
+    # `argmin` gives the first of the smallest times, the same one that
+    # looping through the shapes would keep
+    index = int(numpy.argmin(times))
+    if times[index] >= 1:
+        return 1, -1
+    return float(times[index]), index
+
+def collide_swept_batch(collider_shape, collider_velocity, shapes):
+    """Same as `collide_swept`, but with NumPy.
+
+    The shapes are grouped by kind, and every group is tested at once with
+    `swept_aabb_times` (rectangles into rectangles) or `swept_rounded_times`
+    (everything with circles).
+
+    Args:
+        collider_shape: the shape that you want collisions checked for
+        collider_velocity: a Vector2f, the velocity of `collider_shape`
+        shapes: a list of shapes to check for collisions with
+
+    Returns:
+        A tuple of length two, the fraction of the velocity that
+        `collider_shape` can move this frame and the index of the shape in
+        `shapes` that it hits, or -1 if it doesn't hit any.
+    """
+    velocity_x = collider_velocity.x
+    velocity_y = collider_velocity.y
+    if numpy is None or not shapes:
+        return _swept_shapes_loop(collider_shape, velocity_x, velocity_y,
+                                    shapes)
+
+    x = collider_shape.position.x
+    y = collider_shape.position.y
+    width = collider_shape.size.x
+    height = collider_shape.size.y
+    # Plain lists first, making the arrays out of them at once is much
+    # faster than filling them in one shape at a time
+    values = []
+    kinds = []
+    for shape in shapes:
+        position = shape.position
+        size = shape.size
+        values.append((position.x, position.y, size.x, size.y))
+        kinds.append(shape.kind == CIRCLE)
+    values = numpy.array(values)
+    positions = values[:, :2]
+    sizes = values[:, 2:]
+    circles = numpy.array(kinds)
+    count = len(shapes)
+
+    times = numpy.ones(count)
+    rects = ~circles
+    if collider_shape.kind == CIRCLE:
+        radius = width * 0.5
+        if rects.any():
+            times[rects] = swept_rounded_times(
+                x + radius, y + radius, velocity_x, velocity_y,
+                positions[rects, 0], positions[rects, 1], sizes[rects, 0],
+                sizes[rects, 1], radius)
+        if circles.any():
+            # Circles into circles are rectangles of size 0 at the centers
+            radii = sizes[circles, 0] * 0.5
+            times[circles] = swept_rounded_times(
+                x + radius, y + radius, velocity_x, velocity_y,
+                positions[circles, 0] + radii, positions[circles, 1] + radii,
+                0.0, 0.0, radii + radius)
+    else:
+        if rects.any():
+            times[rects] = swept_aabb_times(
+                x, y, width, height, velocity_x, velocity_y,
+                positions[rects, 0], positions[rects, 1], sizes[rects, 0],
+                sizes[rects, 1])
+        if circles.any():
+            # The circles moving the other way into the rectangle
+            radii = sizes[circles, 0] * 0.5
+            times[circles] = swept_rounded_times(
+                positions[circles, 0] + radii, positions[circles, 1] + radii,
+                -velocity_x, -velocity_y, x, y, width, height, radii)
+
+    time, index = _earliest(times)
+    if index >= 0 and physicstrace.enabled:
+        trace_shapes("collide_swept_batch", time, collider_shape, velocity_x,
+                        velocity_y, shapes[index])
+    return time, index
+
+def _swept_shapes_loop(collider_shape, velocity_x, velocity_y, shapes):
+    """`collide_swept_batch` without NumPy, a plain loop over
+    `swept_shapes`."""
+    minimum_collision_time = 1
+    minimum_index = -1
+    for index, shape in enumerate(shapes):
+        time = swept_shapes(collider_shape, velocity_x, velocity_y, shape)
+        if time < minimum_collision_time:
+            minimum_collision_time = time
+            minimum_index = index
+    if minimum_index >= 0 and physicstrace.enabled:
+        trace_shapes("collide_swept_batch", minimum_collision_time,
+                        collider_shape, velocity_x, velocity_y,
+                        shapes[minimum_index])
+    return minimum_collision_time, minimum_index
+
+def _swept_aabb_loop(x, y, width, height, velocity_x, velocity_y, positions,
+                        sizes):
+    """`swept_aabb_batch` without NumPy, a plain loop over `swept_aabb`."""
+    minimum_collision_time = 1
+    minimum_index = -1
+    for index in range(len(positions)):
+        other_x, other_y = positions[index]
+        other_width, other_height = sizes[index]
+        time = swept_aabb(x, y, width, height, velocity_x, velocity_y,
+                            other_x, other_y, other_width, other_height)
+        if time < minimum_collision_time:
+            minimum_collision_time = time
+            minimum_index = index
+    return minimum_collision_time, minimum_index
@@ -0,0 +1,98 @@
+"""Records collision events of the physics, for debugging.
+
+Tracing is off by default, and then the physics only checks `enabled`
+before a hit is recorded, so it costs next to nothing. When it is on,
+every hit is stored in a ring buffer that only keeps the newest
+`capacity` events, and nothing is printed; call `dump` to write them to a
+file:
+
+    import physicstrace
+    physicstrace.enable()
+    ...
+    physicstrace.dump("collisions.jsonl")
+"""
+from collections import deque
+import json
+import time
+
+# The amount of events kept by default, older ones are thrown away
+TRACE_CAPACITY = 4096
+
+# Whether collisions are recorded right now. Read it (physicstrace.enabled)
+# before recording anything, so that nothing is built when it is off.
+enabled = False
+
+_events = deque(maxlen=TRACE_CAPACITY)
+
+def enable(capacity=None):
+    """Starts recording collisions.
+
+    Args:
+        capacity: the most events to keep, keeps the current capacity (and
+                    events) if it is None
+    """
+    global enabled, _events
+    if capacity is not None and capacity != _events.maxlen:
+        if capacity < 1:
+            raise ValueError("The trace must be able to keep at least one \
+event!")
+        _events = deque(_events, maxlen=int(capacity))
+    enabled = True
+
+def disable():
+    """Stops recording collisions, the recorded ones are kept."""
+    global enabled
+    enabled = False
+
+def clear():
+    """Throws away every recorded event."""
+    _events.clear()
+
+def collision(source, entry_time, exit_time, collider, velocity, other):
+    """Records one collision.
+
+    Only call it when `enabled` is True.
+
+    Args:
+        source: string, what found the collision (like "tilemap")
+        entry_time: 0 to 1, the fraction of the velocity until they touch
+        exit_time: the fraction of the velocity until they stop touching
+        collider: (x, y, width, height) of the moving rectangle
+        velocity: (x, y) velocity of the moving rectangle
+        other: (x, y, width, height) of the rectangle that it hit
+    """
+    # A tuple instead of a dict, it is only turned into one by `events`
+    _events.append((time.perf_counter(), source, entry_time, exit_time,
+                    collider, velocity, other))
+
+def events():
+    """Gets the recorded events, oldest first.
+
+    Returns:
+        A list of dicts that can be converted to json.
+    """
+    return [{
+        "time": event[0],
+        "source": event[1],
+        "entry_time": event[2],
+        "exit_time": event[3],
+        "collider": list(event[4]),
+        "velocity": list(event[5]),
+        "other": list(event[6]),
+    } for event in list(_events)]
+
+def dump(path):
+    """Writes the recorded events to a file, one json object per line.
+
+    Returns:
+        The amount of events written.
+    """
+    recorded = events()
+    with open(path, "w") as file:
+        for event in recorded:
+            file.write(json.dumps(event) + "\n")
+    return len(recorded)
+
+def count():
+    """Returns the amount of recorded events."""
+    return len(_events)
@@ -3,24 +3,24 @@ from kivy.graphics import Rectangle
 from kivy.clock import Clock
 from kivy.properties import NumericProperty
 
-from mathf import RigidBody2D, Rectanglef, Vector2f
+from controller import PlayerController, PLAYER_SIZE
 
 class Player(FloatLayout):
-    """Contains player sprite and movement logic."""
+    """Contains player sprite, the movement logic is in PlayerController."""
 
-    def __init__(self, inital_position=(0,0), **kwargs):
+    def __init__(self, inital_position=(0,0), world=None, **kwargs):
         """Initalizes position.
 
         Args:
             inital_position: two element tuple for the player's inital position
+            world: the PhysicsWorld of the level that the player is in
         """
         # Calling the base class (BoxLayout) __init__ method with **kwargs
         super(Player,self).__init__(**kwargs)
 
-        # Initalizing the player's rigidbody with a rectangle (AABB) collider
-        collider = Rectanglef(position=Vector2f(inital_position), size=\
-                                Vector2f((60,60)))
-        self.rb = RigidBody2D(collider)
+        # The movement logic and rigidbody of the player
+        self.controller = PlayerController(inital_position, world)
+        self.rb = self.controller.rb
 
         # Disabling size_hint
         self.size_hint_x = None
@@ -28,43 +28,30 @@ class Player(FloatLayout):
 
         # Setting the player's position to the inital position
         self.pos = inital_position
-        self.size = (60,60)
+        self.size = PLAYER_SIZE
 
-        # Setting the player movement speed
-        self.speed = 200
-
-    def Update(self, keys):
-        """Handles key presses.
-
-        Moves the player with keys A, D,
-        and spacebar.
+    def Update(self, keys, dt=1.0/60.0):
+        """Handles key presses, see PlayerController.Update().
 
         Args:
             keys: the current keys that are pressed down
+            dt: the length of one physics step
         """
-        # Checking if A and/or D is pressed
-        # if they are, call move.
-
-        # Setting amount to delta-time * speed
-        # and making sure that it is an integer
-        amount = 4
-
-        if 'a' in keys:
-            # Calling with -amount since A should move the player backwards
-            self.rb.velocity.x = -amount
-        if 'd' in keys:
-            # Calling with positive amount this time since D should move the
-            # player forward.
-            self.rb.velocity.x = amount
+        self.controller.Update(keys, dt)
 
     def PhysicsUpdate(self, dt):
-        """Does all of the physics calculations.
+        """Runs after every physics step, see PlayerController.PhysicsUpdate().
+
+        Args:
+            dt: float, the length of one physics step.
+        """
+        self.controller.PhysicsUpdate(dt)
 
-        Runs AFTER Update has changed the player's
-        properties.
+    def Render(self, alpha):
+        """Moves the player in between it's last two physics steps.
 
         Args:
-            dt: float delta-time, the amount of time that passed between the last frame and this one.
+            alpha: 0 to 1, how far the current frame is between the last
+                    physics step and the next one
         """
-        self.rb.Update(dt)
-        self.pos = tuple(self.rb.position)
+        self.pos = self.controller.interpolate(alpha)
@@ -0,0 +1,265 @@
+"""Times every phase of a frame and counts what the physics does.
+
+The game has one FrameProfiler, `frame_profiler`. It is off by default, and
+then every call on it returns right away. When it is on, the time of every
+phase (like "physics" or "render") and the value of every counter (like
+"bodies_stepped") is added up over a frame, and kept for the last
+`FRAME_WINDOW` frames so that their percentiles can be shown in game (F3)
+or written to a file (F4, or headless.py --profile).
+"""
+from collections import deque, OrderedDict
+import csv
+import json
+import sys
+import time
+
+# The amount of frames that the percentiles are taken over
+FRAME_WINDOW = 600
+# Percentiles shown and exported for every phase and counter
+PERCENTILES = (50, 95, 99)
+
+class RollingStats(object):
+    """Keeps the last `size` samples of something, for it's percentiles.
+
+    Members:
+        samples: deque of the newest samples, oldest first
+        total: the amount of samples ever added, including thrown away ones
+    """
+
+    def __init__(self, size=FRAME_WINDOW):
+        """Initalizes an empty window of `size` samples."""
+        if size < 1:
+            raise ValueError("RollingStats must keep at least one sample!")
+        self.samples = deque(maxlen=int(size))
+        self.total = 0
+
+    def add(self, value):
+        """Adds a sample, throwing away the oldest one if the window is
+        full."""
+        self.samples.append(value)
+        self.total += 1
+
+    def clear(self):
+        """Throws away every sample."""
+        self.samples.clear()
+        self.total = 0
+
+    def __len__(self):
+        """Returns the amount of samples in the window."""
+        return len(self.samples)
+
+    def percentile(self, percent):
+        """Gets a percentile (0 to 100) of the samples, or None if there
+        are none."""
+        return _percentile(sorted(self.samples), percent)
+
+    def summary(self, scale=1.0):
+        """Gets the percentiles, mean and max of the samples.
+
+        Args:
+            scale: every value is multiplied by this (like 1000 for seconds
+                    to milliseconds)
+
+        Returns:
+            A dict that can be converted to json, with "count", "mean",
+            "max" and "p50", "p95", "p99" (see `PERCENTILES`). The values
+            are None if there are no samples.
+        """
+        ordered = sorted(self.samples)
+        result = OrderedDict()
+        result["count"] = len(ordered)
+        result["mean"] = sum(ordered) / len(ordered) * scale if ordered \
+                            else None
+        for percent in PERCENTILES:
+            value = _percentile(ordered, percent)
+            result["p" + str(percent)] = value * scale if value is not None \
+                                            else None
+        result["max"] = ordered[-1] * scale if ordered else None
+        return result
+
+def _percentile(ordered, percent):
+    """Gets a percentile of a sorted list with the nearest-rank method."""
+    if not ordered:
+        return None
+    rank = int(round(percent / 100.0 * (len(ordered) - 1)))
+    return ordered[max(0, min(rank, len(ordered) - 1))]
+
+class FrameProfiler(object):
+    """Times phases of every frame, and counts things that happen in it.
+
+    Members:
+        enabled: whether anything is being measured
+        frames: the amount of frames measured
+        phases: ordered dict of phase name to the RollingStats of it's
+                seconds per frame
+        counters: ordered dict of counter name to the RollingStats of it's
+                    total per frame
+    """
+
+    def __init__(self, window=FRAME_WINDOW):
+        """Initalizes a profiler that is off.
+
+        Args:
+            window: the amount of frames that the percentiles are taken over
+        """
+        self.enabled = False
+        self.window = int(window)
+        self.frames = 0
+        self.phases = OrderedDict()
+        self.counters = OrderedDict()
+
+        # Seconds and counts added up during the current frame
+        self._frame_phases = dict()
+        self._frame_counters = dict()
+        # When every running phase started
+        self._starts = dict()
+        self._frame_start = None
+        self._frame_blocks = 0
+
+    def enable(self):
+        """Starts measuring, from the next frame."""
+        self.enabled = True
+
+    def disable(self):
+        """Stops measuring, the measured frames are kept."""
+        self.enabled = False
+        self._frame_start = None
+
+    def toggle(self):
+        """Turns the profiler on if it is off, and off if it is on.
+
+        Returns:
+            `enabled`
+        """
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def reset(self):
+        """Throws away every measured frame."""
+        self.frames = 0
+        self.phases.clear()
+        self.counters.clear()
+        self._frame_phases.clear()
+        self._frame_counters.clear()
+        self._starts.clear()
+        self._frame_start = None
+
+    def begin_frame(self):
+        """Starts a frame, every phase and count until `end_frame` is part
+        of it."""
+        if not self.enabled:
+            return
+        self._frame_start = time.perf_counter()
+        self._frame_blocks = sys.getallocatedblocks()
+
+    def end_frame(self):
+        """Ends the frame, adding it's totals to the rolling stats.
+
+        The time from `begin_frame` is the "frame" phase, and the change in
+        the amount of allocated memory blocks is the "net_blocks" counter.
+        It is what was allocated minus what was freed during the frame, so
+        it is negative when a frame frees more than it allocates.
+        """
+        if not self.enabled or self._frame_start is None:
+            return
+        self.add_time("frame", time.perf_counter() - self._frame_start)
+        self.count("net_blocks", sys.getallocatedblocks() -
+                    self._frame_blocks)
+        self._frame_start = None
+
+        for names, frame_values in ((self.phases, self._frame_phases),
+                                    (self.counters, self._frame_counters)):
+            # Phases and counters that didn't happen this frame count as 0
+            for name in frame_values:
+                if name not in names:
+                    names[name] = RollingStats(self.window)
+            for name, stats in names.items():
+                stats.add(frame_values.get(name, 0))
+            frame_values.clear()
+        self.frames += 1
+
+    def start(self, name):
+        """Starts timing a phase, until `stop` is called with it's name."""
+        if self.enabled:
+            self._starts[name] = time.perf_counter()
+
+    def stop(self, name):
+        """Stops timing a phase, adding the time to this frame's total for
+        it."""
+        if not self.enabled:
+            return
+        start = self._starts.pop(name, None)
+        if start is not None:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        """Adds time that was measured some other way to a phase."""
+        if self.enabled:
+            self._frame_phases[name] = self._frame_phases.get(name, 0.0) + \
+                                        seconds
+
+    def count(self, name, amount=1):
+        """Adds `amount` to a counter for this frame."""
+        if self.enabled:
+            self._frame_counters[name] = self._frame_counters.get(name, 0) + \
+                                            amount
+
+    def summary(self):
+        """Gets the percentiles of every phase (in milliseconds) and
+        counter.
+
+        Returns:
+            A dict that can be converted to json.
+        """
+        return OrderedDict((
+            ("frames", self.frames),
+            ("window", self.window),
+            ("phases_ms", OrderedDict((name, stats.summary(1000.0))
+                                        for name, stats in self.phases.items())),
+            ("counters", OrderedDict((name, stats.summary())
+                                        for name, stats in
+                                        self.counters.items())),
+        ))
+
+    def rows(self):
+        """Gets the summary as table rows, see `write_csv`."""
+        header = ["kind", "name", "count", "mean"] + \
+                    ["p" + str(percent) for percent in PERCENTILES] + ["max"]
+        rows = [header]
+        summary = self.summary()
+        for kind, key in (("phase_ms", "phases_ms"), ("counter", "counters")):
+            for name, stats in summary[key].items():
+                rows.append([kind, name] + list(stats.values()))
+        return rows
+
+    def write_json(self, path):
+        """Writes `summary` to a json file."""
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=4)
+
+    def write_csv(self, path):
+        """Writes `summary` to a csv file, one row per phase and counter."""
+        with open(path, "w", newline="") as file:
+            csv.writer(file).writerows(self.rows())
+
+    def report(self):
+        """Gets a short text version of the summary, one line per phase and
+        counter, for the in-game overlay."""
+        lines = ["frames: " + str(self.frames)]
+        for name, stats in self.phases.items():
+            summary = stats.summary(1000.0)
+            lines.append("{:<18} p50 {:6.2f}  p95 {:6.2f}  p99 {:6.2f} ms"
+                            .format(name, summary["p50"], summary["p95"],
+                                    summary["p99"]))
+        for name, stats in self.counters.items():
+            summary = stats.summary()
+            lines.append("{:<18} p50 {:6.0f}  p95 {:6.0f}  p99 {:6.0f}"
+                            .format(name, summary["p50"], summary["p95"],
+                                    summary["p99"]))
+        return "\n".join(lines)
+
+# The profiler of the game
+frame_profiler = FrameProfiler()
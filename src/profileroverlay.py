@@ -0,0 +1,62 @@
+from kivy.uix.label import Label
+from kivy.graphics import Color, Rectangle
+
+# Seconds between updates of the overlay's text, changing a Label's text
+# every frame would cost more than what it is measuring
+REFRESH_TIME = 0.5
+
+class ProfilerOverlay(Label):
+    """Shows the percentiles of a FrameProfiler on top of the game."""
+
+    def __init__(self, profiler, input_latency=None, **kwargs):
+        """Initalizes the label in the top left corner.
+
+        Args:
+            profiler: the FrameProfiler to show
+            input_latency: an InputLatency to show under it, or None
+            **kwargs: anything needed for base class Label
+        """
+        kwargs.setdefault("font_size", 12)
+        kwargs.setdefault("font_name", "RobotoMono-Regular")
+        super(ProfilerOverlay, self).__init__(**kwargs)
+
+        self.profiler = profiler
+        self.input_latency = input_latency
+        self.halign = "left"
+        self.valign = "top"
+        self.size_hint = (None, None)
+        # Seconds since the text was last changed
+        self._elapsed = REFRESH_TIME
+
+        # Dark background so that the text can be read over the level
+        with self.canvas.before:
+            Color(0, 0, 0, 0.6)
+            self._background = Rectangle(pos=self.pos, size=self.size)
+        self.bind(texture_size=self._resize, pos=self._move)
+
+    def _resize(self, instance, texture_size):
+        """Fits the label (and it's background) around it's text."""
+        self.size = texture_size
+        self._background.size = texture_size
+
+    def _move(self, instance, pos):
+        """Moves the background with the label."""
+        self._background.pos = pos
+
+    def Update(self, dt):
+        """Shows the newest percentiles every `REFRESH_TIME` seconds.
+
+        Args:
+            dt: the time since the last frame
+        """
+        self._elapsed += dt
+        if self._elapsed < REFRESH_TIME:
+            return
+        self._elapsed = 0.0
+        text = self.profiler.report()
+        if self.input_latency is not None:
+            text += "\n" + self.input_latency.report()
+        self.text = text
+        if self.parent is not None:
+            # Staying in the top left corner of the window
+            self.pos = (0, self.parent.height - self.height)
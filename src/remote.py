@@ -0,0 +1,486 @@
+"""Reads the buttons of the Arduino remote over a serial port.
+
+The remote sends a packet every time a button changes (and a few times a
+second while nothing changes), framed like this:
+
+    byte 0      SYNC (0xAA)
+    byte 1      sequence number, +1 every packet (wraps at 256)
+    byte 2      buttons, bit N is set while BUTTONS[N] is held down
+    bytes 3-6   the remote's clock in microseconds (little endian, wraps)
+    byte 7      checksum, XOR of bytes 1 to 6
+
+A background thread reads the port, so a slow or silent remote never stalls
+the game. Decoded packets are put into a deque (appending and popping from
+the two ends of a deque is thread safe without a lock), and the game takes
+them out once per frame with `SerialRemote.poll`, which also measures how
+long every packet took to reach the frame.
+
+Needs PySerial for real serial ports. Without it, ports that are plain
+files (like the pty of a FakeRemote) can still be read on Linux and Mac.
+
+Usage:
+    python src/remote.py --fake
+    python src/remote.py --port /dev/ttyACM0
+"""
+import argparse
+from collections import deque
+import os
+import random
+import struct
+import sys
+import threading
+import time
+
+# PySerial is optional, without it only the FakeRemote (or other ttys) work
+try:
+    import serial
+except ImportError:
+    serial = None
+
+# Pseudo terminals and select on files are POSIX only
+try:
+    import pty
+    import select
+    import tty
+except ImportError:
+    pty = None
+
+from profiler import RollingStats
+
+# Environment variable with the serial port of the remote, see app.py
+PORT_VARIABLE = "MARIO9000_REMOTE"
+BAUDRATE = 115200
+
+# The key that every button of the remote presses, by bit
+BUTTONS = ("a", "d", "spacebar")
+
+SYNC = 0xAA
+PACKET = struct.Struct("<BBBIB")
+# The bytes of a packet that the checksum is over
+_BODY = struct.Struct("<BBI")
+# The most bytes read from the port at once
+READ_SIZE = 256
+# How long the reader waits for bytes before checking if it should stop
+READ_TIMEOUT = 0.05
+# The amount of packets that the latency percentiles are taken over
+LATENCY_WINDOW = 600
+
+def checksum(data):
+    """XORs the bytes of `data` together."""
+    result = 0
+    for byte in bytearray(data):
+        result ^= byte
+    return result
+
+def encode_packet(sequence, buttons, device_time):
+    """Frames one packet of the remote.
+
+    Args:
+        sequence: int, wraps at 256
+        buttons: int, bit N set while BUTTONS[N] is held down
+        device_time: int, the remote's clock in microseconds, wraps at 2^32
+
+    Returns:
+        The packet as bytes.
+    """
+    body = _BODY.pack(sequence & 0xFF, buttons & 0xFF,
+                        device_time & 0xFFFFFFFF)
+    return bytes([SYNC]) + body + bytes([checksum(body)])
+
+def buttons_to_keys(buttons):
+    """Gets the set of keys that the buttons of a packet hold down."""
+    return set(key for bit, key in enumerate(BUTTONS) if buttons & (1 << bit))
+
+class PacketDecoder(object):
+    """Finds packets in a stream of bytes.
+
+    Bytes can come in any amount at a time, and anything that isn't a valid
+    packet (like the start of a packet that the game opened the port in the
+    middle of) is skipped by looking for the next SYNC byte.
+
+    Members:
+        errors: the amount of times that bytes were skipped
+    """
+
+    def __init__(self):
+        """Initalizes an empty buffer."""
+        self._buffer = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        """Adds bytes read from the port.
+
+        Returns:
+            A list of the (sequence, buttons, device_time) of every packet
+            that was completed by `data`.
+        """
+        buffer = self._buffer
+        buffer.extend(data)
+        packets = []
+        start = 0
+        # Whether bytes are being skipped, so a run of them is one error
+        skipping = False
+        while True:
+            found = buffer.find(SYNC, start)
+            if found < 0:
+                found = len(buffer)
+            if found > start:
+                if not skipping:
+                    self.errors += 1
+                skipping = True
+            start = found
+            if len(buffer) - start < PACKET.size:
+                break
+            _, sequence, buttons, device_time, check = \
+                PACKET.unpack_from(buffer, start)
+            if checksum(buffer[start + 1:start + PACKET.size - 1]) != check:
+                # Not really a packet, the SYNC was part of something else
+                if not skipping:
+                    self.errors += 1
+                skipping = True
+                start += 1
+                continue
+            skipping = False
+            packets.append((sequence, buttons, device_time))
+            start += PACKET.size
+        del buffer[:start]
+        return packets
+
+class _TTYStream(object):
+    """Reads a tty (or any file) without PySerial, see `open_port`."""
+
+    def __init__(self, path):
+        """Opens `path` in raw mode."""
+        self._fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        if os.isatty(self._fd):
+            tty.setraw(self._fd)
+
+    def read(self, size):
+        """Reads up to `size` bytes, or nothing after READ_TIMEOUT."""
+        ready, _, _ = select.select([self._fd], [], [], READ_TIMEOUT)
+        if not ready:
+            return b""
+        return os.read(self._fd, size)
+
+    def close(self):
+        """Closes the file."""
+        os.close(self._fd)
+
+def open_port(port, baudrate=BAUDRATE):
+    """Opens a serial port for reading packets.
+
+    Raises:
+        RuntimeError: if PySerial isn't installed and the port can't be
+                        opened without it
+    """
+    if serial is not None:
+        return serial.Serial(port, baudrate, timeout=READ_TIMEOUT)
+    if pty is None or not os.path.exists(port):
+        raise RuntimeError("PySerial is needed to use the remote on '" +
+                            str(port) + "'!")
+    return _TTYStream(port)
+
+class SerialRemote(object):
+    """Buttons of the Arduino remote, read on a background thread.
+
+    Call `start` once, then `poll` at the start of every frame to get the
+    keys that the remote holds down, and `close` when done.
+
+    Members:
+        read_latency: RollingStats of the seconds from reading a packet off
+                        the port to the frame that polled it
+        device_latency: RollingStats of the seconds from the remote sending
+                        a packet to the frame that polled it. The remote's
+                        clock isn't the same as this one, so the fastest
+                        packet so far is taken as having no delay on the
+                        wire, everything else is measured against it.
+        packets: the amount of packets polled
+        lost: the amount of packets that never came (sequence gaps)
+        duplicates: the amount of packets that came twice in a row (the
+                    same sequence number as the one before)
+        changes: list of (read time, key, pressed) of every button that
+                    went down or up in the packets of the last `poll`
+    """
+
+    def __init__(self, port=None, baudrate=BAUDRATE, stream=None,
+                    window=LATENCY_WINDOW):
+        """Initalizes the remote, without opening anything yet.
+
+        Args:
+            port: the serial port (like "COM3" or "/dev/ttyACM0")
+            baudrate: the baudrate of the serial port
+            stream: an already open port to read instead of `port`, anything
+                    with read(size) that returns whatever bytes are there
+            window: the amount of packets the latencies are kept for
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self._stream = stream
+
+        self.read_latency = RollingStats(window)
+        self.device_latency = RollingStats(window)
+        self.packets = 0
+        self.lost = 0
+        self.duplicates = 0
+
+        # Packets going from the reader thread to `poll`, as
+        # (read time, sequence, buttons, device time)
+        self._queue = deque()
+        self._decoder = PacketDecoder()
+        self._thread = None
+        self._running = False
+        # Set by the reader thread if reading the port failed
+        self.error = None
+
+        # The buttons of the newest polled packet
+        self.buttons = 0
+        self.changes = []
+        self._sequence = None
+        # Smallest (read time - device time) seen, and the device clock
+        # unwrapped past 2^32
+        self._offset = None
+        self._last_device_time = None
+        self._device_wraps = 0
+
+    @property
+    def running(self):
+        """Whether the reader thread is reading the port."""
+        return self._running
+
+    @property
+    def errors(self):
+        """The amount of times that bytes that were not a packet were
+        skipped."""
+        return self._decoder.errors
+
+    def start(self):
+        """Opens the port and starts the reader thread."""
+        if self._thread is not None:
+            return
+        if self._stream is None:
+            self._stream = open_port(self.port, self.baudrate)
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop,
+                                        name="remote-reader")
+        # Not keeping the game open if it's closed without calling `close`
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Stops the reader thread and closes the port."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def _read_loop(self):
+        """Runs on the reader thread, decoding packets until `close`."""
+        stream = self._stream
+        queue = self._queue
+        decoder = self._decoder
+        # PySerial blocks until it read everything asked for, so only
+        # asking for what already came in
+        waiting = hasattr(stream, "in_waiting")
+        while self._running:
+            try:
+                if waiting:
+                    data = stream.read(1)
+                    if data and stream.in_waiting:
+                        data += stream.read(stream.in_waiting)
+                else:
+                    data = stream.read(READ_SIZE)
+            except (OSError, ValueError) as error:
+                # Unplugged, or closed from the main thread
+                if self._running:
+                    self.error = error
+                break
+            if not data:
+                continue
+            read_time = time.perf_counter()
+            for sequence, buttons, device_time in decoder.feed(data):
+                queue.append((read_time, sequence, buttons, device_time))
+        self._running = False
+
+    def poll(self, now=None):
+        """Takes every packet that came in since the last poll.
+
+        Args:
+            now: time.perf_counter() of the frame, the current time if None
+
+        Returns:
+            The set of keys that the remote holds down. Keys that were
+            pressed and released again since the last poll are included,
+            so that short taps are never missed.
+        """
+        queue = self._queue
+        self.changes = []
+        if not queue:
+            return buttons_to_keys(self.buttons)
+        if now is None:
+            now = time.perf_counter()
+
+        # Every packet has all of the buttons, so the keys are the ones held
+        # in any packet of this frame (not the ones held before it, or a
+        # key that was let go of would stay down for one more frame)
+        held = 0
+        while queue:
+            read_time, sequence, buttons, device_time = queue.popleft()
+            self._add_packet(now, read_time, sequence, device_time)
+            changed = buttons ^ self.buttons
+            if changed:
+                for bit, key in enumerate(BUTTONS):
+                    if changed & (1 << bit):
+                        self.changes.append((read_time, key,
+                                                bool(buttons & (1 << bit))))
+            self.buttons = buttons
+            held |= buttons
+        return buttons_to_keys(held)
+
+    def _add_packet(self, now, read_time, sequence, device_time):
+        """Counts a polled packet and measures it's latencies."""
+        self.packets += 1
+        if self._sequence is not None:
+            if sequence == self._sequence:
+                # Sent again, not 255 packets lost
+                self.duplicates += 1
+            else:
+                self.lost += (sequence - self._sequence - 1) & 0xFF
+        self._sequence = sequence
+
+        if self._last_device_time is not None and \
+            device_time < self._last_device_time:
+            self._device_wraps += 1
+        self._last_device_time = device_time
+        sent = (device_time + (self._device_wraps << 32)) / 1000000.0
+
+        offset = read_time - sent
+        if self._offset is None or offset < self._offset:
+            self._offset = offset
+        self.read_latency.add(now - read_time)
+        self.device_latency.add(now - (sent + self._offset))
+
+    def report(self):
+        """Gets the latency percentiles in milliseconds as readable text."""
+        lines = [str(self.packets) + " packets, " + str(self.lost) +
+                    " lost, " + str(self.duplicates) + " duplicates, " +
+                    str(self.errors) + " errors"]
+        for name, stats in (("read to frame", self.read_latency),
+                            ("device to frame", self.device_latency)):
+            summary = stats.summary(1000.0)
+            if summary["count"] == 0:
+                continue
+            lines.append(name + " (ms): " + ", ".join(
+                key + " " + format(value, ".3f")
+                for key, value in summary.items() if key != "count"))
+        return "\n".join(lines)
+
+class FakeRemote(object):
+    """A remote on a pseudo terminal, to use the game without the Arduino.
+
+    Open `port` with a SerialRemote, and press the remote's buttons with
+    `press` and `release`. It's clock is time.perf_counter(), so the
+    device latencies it gets are real.
+
+    Members:
+        port: the path of the pseudo terminal to read
+        buttons: the buttons that are held down
+    """
+
+    def __init__(self):
+        """Opens a pseudo terminal.
+
+        Raises:
+            RuntimeError: if pseudo terminals aren't supported
+        """
+        if pty is None:
+            raise RuntimeError("FakeRemote needs pseudo terminals (POSIX)!")
+        self._master, self._slave = pty.openpty()
+        # Passing bytes through as they are, not as lines of text
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.buttons = 0
+        self._sequence = 0
+
+    def press(self, key):
+        """Holds a button down and sends a packet."""
+        self.buttons |= 1 << BUTTONS.index(key)
+        self.send()
+
+    def release(self, key):
+        """Lets go of a button and sends a packet."""
+        self.buttons &= ~(1 << BUTTONS.index(key))
+        self.send()
+
+    def send(self, data=None):
+        """Sends a packet with the current buttons, or `data` as it is."""
+        if data is None:
+            data = encode_packet(self._sequence, self.buttons,
+                                    int(time.perf_counter() * 1000000))
+            self._sequence += 1
+        os.write(self._master, data)
+
+    def close(self):
+        """Closes the pseudo terminal."""
+        os.close(self._master)
+        os.close(self._slave)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shows the buttons of the \
+Arduino remote and how long they take to reach a frame.")
+    parser.add_argument("--port", default=os.environ.get(PORT_VARIABLE),
+                        help="serial port of the remote (or $" +
+                        PORT_VARIABLE + ")")
+    parser.add_argument("--fake", action="store_true",
+                        help="press random buttons of a FakeRemote instead")
+    parser.add_argument("--seconds", type=float, default=5.0,
+                        help="how long to read the remote for")
+    parser.add_argument("--rate", type=float, default=60.0,
+                        help="frames per second to poll at")
+    args = parser.parse_args(argv)
+    if not args.fake and not args.port:
+        parser.error("give the --port of the remote, or use --fake")
+
+    fake = FakeRemote() if args.fake else None
+    remote = SerialRemote(fake.port if fake else args.port)
+    remote.start()
+
+    # Pressing random buttons on another thread, about 20 times a second
+    def press_buttons():
+        generator = random.Random(0)
+        while remote.running:
+            key = generator.choice(BUTTONS)
+            if fake.buttons & (1 << BUTTONS.index(key)):
+                fake.release(key)
+            else:
+                fake.press(key)
+            time.sleep(generator.uniform(0.0, 0.1))
+    if fake:
+        presser = threading.Thread(target=press_buttons)
+        presser.daemon = True
+        presser.start()
+
+    # Polling like the game does, once per frame
+    end = time.perf_counter() + args.seconds
+    keys = set()
+    while time.perf_counter() < end and remote.error is None:
+        pressed = remote.poll()
+        if pressed != keys and not fake:
+            print(" ".join(sorted(pressed)) or "-")
+        keys = pressed
+        time.sleep(1.0 / args.rate)
+
+    remote.close()
+    if fake:
+        presser.join()
+        fake.close()
+    if remote.error is not None:
+        print("Reading the remote failed: " + str(remote.error),
+                file=sys.stderr)
+    print(remote.report())
+    return 1 if remote.error is not None else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""Packs the block and player images into one texture atlas.
+
+Writes a Kivy atlas (a json file with the region of every image, plus one
+png), so that the whole game only has to load and bind one texture. Run it
+again whenever an image in 'res/blocks' or 'res/player.png' changes:
+
+    python src/textureatlas.py
+
+Does not need Kivy or any image library, the pngs are read and written with
+zlib.
+"""
+import argparse
+import glob
+import json
+import os
+import struct
+import zlib
+
+# Where the atlas is written, 'textures.atlas' and 'textures-0.png'
+ATLAS_PATH = "./res/atlas/textures.atlas"
+# Pixels of space around every image, so that neighbouring images don't
+# bleed into each other when the texture is filtered. The space is filled
+# with copies of the image's edge pixels, so the filtering at the edge of a
+# block samples the block itself instead of transparent black (which shows
+# up as dark seams between the tiles)
+PADDING = 1
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def read_png(path):
+    """Reads an 8 bit RGB or RGBA png that is not interlaced.
+
+    Returns:
+        A tuple (width, height, rows), where rows is a list of bytearrays of
+        RGBA pixels, top row first.
+
+    Raises:
+        ValueError: the file is not a png, or a kind of png that is not
+                    supported.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError(path+" is not a png!")
+
+    position = len(PNG_SIGNATURE)
+    header = None
+    compressed = bytearray()
+    while position < len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        chunk = data[position + 8:position + 8 + length]
+        position += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"IDAT":
+            compressed += chunk
+        elif kind == b"IEND":
+            break
+
+    width, height, depth, color, _, _, interlace = header
+    if depth != 8 or color not in (2, 6) or interlace != 0:
+        raise ValueError(path+" must be an 8 bit RGB/RGBA png that is not \
+interlaced!")
+    channels = 4 if color == 6 else 3
+
+    raw = zlib.decompress(bytes(compressed))
+    stride = width * channels
+    rows = []
+    previous = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        kind = raw[start]
+        row = bytearray(raw[start + 1:start + 1 + stride])
+        _unfilter(kind, row, previous, channels)
+        rows.append(row)
+        previous = row
+
+    if channels == 3:
+        # Adding an opaque alpha channel
+        for index, row in enumerate(rows):
+            rgba = bytearray(width * 4)
+            rgba[0::4] = row[0::3]
+            rgba[1::4] = row[1::3]
+            rgba[2::4] = row[2::3]
+            rgba[3::4] = b"\xff" * width
+            rows[index] = rgba
+    return width, height, rows
+
+def _unfilter(kind, row, previous, channels):
+    """Undoes the png filter `kind` of one row, in place."""
+    if kind == 0:
+        return
+    for index in range(len(row)):
+        left = row[index - channels] if index >= channels else 0
+        up = previous[index]
+        if kind == 1:
+            value = left
+        elif kind == 2:
+            value = up
+        elif kind == 3:
+            value = (left + up) // 2
+        elif kind == 4:
+            up_left = previous[index - channels] if index >= channels else 0
+            # Paeth predictor
+            estimate = left + up - up_left
+            distance_left = abs(estimate - left)
+            distance_up = abs(estimate - up)
+            distance_up_left = abs(estimate - up_left)
+            if distance_left <= distance_up and \
+                distance_left <= distance_up_left:
+                value = left
+            elif distance_up <= distance_up_left:
+                value = up
+            else:
+                value = up_left
+        else:
+            raise ValueError("Unknown png filter "+str(kind)+"!")
+        row[index] = (row[index] + value) & 0xff
+
+def write_png(path, width, height, rows):
+    """Writes RGBA rows (top row first) to an 8 bit RGBA png."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + \
+            struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    raw = bytearray()
+    for row in rows:
+        # Filter type 0, no filter
+        raw.append(0)
+        raw += row
+    with open(path, "wb") as file:
+        file.write(PNG_SIGNATURE)
+        file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8,
+                                                6, 0, 0, 0)))
+        file.write(chunk(b"IDAT", zlib.compress(bytes(raw), 9)))
+        file.write(chunk(b"IEND", b""))
+
+def pack(sizes, padding=PADDING):
+    """Finds a place for every image in the smallest power of two texture.
+
+    Puts the images on shelves, tallest first.
+
+    Args:
+        sizes: dict of name to (width, height)
+
+    Returns:
+        A tuple (width, height, places), where places is a dict of name to
+        the (x, y) of it's top left corner, from the top left of the texture.
+    """
+    order = sorted(sizes, key=lambda name: (-sizes[name][1], name))
+    size = 64
+    while True:
+        # Trying a square texture, then one twice as wide
+        for atlas_width, atlas_height in ((size, size), (size * 2, size)):
+            places = _shelf_pack(order, sizes, atlas_width, atlas_height,
+                                    padding)
+            if places is not None:
+                return atlas_width, atlas_height, places
+        size *= 2
+
+def _shelf_pack(order, sizes, atlas_width, atlas_height, padding):
+    """Puts the images in `order` on shelves, or returns None if they don't
+    fit."""
+    places = dict()
+    x = y = shelf_height = 0
+    for name in order:
+        width, height = sizes[name]
+        width += padding * 2
+        height += padding * 2
+        if x + width > atlas_width:
+            # Starting the next shelf
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        if x + width > atlas_width or y + height > atlas_height:
+            return None
+        places[name] = (x + padding, y + padding)
+        x += width
+        shelf_height = max(shelf_height, height)
+    return places
+
+def build_atlas(images, atlas_path=ATLAS_PATH, padding=PADDING):
+    """Packs images into one png, and writes a Kivy atlas file for it.
+
+    Args:
+        images: dict of name to the path of the png
+        atlas_path: the path of the '.atlas' file, the png is written next to
+                    it with '-0.png' at the end of the name
+
+    Returns:
+        The regions that were written, a dict of name to (x, y, width,
+        height) with y from the bottom of the texture (like Kivy).
+    """
+    loaded = {name: read_png(path) for name, path in images.items()}
+    sizes = {name: (image[0], image[1]) for name, image in loaded.items()}
+    atlas_width, atlas_height, places = pack(sizes, padding)
+
+    pixels = [bytearray(atlas_width * 4) for _ in range(atlas_height)]
+    regions = dict()
+    for name, (width, height, rows) in loaded.items():
+        left, top = places[name]
+        for y, row in enumerate(rows):
+            pixels[top + y][left * 4:(left + width) * 4] = row
+        _extrude(pixels, left, top, width, height, padding)
+        # Kivy's textures start at the bottom left
+        regions[name] = [left, atlas_height - top - height, width, height]
+
+    directory = os.path.dirname(atlas_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    base = os.path.splitext(os.path.basename(atlas_path))[0]
+    png_name = base + "-0.png"
+    write_png(os.path.join(directory, png_name), atlas_width, atlas_height,
+                pixels)
+    with open(atlas_path, "w") as file:
+        json.dump({png_name: regions}, file, indent=4, sort_keys=True)
+    return regions
+
+def _extrude(pixels, left, top, width, height, padding):
+    """Copies the edge pixels of the image at (left, top) outwards into the
+    `padding` pixels around it, the corners get the corner pixels."""
+    for y in range(top, top + height):
+        row = pixels[y]
+        first = row[left * 4:left * 4 + 4]
+        last = row[(left + width - 1) * 4:(left + width) * 4]
+        row[(left - padding) * 4:left * 4] = first * padding
+        row[(left + width) * 4:(left + width + padding) * 4] = last * padding
+    # The rows above and below, including the columns that were just filled
+    start = (left - padding) * 4
+    end = (left + width + padding) * 4
+    for y in range(top - padding, top):
+        pixels[y][start:end] = pixels[top][start:end]
+    for y in range(top + height, top + height + padding):
+        pixels[y][start:end] = pixels[top + height - 1][start:end]
+
+def read_uvs(atlas_path=ATLAS_PATH):
+    """Reads the texture coordinates of every image in an atlas.
+
+    Returns:
+        A tuple (png path, uvs), where uvs is a dict of name to
+        (u0, v0, u1, v1), the same as `tilemesh.build_meshes` takes.
+        If there is no atlas the png path is None and uvs is empty.
+    """
+    if not os.path.exists(atlas_path):
+        return None, dict()
+    with open(atlas_path, "r") as file:
+        data = json.load(file)
+
+    # Only one png per atlas is made by `build_atlas`
+    png_name, regions = next(iter(data.items()))
+    png_path = os.path.join(os.path.dirname(atlas_path), png_name)
+    atlas_width, atlas_height, _ = _png_size(png_path)
+
+    uvs = dict()
+    for name, (x, y, width, height) in regions.items():
+        uvs[name] = (x / atlas_width, y / atlas_height,
+                        (x + width) / atlas_width, (y + height) / atlas_height)
+    return png_path, uvs
+
+def _png_size(path):
+    """Reads the width, height and bit depth of a png from it's header."""
+    with open(path, "rb") as file:
+        header = file.read(25)
+    return struct.unpack(">IIB", header[16:25])
+
+def game_images():
+    """Gets every image that goes into the game's atlas.
+
+    Returns:
+        A dict of name to path, the blocks are named after their file (like
+        block names in 'levels.json') and the player is named 'player'.
+    """
+    images = dict()
+    for path in sorted(glob.glob("./res/blocks/*.png")):
+        images[os.path.splitext(os.path.basename(path))[0]] = path
+    images["player"] = "./res/player.png"
+    return images
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Packs the block and player \
+images into one texture atlas.")
+    parser.add_argument("--output", default=ATLAS_PATH,
+                        help="path of the .atlas file to write")
+    parser.add_argument("--padding", type=int, default=PADDING,
+                        help="pixels of space around every image")
+    args = parser.parse_args(argv)
+
+    regions = build_atlas(game_images(), args.output, args.padding)
+    for name, region in sorted(regions.items()):
+        print(name, region)
+
+if __name__ == "__main__":
+    main()
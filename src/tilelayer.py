@@ -0,0 +1,109 @@
+from kivy.uix.widget import Widget
+from kivy.graphics import Color, InstructionGroup, Mesh
+from kivy.core.image import Image
+
+from chunkstream import ChunkStreamer
+from textureatlas import read_uvs
+from tilemesh import ChunkIndex, block_texture_path, ATLAS, CHUNK_SIZE
+
+class TileLayer(Widget):
+    """Draws the tiles of a TileMap that are on screen on one canvas.
+
+    Instead of a widget per block, all of the tiles in a chunk (see
+    tilemesh.ChunkIndex) that use the same texture are drawn with one Mesh.
+    Every block in the texture atlas (see textureatlas.py) shares one
+    texture, so usually that is one Mesh per chunk. Only the chunks inside
+    of the camera's view are drawn, and only the ones near it are built (on
+    a background thread, see chunkstream.py), so drawing costs as much for a
+    huge level as for a small one. The meshes are rebuilt when the tiles of
+    the TileMap change.
+    """
+
+    def __init__(self, tilemap, chunk_size=CHUNK_SIZE, **kwargs):
+        """Indexes the chunks of `tilemap`.
+
+        Args:
+            tilemap: the TileMap to draw
+            chunk_size: columns and rows of tiles in one chunk
+            **kwargs: anything needed for base class Widget
+        """
+        super(TileLayer, self).__init__(**kwargs)
+
+        self.tilemap = tilemap
+        self.chunks = ChunkIndex(tilemap, chunk_size)
+        # Drawn chunks, (column, row) to their InstructionGroup
+        self._drawn = dict()
+        # Loaded textures by block name (or `ATLAS`), shared by all tiles
+        self._textures = dict()
+        # Where every block is in the texture atlas
+        self._atlas_path, self.uvs = read_uvs()
+        # Builds the meshes of the chunks around the camera
+        self.streamer = ChunkStreamer(self.chunks, self.uvs)
+
+        with self.canvas:
+            Color(1, 1, 1, 1)
+
+    def texture(self, name):
+        """Gets the texture of a block (or the atlas), loading it only once."""
+        texture = self._textures.get(name)
+        if texture is None:
+            if name == ATLAS:
+                path = self._atlas_path
+            else:
+                # Blocks that were added after the atlas was built
+                path = block_texture_path(name)
+            texture = self._textures[name] = Image(path).texture
+        return texture
+
+    def build_chunk(self, chunk):
+        """Builds the Meshes of one chunk.
+
+        Returns:
+            An InstructionGroup with the Meshes.
+        """
+        group = InstructionGroup()
+        for name, meshes in self.streamer.get(chunk).items():
+            texture = self.texture(name)
+            for vertices, indices in meshes:
+                group.add(Mesh(vertices=vertices, indices=indices,
+                                mode="triangles", texture=texture))
+        return group
+
+    def rebuild(self):
+        """Throws away all of the meshes, they are built again by the next
+        Update()."""
+        for group in self._drawn.values():
+            self.canvas.remove(group)
+        self._drawn.clear()
+
+    def Update(self, camera):
+        """Draws the chunks that the camera sees, and stops drawing the rest.
+
+        Args:
+            camera: the Camera of the level
+        """
+        version = self.chunks.version
+        view = camera.visible_rect()
+        self.streamer.Update(*view)
+        if self.chunks.version != version:
+            # Some tiles changed
+            self.rebuild()
+
+        visible = self.chunks.chunks_in(*view)
+        drawn = self._drawn
+        if len(visible) == len(drawn) and all(chunk in drawn
+                                                for chunk in visible):
+            return
+
+        visible = set(visible)
+        for chunk in [chunk for chunk in drawn if chunk not in visible]:
+            self.canvas.remove(drawn.pop(chunk))
+        for chunk in visible:
+            if chunk not in drawn:
+                group = drawn[chunk] = self.build_chunk(chunk)
+                self.canvas.add(group)
+
+    def Unload(self):
+        """Stops drawing and throws away every built chunk."""
+        self.rebuild()
+        self.streamer.reset()
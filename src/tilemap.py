@@ -0,0 +1,522 @@
+from array import array
+import math
+
+from narrowphase import CIRCLE, swept_aabb, swept_circle_rect, \
+    trace_collision
+import physicstrace
+
+class TileMap(object):
+    """Static collider for blocks that are lined up on a grid.
+
+    Instead of a rigidbody for every block, stores one small number per tile
+    which is the index of the tile's block name in `palette`. Index 0 is
+    always air ("None").
+
+    For collisions, touching solid tiles are merged into as few rectangles
+    as possible (see `merge_rects`), so that a sweep tests a few big
+    rectangles instead of every tile, and nothing catches on the edges in
+    between tiles. The rectangles are made again whenever a tile changes.
+
+    Members:
+        width: the amount of columns
+        height: the amount of rows
+        tile_size: (width, height) of every tile
+        palette: list of block names, the tiles are indices into it
+        tiles: flat array of palette indices, row by row starting at the
+                bottom row
+        version: goes up by one every time a tile is changed
+    """
+
+    def __init__(self, width, height, tile_size, palette=None, tiles=None):
+        """Initalizes the tiles.
+
+        Args:
+            width: the amount of columns
+            height: the amount of rows
+            tile_size: two element tuple/list, the width and height of a tile
+            palette: list of block names, the first one must be "None"
+            tiles: flat array of `width*height` palette indices, if it is
+                    None every tile is air
+        """
+        self.width = int(width)
+        self.height = int(height)
+        self.tile_size = (float(tile_size[0]), float(tile_size[1]))
+        self.palette = list(palette) if palette is not None else ["None"]
+
+        if tiles is None:
+            tiles = array("B", bytes(self.width * self.height))
+        if len(tiles) != self.width * self.height:
+            raise ValueError("A TileMap needs exactly width*height tiles!")
+        self.tiles = tiles
+        self.version = 0
+
+        # Merged collision rectangles, see `colliders`
+        self._colliders = []
+        # The rectangle of every tile, the index in `_colliders` plus one
+        # (0 for air)
+        self._collider_ids = None
+        self._colliders_version = None
+
+    @classmethod
+    def from_rows(cls, rows, tile_size):
+        """Creates a tilemap from the block names in a level file.
+
+        Args:
+            rows: [y][x] list of block names, the first row is the top of the
+                    level (same as 'levels.json')
+            tile_size: two element tuple/list, the width and height of a tile
+        """
+        height = len(rows)
+        width = len(rows[0]) if height > 0 else 0
+
+        palette = ["None"]
+        indices = {"None": 0}
+        tiles = []
+        # The rows come top to bottom, but the tilemap starts at the bottom
+        for row in reversed(rows):
+            for name in row:
+                index = indices.get(name)
+                if index is None:
+                    index = indices[name] = len(palette)
+                    palette.append(name)
+                tiles.append(index)
+
+        # One byte per tile, unless there are too many kinds of blocks
+        typecode = "B" if len(palette) <= 256 else "H"
+        return cls(width, height, tile_size, palette, array(typecode, tiles))
+
+    def __getitem__(self, position):
+        """Gets the palette index of the tile at (column, row).
+
+        Tiles outside of the tilemap are air.
+        """
+        column, row = position
+        if 0 <= column < self.width and 0 <= row < self.height:
+            return self.tiles[row * self.width + column]
+        return 0
+
+    def set_tile(self, column, row, name):
+        """Changes the block at (column, row).
+
+        Args:
+            column: the column of the tile, must be inside of the tilemap
+            row: the row of the tile, must be inside of the tilemap
+            name: the name of the block, "None" for air
+        """
+        if not (0 <= column < self.width and 0 <= row < self.height):
+            raise IndexError("The tile ("+str(column)+", "+str(row)+") is \
+outside of the TileMap!")
+        if name in self.palette:
+            index = self.palette.index(name)
+        else:
+            index = len(self.palette)
+            self.palette.append(name)
+            # Switching to two bytes per tile once there are too many blocks
+            if index > 255 and self.tiles.typecode == "B":
+                self.tiles = array("H", self.tiles)
+        self.tiles[row * self.width + column] = index
+        self.version += 1
+
+    def is_solid(self, column, row):
+        """Checks if the tile at (column, row) is not air."""
+        return self[column, row] != 0
+
+    def colliders(self):
+        """Gets the merged collision rectangles of the solid tiles.
+
+        Returns:
+            A list of (column, row, columns, rows) rectangles in tiles,
+            covering every solid tile exactly once.
+        """
+        self._update_colliders()
+        return self._colliders
+
+    def collider_at(self, column, row):
+        """Gets the collision rectangle that the tile at (column, row) is
+        part of, or None if it is air."""
+        self._update_colliders()
+        if not (0 <= column < self.width and 0 <= row < self.height):
+            return None
+        rect_id = self._collider_ids[row * self.width + column]
+        return self._colliders[rect_id - 1] if rect_id else None
+
+    def collider_rect(self, index):
+        """Gets the collision rectangle at `index` in `colliders` in pixels.
+
+        Returns:
+            A tuple of length four, (x, y, width, height).
+        """
+        self._update_colliders()
+        column, row, columns, rows = self._colliders[index]
+        tile_width, tile_height = self.tile_size
+        return (column * tile_width, row * tile_height, columns * tile_width,
+                rows * tile_height)
+
+    def overlap(self, x, y, width, height):
+        """Gets the collision rectangles that overlap a rectangle.
+
+        Only touching doesn't count as overlapping.
+
+        Returns:
+            A list of indices into `colliders`.
+        """
+        self._update_colliders()
+        tile_width, tile_height = self.tile_size
+        first_column = max(math.floor(x / tile_width), 0)
+        first_row = max(math.floor(y / tile_height), 0)
+        last_column = min(_first_index(x + width, tile_width), self.width - 1)
+        last_row = min(_first_index(y + height, tile_height), self.height - 1)
+
+        collider_ids = self._collider_ids
+        found = []
+        seen = set()
+        for row in range(first_row, last_row + 1):
+            start = row * self.width
+            for column in range(first_column, last_column + 1):
+                rect_id = collider_ids[start + column]
+                if rect_id and rect_id not in seen:
+                    seen.add(rect_id)
+                    found.append(rect_id - 1)
+        return found
+
+    def set_colliders(self, rects):
+        """Uses collision rectangles that were merged before (like the ones
+        in a level pack) instead of merging the tiles.
+
+        Args:
+            rects: list of (column, row, columns, rows), the same as
+                    `merge_rects` returns for the current tiles
+        """
+        self._set_colliders(rects)
+
+    def _update_colliders(self):
+        """Merges the solid tiles again if any tile changed."""
+        if self._colliders_version == self.version:
+            return
+        self._set_colliders(merge_rects(self.tiles, self.width, self.height))
+
+    def _set_colliders(self, rects):
+        """Stores collision rectangles, and which one every tile is in."""
+        typecode = "H" if len(rects) < 0xffff else "I"
+        ids = array(typecode, bytes(array(typecode).itemsize * len(self.tiles)))
+        for rect_id, (column, row, columns, rows) in enumerate(rects, 1):
+            span = array(typecode, (rect_id,)) * columns
+            for current_row in range(row, row + rows):
+                start = current_row * self.width + column
+                ids[start:start + columns] = span
+        self._colliders = rects
+        self._collider_ids = ids
+        self._colliders_version = self.version
+
+    def sweep(self, collider_shape, collider_velocity):
+        """Calculates sweeping collisions of a shape with the tiles.
+
+        Same as `collide_swept`, but for rectangles only walks over the
+        columns (or rows) of tiles that the rectangle crosses, in the order
+        that it crosses them, and stops as soon as no later tile could be hit
+        first. Circles go to `sweep_circle`.
+
+        Args:
+            collider_shape: a Rectanglef or Circlef, the shape that is moving
+            collider_velocity: a Vector2f, how far it moves this frame
+
+        Returns:
+            A floating point number between 0 and 1, representing the fraction
+            of the velocity that `collider_shape` can move this frame.
+        """
+        if collider_shape.kind == CIRCLE:
+            radius = collider_shape.size.x * 0.5
+            return self.sweep_circle(collider_shape.position.x + radius,
+                                        collider_shape.position.y + radius,
+                                        radius, collider_velocity.x,
+                                        collider_velocity.y)
+        return self.sweep_rect(collider_shape.position.x,
+                                collider_shape.position.y,
+                                collider_shape.size.x, collider_shape.size.y,
+                                collider_velocity.x, collider_velocity.y)
+
+    def sweep_rect(self, x, y, width, height, velocity_x, velocity_y):
+        """Same as `sweep`, but with plain floats instead of shapes.
+
+        Args:
+            x, y, width, height: the moving rectangle
+            velocity_x, velocity_y: how far it moves this frame
+        """
+        return self.sweep_collider(x, y, width, height, velocity_x,
+                                    velocity_y)[0]
+
+    def sweep_collider(self, x, y, width, height, velocity_x, velocity_y):
+        """Same as `sweep_rect`, but also gets which rectangle is hit.
+
+        Returns:
+            A tuple of length two, the fraction of the velocity that can be
+            moved and the index in `colliders` of the rectangle that is hit
+            first, or -1 if none is hit.
+        """
+        if velocity_x != 0:
+            time, rect_id = self._sweep_axis(x, y, width, height, velocity_x,
+                                                velocity_y, False)
+        elif velocity_y != 0:
+            # Walking over rows is walking over columns with x and y swapped
+            time, rect_id = self._sweep_axis(y, x, height, width, velocity_y,
+                                                velocity_x, True)
+        else:
+            # Not moving, so it can't hit anything
+            return 1, -1
+        return time, rect_id - 1
+
+    def sweep_circle(self, center_x, center_y, radius, velocity_x,
+                        velocity_y):
+        """Same as `sweep_rect`, but for a circle.
+
+        Tests every collision rectangle in the tiles around the whole
+        movement, circles are rare enough that they don't need the walk of
+        `_sweep_axis`.
+
+        Args:
+            center_x, center_y, radius: the moving circle
+            velocity_x, velocity_y: how far it moves this frame
+        """
+        return self.sweep_circle_collider(center_x, center_y, radius,
+                                            velocity_x, velocity_y)[0]
+
+    def sweep_circle_collider(self, center_x, center_y, radius, velocity_x,
+                                velocity_y):
+        """Same as `sweep_circle`, but also gets which rectangle is hit, like
+        `sweep_collider`."""
+        if velocity_x == 0 and velocity_y == 0:
+            return 1, -1
+        self._update_colliders()
+        tile_width, tile_height = self.tile_size
+        left = center_x - radius + min(velocity_x, 0.0)
+        bottom = center_y - radius + min(velocity_y, 0.0)
+        right = center_x + radius + max(velocity_x, 0.0)
+        top = center_y + radius + max(velocity_y, 0.0)
+        first_column = max(math.floor(left / tile_width), 0)
+        first_row = max(math.floor(bottom / tile_height), 0)
+        last_column = min(math.floor(right / tile_width), self.width - 1)
+        last_row = min(math.floor(top / tile_height), self.height - 1)
+
+        collider_ids = self._collider_ids
+        colliders = self._colliders
+        tested = set()
+        minimum_collision_time = 1
+        minimum_id = 0
+        for row in range(first_row, last_row + 1):
+            start = row * self.width
+            for column in range(first_column, last_column + 1):
+                rect_id = collider_ids[start + column]
+                if rect_id == 0 or rect_id in tested:
+                    continue
+                tested.add(rect_id)
+
+                rect_column, rect_row, rect_columns, rect_rows = \
+                    colliders[rect_id - 1]
+                other_x = rect_column * tile_width
+                other_y = rect_row * tile_height
+                other_width = rect_columns * tile_width
+                other_height = rect_rows * tile_height
+                time = swept_circle_rect(center_x, center_y, radius,
+                                            velocity_x, velocity_y, other_x,
+                                            other_y, other_width,
+                                            other_height)
+                if time < 1 and physicstrace.enabled:
+                    # The square around the circle as the rectangle
+                    self._trace(time, center_x - radius, center_y - radius,
+                                radius * 2, radius * 2, velocity_x,
+                                velocity_y, other_x, other_y, other_width,
+                                other_height, False)
+                if time < minimum_collision_time:
+                    minimum_collision_time = time
+                    minimum_id = rect_id
+        return minimum_collision_time, minimum_id - 1
+
+    def _sweep_axis(self, x, y, width, height, velocity_x, velocity_y,
+                    swapped):
+        """Walks over the tiles crossed along the (possibly swapped) x-axis.
+
+        When `swapped` is True, every x is actually a y (and the other way
+        around), which is used for rectangles that only move vertically.
+
+        Returns:
+            A tuple of length two, the earliest time and the id (index in
+            `_colliders` plus one) of the rectangle hit then, or 0.
+        """
+        tile_width, tile_height = self.tile_size
+        columns, rows = self.width, self.height
+        if swapped:
+            tile_width, tile_height = tile_height, tile_width
+            columns, rows = rows, columns
+
+        self._update_colliders()
+        collider_ids = self._collider_ids
+        colliders = self._colliders
+        map_width = self.width
+        # Rectangles that were already tested, a big one covers many tiles
+        tested = set()
+
+        # Range of columns touched by the rectangle from start to end
+        if velocity_x > 0:
+            first = _first_index(x, tile_width)
+            last = math.floor((x + width + velocity_x) / tile_width)
+            step = 1
+        else:
+            first = math.floor((x + width) / tile_width)
+            last = _first_index(x + velocity_x, tile_width)
+            step = -1
+
+        minimum_collision_time = 1
+        minimum_id = 0
+        for column in range(first, last + step, step):
+            # Time that the rectangle starts and stops overlapping this column
+            left = column * tile_width
+            if velocity_x > 0:
+                start = (left - (x + width)) / velocity_x
+                end = (left + tile_width - x) / velocity_x
+            else:
+                start = (left + tile_width - x) / velocity_x
+                end = (left - (x + width)) / velocity_x
+            start = max(start, 0.0)
+            end = min(end, 1.0)
+
+            # Every tile in this column and the later ones would be hit at or
+            # after `start`, so nothing can be hit earlier anymore.
+            if start >= minimum_collision_time:
+                break
+            if column < 0 or column >= columns:
+                continue
+
+            # Rows touched by the rectangle while it is in this column
+            bottom = y + min(velocity_y * start, velocity_y * end)
+            top = y + height + max(velocity_y * start, velocity_y * end)
+            first_row = max(_first_index(bottom, tile_height), 0)
+            last_row = min(math.floor(top / tile_height), rows - 1)
+
+            for row in range(first_row, last_row + 1):
+                if swapped:
+                    rect_id = collider_ids[column * map_width + row]
+                else:
+                    rect_id = collider_ids[row * map_width + column]
+                if rect_id == 0 or rect_id in tested:
+                    continue
+                tested.add(rect_id)
+
+                rect_column, rect_row, rect_columns, rect_rows = \
+                    colliders[rect_id - 1]
+                if swapped:
+                    rect_column, rect_row = rect_row, rect_column
+                    rect_columns, rect_rows = rect_rows, rect_columns
+                other_x = rect_column * tile_width
+                other_y = rect_row * tile_height
+                other_width = rect_columns * tile_width
+                other_height = rect_rows * tile_height
+                time = swept_aabb(x, y, width, height, velocity_x, velocity_y,
+                                    other_x, other_y, other_width,
+                                    other_height)
+                if time < 1 and physicstrace.enabled:
+                    self._trace(time, x, y, width, height, velocity_x,
+                                velocity_y, other_x, other_y, other_width,
+                                other_height, swapped)
+                if time < minimum_collision_time:
+                    minimum_collision_time = time
+                    minimum_id = rect_id
+
+        return minimum_collision_time, minimum_id
+
+    def _trace(self, time, x, y, width, height, velocity_x, velocity_y,
+                other_x, other_y, other_width, other_height, swapped):
+        """Records a hit found by `_sweep_axis` in physicstrace, with x and y
+        swapped back."""
+        if swapped:
+            x, y, width, height = y, x, height, width
+            velocity_x, velocity_y = velocity_y, velocity_x
+            other_x, other_y = other_y, other_x
+            other_width, other_height = other_height, other_width
+        trace_collision("tilemap", time, x, y, width, height, velocity_x,
+                        velocity_y, other_x, other_y, other_width,
+                        other_height)
+
+def merge_rects(tiles, width, height, same_block=False):
+    """Greedily merges touching solid tiles into big rectangles.
+
+    Goes over the tiles row by row from the bottom left. Every solid tile
+    that isn't in a rectangle yet starts a new one, which is made as wide as
+    possible and then as tall as possible.
+
+    Args:
+        tiles: flat array of palette indices, `width` per row
+        width, height: the amount of columns and rows
+        same_block: only merge tiles of the same block (for drawing),
+                    instead of every solid tile (for collisions)
+
+    Returns:
+        A list of (column, row, columns, rows) rectangles, covering every
+        solid tile exactly once. With `same_block` every rectangle also has
+        the palette index of it's block at the end.
+    """
+    # 1 for every solid tile, so that runs of them can be found with
+    # bytes.find instead of looking at every tile in python
+    if tiles.typecode == "B":
+        solid = tiles.tobytes().translate(_SOLID_TABLE)
+    else:
+        solid = bytes(map(bool, tiles))
+    # 1 for every tile that is in a rectangle already
+    used = bytearray(len(tiles))
+
+    rects = []
+    for row in range(height):
+        row_start = row * width
+        row_end = row_start + width
+        # Solid tiles of this row that aren't in a rectangle yet
+        free = (int.from_bytes(solid[row_start:row_end], "big") &
+                ~int.from_bytes(used[row_start:row_end], "big")).to_bytes(
+                    width, "big")
+
+        column = free.find(1)
+        while column != -1:
+            end = free.find(0, column)
+            if end == -1:
+                end = width
+            if same_block:
+                # Only as far as the block stays the same
+                index = tiles[row_start + column]
+                for other in range(column + 1, end):
+                    if tiles[row_start + other] != index:
+                        end = other
+                        break
+            columns = end - column
+
+            # As tall as possible, every row has to be solid (and not used)
+            # all the way across
+            top = row + 1
+            while top < height:
+                start = top * width + column
+                stop = start + columns
+                if solid.find(0, start, stop) != -1 or \
+                    used.find(1, start, stop) != -1:
+                    break
+                if same_block and \
+                    tiles[start:stop].count(index) != columns:
+                    break
+                top += 1
+
+            for current_row in range(row + 1, top):
+                start = current_row * width + column
+                used[start:start + columns] = b"\x01" * columns
+            if same_block:
+                rects.append((column, row, columns, top - row, index))
+            else:
+                rects.append((column, row, columns, top - row))
+            column = free.find(1, end)
+    return rects
+
+# Turns palette indices into 1 for solid and 0 for air, see `merge_rects`
+_SOLID_TABLE = bytes([0] + [1] * 255)
+
+def _first_index(position, tile_size):
+    """Gets the index of the first tile touching `position` from below.
+
+    Unlike `math.floor`, a position exactly on the edge between two tiles
+    gives the lower tile, since touching a tile counts as colliding with it.
+    """
+    return math.ceil(position / tile_size) - 1
@@ -0,0 +1,231 @@
+from array import array
+import math
+
+# Most tiles in one mesh, Kivy meshes use 16 bit indices so a mesh can only
+# have 65536 vertices (4 per tile)
+MAX_TILES_PER_MESH = 16384
+# (u0, v0, u1, v1) texture coordinates of a whole texture
+FULL_TEXTURE = (0.0, 0.0, 1.0, 1.0)
+# The group of all of the blocks that are in the texture atlas, they are
+# drawn together since they share one texture
+ATLAS = "atlas"
+# Columns and rows of tiles in one chunk, only chunks that are on screen are
+# built and drawn
+CHUNK_SIZE = 16
+
+def block_texture_path(name):
+    """Gets the image file of a block.
+
+    Args:
+        name: string, name of the block representing the end of the filename
+                (ex. file is 'dirt.png' name is 'dirt') also supports passing
+                in the filename.
+    """
+    if ".png" in name:
+        return "./res/blocks/"+name
+    return "./res/blocks/"+name+".png"
+
+def build_meshes(tilemap, uvs=None, region=None):
+    """Builds the vertices of every tile, grouped by texture.
+
+    Does not use Kivy, so that it can run without a window (or on another
+    thread); the results are turned into Kivy Meshes by TileLayer.
+
+    Args:
+        tilemap: the TileMap to build the meshes of
+        uvs: dict of block name to it's (u0, v0, u1, v1) texture coordinates
+                in the texture atlas, blocks that aren't in it use the whole
+                texture of their own image
+        region: (first column, first row, last column, last row) of the
+                tiles to build, the last column and row are not included. If
+                it is None every tile is built.
+
+    Returns:
+        A dict of `ATLAS` (for blocks in `uvs`) or block name (for the
+        others) to a list of (vertices, indices) tuples, one for every mesh.
+        Every vertex is x, y, u, v.
+    """
+    if uvs is None:
+        uvs = dict()
+    if region is None:
+        region = (0, 0, tilemap.width, tilemap.height)
+    first_column, first_row, last_column, last_row = region
+    first_column = max(first_column, 0)
+    first_row = max(first_row, 0)
+    last_column = min(last_column, tilemap.width)
+    last_row = min(last_row, tilemap.height)
+
+    tile_width, tile_height = tilemap.tile_size
+    tiles = tilemap.tiles
+    width = tilemap.width
+
+    # Tile positions grouped by their palette index
+    positions = dict()
+    for row in range(first_row, last_row):
+        start = row * width
+        y = row * tile_height
+        for column in range(first_column, last_column):
+            index = tiles[start + column]
+            # Air
+            if index == 0:
+                continue
+            group = positions.get(index)
+            if group is None:
+                group = positions[index] = []
+            group.append((column * tile_width, y))
+
+    result = dict()
+    for index, group in positions.items():
+        name = tilemap.palette[index]
+        if name in uvs:
+            key = ATLAS
+            u0, v0, u1, v1 = uvs[name]
+        else:
+            key = name
+            u0, v0, u1, v1 = FULL_TEXTURE
+
+        meshes = result.get(key)
+        if meshes is None:
+            meshes = result[key] = [([], [])]
+        for x, y in group:
+            vertices, indices = meshes[-1]
+            # Vertex index of the first corner, each vertex is 4 floats
+            first = len(vertices) // 4
+            if first >= MAX_TILES_PER_MESH * 4:
+                # This mesh is full, starting a new one
+                vertices, indices = [], []
+                meshes.append((vertices, indices))
+                first = 0
+            right = x + tile_width
+            top = y + tile_height
+            vertices.extend((x, y, u0, v0,
+                            right, y, u1, v0,
+                            right, top, u1, v1,
+                            x, top, u0, v1))
+            # Two triangles per tile
+            indices.extend((first, first + 1, first + 2,
+                            first, first + 2, first + 3))
+    return result
+
+class ChunkIndex(object):
+    """Splits a TileMap into square chunks of tiles, for culling.
+
+    Remembers how many tiles in every chunk are not air, so that finding
+    the chunks in a rectangle only looks at chunks, not tiles, and empty
+    chunks are skipped without building anything.
+
+    Members:
+        tilemap: the TileMap that is split up
+        chunk_size: the amount of columns and rows of tiles in a chunk
+        columns, rows: the amount of chunks across and up
+        counts: flat array of the amount of tiles in every chunk that are
+                not air, row by row starting at the bottom
+    """
+
+    def __init__(self, tilemap, chunk_size=CHUNK_SIZE):
+        """Counts the tiles of every chunk.
+
+        Args:
+            tilemap: the TileMap to split up
+            chunk_size: positive int, columns and rows of tiles per chunk
+        """
+        if chunk_size < 1:
+            raise ValueError("A chunk must be at least one tile!")
+        self.tilemap = tilemap
+        self.chunk_size = int(chunk_size)
+        self.columns = self.rows = 0
+        self.counts = array("I")
+        # The version of the tilemap that `counts` is from
+        self.version = None
+        self.refresh()
+
+    def refresh(self):
+        """Counts the tiles again if the tilemap changed.
+
+        Returns:
+            True if the tilemap changed since the last count.
+        """
+        tilemap = self.tilemap
+        if tilemap.version == self.version:
+            return False
+
+        size = self.chunk_size
+        self.columns = int(math.ceil(tilemap.width / size))
+        self.rows = int(math.ceil(tilemap.height / size))
+        counts = array("I", bytes(4 * self.columns * self.rows))
+        tiles = tilemap.tiles
+        for row in range(tilemap.height):
+            start = row * tilemap.width
+            first = (row // size) * self.columns
+            for chunk_column in range(self.columns):
+                part = tiles[start + chunk_column * size:
+                                start + min((chunk_column + 1) * size,
+                                            tilemap.width)]
+                counts[first + chunk_column] += len(part) - part.count(0)
+        self.counts = counts
+        self.version = tilemap.version
+        return True
+
+    def region(self, chunk):
+        """Gets the tiles of a chunk.
+
+        Args:
+            chunk: (column, row) of the chunk
+
+        Returns:
+            The (first column, first row, last column, last row) of it's
+            tiles, like `build_meshes` takes.
+        """
+        column, row = chunk
+        size = self.chunk_size
+        return (column * size, row * size,
+                min((column + 1) * size, self.tilemap.width),
+                min((row + 1) * size, self.tilemap.height))
+
+    @property
+    def chunk_pixels(self):
+        """The (width, height) of one chunk in level coordinates."""
+        return (self.tilemap.tile_size[0] * self.chunk_size,
+                self.tilemap.tile_size[1] * self.chunk_size)
+
+    def chunk_range(self, x, y, width, height):
+        """Finds the chunks that overlap a rectangle, empty or not.
+
+        Args:
+            x, y, width, height: the rectangle, in level coordinates
+
+        Returns:
+            The (first column, first row, last column, last row) of the
+            chunks, the last column and row are not included.
+        """
+        chunk_width, chunk_height = self.chunk_pixels
+        return (max(int(math.floor(x / chunk_width)), 0),
+                max(int(math.floor(y / chunk_height)), 0),
+                min(int(math.ceil((x + width) / chunk_width)), self.columns),
+                min(int(math.ceil((y + height) / chunk_height)), self.rows))
+
+    def chunks_in(self, x, y, width, height):
+        """Finds the chunks with tiles in a rectangle.
+
+        Args:
+            x, y, width, height: the rectangle, in level coordinates
+
+        Returns:
+            A list of (column, row) of every chunk that overlaps the
+            rectangle and isn't only air.
+        """
+        first_column, first_row, last_column, last_row = \
+            self.chunk_range(x, y, width, height)
+
+        result = []
+        counts = self.counts
+        for row in range(first_row, last_row):
+            start = row * self.columns
+            for column in range(first_column, last_column):
+                if counts[start + column]:
+                    result.append((column, row))
+        return result
+
+    def build(self, chunk, uvs=None):
+        """Builds the meshes of one chunk, see `build_meshes`."""
+        return build_meshes(self.tilemap, uvs, self.region(chunk))
@@ -0,0 +1,87 @@
+# The amount of physics steps per second
+PHYSICS_RATE = 60.0
+# Environment variable with a different amount of physics steps per second,
+# see app.py
+RATE_VARIABLE = "MARIO9000_PHYSICS_RATE"
+# The most physics steps that are run in one frame
+MAX_SUBSTEPS = 5
+
+class FixedTimestep(object):
+    """Runs a step function at a fixed rate, however often frames happen.
+
+    The time of every frame is added to an accumulator, and the step function
+    is called once for every full step inside of it. What is left over is
+    used to interpolate between the last two steps when rendering.
+
+    Members:
+        rate: the amount of steps per second
+        step: the length of one step in seconds (1/rate)
+        max_substeps: the most steps that are run in one frame, if a frame
+                        took longer than that the rest of the time is dropped
+                        so that a slow frame can't make the next one slower
+        alpha: 0 to 1, how far the current time is between the last step and
+                the next one
+        steps: the amount of steps run
+        extra_steps: the amount of steps run on top of one per frame, to
+                        catch up after a slow frame
+        dropped_steps: the amount of steps that were skipped because a frame
+                        would have needed more than `max_substeps`
+    """
+
+    def __init__(self, rate=PHYSICS_RATE, max_substeps=MAX_SUBSTEPS):
+        """Initalizes the accumulator and counters.
+
+        Args:
+            rate: positive float/int, the amount of steps per second
+            max_substeps: positive int, the most steps that are run per frame
+        """
+        if rate <= 0:
+            raise ValueError("The rate of a FixedTimestep must be positive!")
+        if max_substeps < 1:
+            raise ValueError("A FixedTimestep must run at least one step per \
+                                frame!")
+
+        self.rate = float(rate)
+        self.step = 1.0 / self.rate
+        self.max_substeps = int(max_substeps)
+
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+        self.steps = 0
+        self.extra_steps = 0
+        self.dropped_steps = 0
+
+    def advance(self, dt, step_function):
+        """Calls `step_function` for every full step that fits into `dt`.
+
+        Args:
+            dt: the time that passed since the last frame in seconds
+            step_function: function taking the length of a step in seconds
+
+        Returns:
+            `alpha`, the fraction of a step that is left over.
+        """
+        # Time can't go backwards
+        if dt > 0:
+            self.accumulator += dt
+
+        substeps = 0
+        while self.accumulator >= self.step and substeps < self.max_substeps:
+            step_function(self.step)
+            self.accumulator -= self.step
+            substeps += 1
+
+        self.steps += substeps
+        if substeps > 1:
+            self.extra_steps += substeps - 1
+
+        # Still behind after the maximum amount of steps, giving up on the
+        # whole steps that are left so that they don't pile up
+        if self.accumulator >= self.step:
+            dropped = int(self.accumulator // self.step)
+            self.dropped_steps += dropped
+            self.accumulator -= dropped * self.step
+
+        self.alpha = self.accumulator / self.step
+        return self.alpha
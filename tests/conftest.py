@@ -0,0 +1,7 @@
+# The game's modules are in 'src', next to this folder, and are imported
+# by their names like the game does (`from mathf import ...`)
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
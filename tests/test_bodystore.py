@@ -0,0 +1,69 @@
+"""Tests for bodystore.py, comparing the NumPy `integrate` to the plain
+loop."""
+import random
+
+import pytest
+
+import bodystore
+from bodystore import BodyStore, FLAG_ACTIVE, FLAG_SLEEPING, \
+    VECTORIZE_THRESHOLD
+
+def random_store(seed, count):
+    """Gets a store with `count` random bodies, and a few released ones."""
+    generator = random.Random(seed)
+    store = BodyStore()
+    for _ in range(count):
+        store.allocate(generator.uniform(-500, 500),
+                        generator.uniform(-500, 500),
+                        generator.uniform(1, 60), generator.uniform(1, 60),
+                        generator.uniform(-20, 20), generator.uniform(-20, 20))
+    for index in generator.sample(range(count), count // 10):
+        store.release(index)
+    return store
+
+def state(store):
+    """Gets every array of `store` as lists."""
+    return [list(store.x), list(store.y), list(store.velocity_x),
+            list(store.velocity_y)]
+
+@pytest.mark.skipif(bodystore.numpy is None, reason="needs NumPy")
+@pytest.mark.parametrize("seed", range(5))
+def test_numpy_integrate_matches_loop(seed, monkeypatch):
+    count = VECTORIZE_THRESHOLD * 8
+    vectorized = random_store(seed, count)
+    looped = random_store(seed, count)
+    generator = random.Random(seed)
+    for _ in range(30):
+        indices = generator.sample(range(count),
+                                    generator.randint(VECTORIZE_THRESHOLD,
+                                                        count))
+        times = [generator.choice((1.0, 0.0, generator.random()))
+                    for _ in indices]
+        vectorized.integrate(indices, times)
+        with monkeypatch.context() as patch:
+            patch.setattr(bodystore, "numpy", None)
+            looped.integrate(indices, times)
+        assert state(vectorized) == state(looped)
+
+def test_integrate_scales_velocity_then_moves():
+    store = BodyStore()
+    index = store.allocate(1.0, 2.0, 3.0, 4.0, 10.0, -4.0)
+    store.integrate([index], [0.5])
+    assert (store.velocity_x[index], store.velocity_y[index]) == (5.0, -2.0)
+    assert (store.x[index], store.y[index]) == (6.0, 0.0)
+
+def test_released_indices_are_reused():
+    store = BodyStore()
+    first = store.allocate(0, 0, 1, 1, 5.0, 5.0)
+    assert store.allocate(0, 0, 1, 1) == 1
+    store.release(first)
+    # Releasing twice doesn't free the index twice
+    store.release(first)
+    assert len(store) == 1
+    assert store.allocate(7, 8, 1, 1, flags=FLAG_SLEEPING) == first
+    assert store.flags[first] == FLAG_ACTIVE | FLAG_SLEEPING
+    assert (store.velocity_x[first], store.x[first]) == (0.0, 7.0)
+    assert store.allocate(0, 0, 1, 1) == 2
+    assert store.capacity == 3
+    store.clear()
+    assert len(store) == 0 and store.capacity == 0
@@ -0,0 +1,198 @@
+"""Tests for broadphase.py, comparing the grid and the tree to looking at
+every rectangle."""
+import math
+import random
+
+import pytest
+
+from broadphase import AABBTree, UniformGrid, _NULL
+from mathf import PhysicsWorld, RigidBody2D, Rectanglef, Vector2f, STATIC, \
+    KINEMATIC, DYNAMIC
+
+def touching(a, b):
+    """Checks if two (x, y, width, height) overlap or touch."""
+    return a[0] <= b[0] + b[2] and b[0] <= a[0] + a[2] and \
+        a[1] <= b[1] + b[3] and b[1] <= a[1] + a[3]
+
+def random_rect(generator):
+    return (generator.uniform(0, 5000), generator.uniform(0, 5000),
+            generator.uniform(5, 80), generator.uniform(5, 80))
+
+def random_query(generator):
+    return (generator.uniform(0, 5000), generator.uniform(0, 5000),
+            generator.uniform(0, 300), generator.uniform(0, 300))
+
+def test_grid_query_finds_everything_touching():
+    generator = random.Random(1)
+    grid = UniformGrid(100.0)
+    rects = dict()
+    for item in range(500):
+        rects[item] = random_rect(generator)
+        grid.insert(item, *rects[item])
+    for item in range(0, 500, 3):
+        rects[item] = random_rect(generator)
+        grid.move(item, *rects[item])
+    for item in range(0, 500, 7):
+        del rects[item]
+        grid.remove(item)
+    assert len(grid) == len(rects)
+    for _ in range(200):
+        query = random_query(generator)
+        found = grid.query(*query)
+        for item, rect in rects.items():
+            if touching(query, rect):
+                assert item in found
+
+def test_grid_cell_size_must_be_positive():
+    with pytest.raises(ValueError):
+        UniformGrid(0)
+
+def check_tree(tree, rects, generator):
+    """Compares every query of `tree` to looking at every one of `rects`."""
+    assert len(tree) == len(rects)
+    # Staying balanced enough for queries to be O(log n)
+    assert tree.height <= 2 * math.log2(max(2, len(tree))) + 2
+
+    for item, rect in rects.items():
+        assert item in tree
+        assert tree.fat_contains(item, *rect)
+
+    queries = [random_query(generator) for _ in range(50)]
+    many = tree.query_many(queries)
+    for query, found in zip(queries, many):
+        assert tree.query(*query) == found
+        for item, rect in rects.items():
+            if touching(query, rect):
+                assert item in found
+        # Nothing whose fat bounds don't touch the query
+        for item in found:
+            assert touching(query, tree.fat_bounds(item))
+
+    fat = dict((item, tree.fat_bounds(item)) for item in rects)
+    for item in list(rects)[:200]:
+        assert tree.neighbors(item) == set(
+            other for other, bounds in fat.items()
+            if other != item and touching(fat[item], bounds))
+    pairs = tree.pairs()
+    assert len(pairs) == len(set(frozenset(pair) for pair in pairs))
+    assert len(pairs) == sum(len(tree.neighbors(item)) for item in rects) // 2
+
+@pytest.mark.parametrize("seed", range(3))
+def test_tree_matches_brute_force(seed):
+    generator = random.Random(seed)
+    tree = AABBTree()
+    rects = dict()
+    for step in range(6000):
+        choice = generator.random()
+        if choice < 0.3 or not rects:
+            item = generator.randrange(2000)
+            rects[item] = random_rect(generator)
+            tree.insert(item, *rects[item], generator.uniform(-10, 10),
+                        generator.uniform(-10, 10))
+        elif choice < 0.8:
+            item = generator.choice(list(rects))
+            x, y, width, height = rects[item]
+            velocity_x = generator.uniform(-10, 10)
+            velocity_y = generator.uniform(-10, 10)
+            rects[item] = (x + velocity_x, y + velocity_y, width, height)
+            tree.move(item, *rects[item], velocity_x, velocity_y)
+        else:
+            item = generator.choice(list(rects))
+            del rects[item]
+            tree.remove(item)
+        if step % 1000 == 999:
+            check_tree(tree, rects, generator)
+
+def check_balanced(tree):
+    """Checks that the children of every node are at most one level apart,
+    and that the tree is no taller than that allows."""
+    for node in tree._leaves.values():
+        parent = tree._parent[node]
+        while parent != _NULL:
+            assert abs(tree._height[tree._left[parent]] -
+                        tree._height[tree._right[parent]]) <= 1
+            parent = tree._parent[parent]
+    assert tree.height <= 2 * math.log2(max(2, len(tree))) + 2
+
+@pytest.mark.parametrize("layout", ["sorted", "nested", "doubling", "far"])
+def test_tree_stays_balanced(layout):
+    tree = AABBTree()
+    generator = random.Random(6)
+    for item in range(400):
+        if layout == "sorted":
+            rect = (item * 10.0, 0.0, 5.0, 5.0)
+        elif layout == "nested":
+            # Every rectangle around all of the ones before it
+            rect = (-item * 10.0, -item * 10.0, item * 20.0 + 5,
+                    item * 20.0 + 5)
+        elif layout == "doubling":
+            rect = (2.0 ** (item / 4.0), 0.0, 5.0, 5.0)
+        else:
+            # A cluster, then every tenth one far away from everything
+            rect = (generator.uniform(0, 100), generator.uniform(0, 100), 5.0,
+                    5.0)
+            if item % 10 == 9:
+                rect = (1e6 * item, 1e6, 5.0, 5.0)
+        tree.insert(item, *rect)
+        check_balanced(tree)
+
+def test_tree_clear_and_remove_missing():
+    tree = AABBTree()
+    tree.insert("a", 0, 0, 10, 10)
+    tree.insert("b", 5, 5, 10, 10)
+    assert tree.neighbors("a") == {"b"}
+    tree.remove("missing")
+    tree.remove("b")
+    assert tree.neighbors("a") == set()
+    tree.clear()
+    assert len(tree) == 0 and tree.height == 0
+    assert tree.query(0, 0, 100, 100) == set()
+
+def test_tree_margins_must_not_be_negative():
+    with pytest.raises(ValueError):
+        AABBTree(margin=-1)
+
+def make_world(brute_force):
+    """Makes a world of static, kinematic and dynamic rigidbodies, that
+    looks at every rigidbody instead of the broadphase if `brute_force`."""
+    world = PhysicsWorld()
+    if brute_force:
+        world.nearby = lambda rigidbody: [other for other in world.rigidbodies
+                                            if other is not rigidbody]
+    generator = random.Random(7)
+    bodies = []
+    for index in range(200):
+        body_type = (STATIC, KINEMATIC, DYNAMIC, DYNAMIC)[index % 4]
+        body = RigidBody2D(Rectanglef(
+            position=Vector2f((generator.uniform(0, 1500),
+                                generator.uniform(0, 1500))),
+            size=Vector2f((generator.uniform(10, 60),
+                            generator.uniform(10, 60)))), world, body_type)
+        if body_type != STATIC:
+            body.velocity = (generator.uniform(-12, 12),
+                                generator.uniform(-12, 12))
+        bodies.append(body)
+    return world, bodies
+
+def test_world_broadphase_matches_brute_force():
+    world, bodies = make_world(False)
+    brute_world, brute_bodies = make_world(True)
+    for step in range(60):
+        if step % 20 == 10:
+            # Changing direction, so that bodies leave their fat bounds
+            generator = random.Random(step)
+            for body, brute_body in zip(bodies, brute_bodies):
+                if body.body_type != STATIC:
+                    velocity = (generator.uniform(-20, 20), 3.0)
+                    body.velocity = velocity
+                    brute_body.velocity = velocity
+        world.Update(1.0 / 60.0)
+        brute_world.Update(1.0 / 60.0)
+    assert list(world.store.x) == list(brute_world.store.x)
+    assert list(world.store.y) == list(brute_world.store.y)
+
+    # Changing the body type moves it between the grid and the tree
+    bodies[1].body_type = STATIC
+    assert world._refs[bodies[1]] in world.grid
+    bodies[0].body_type = DYNAMIC
+    assert world._refs[bodies[0]] in world.tree
@@ -0,0 +1,31 @@
+"""Tests for the input scripts of headless.py."""
+import pytest
+
+from headless import parse_inputs
+
+def test_steps_and_keys():
+    script = ["# Walk right, wait, then jump left",
+                "3 d",
+                "",
+                "2   # nothing pressed",
+                "  1 a w  ",
+                "0 d"]
+    steps = list(parse_inputs(script))
+    assert steps == [frozenset("d")] * 3 + [frozenset()] * 2 + \
+                    [frozenset(("a", "w"))]
+
+def test_is_lazy():
+    # A long script isn't made into a list of every step up front
+    steps = parse_inputs(["1000000000 d"])
+    assert next(steps) == frozenset("d")
+
+def test_empty_script():
+    assert list(parse_inputs([])) == []
+    assert list(parse_inputs(["# only a comment", "   "])) == []
+
+@pytest.mark.parametrize("line", ["d 10", "1.5 d", "-2 a"])
+def test_bad_lines(line):
+    with pytest.raises(ValueError) as error:
+        list(parse_inputs(["10 d", "# comment", line]))
+    # The line number counts comments too
+    assert "Line 3" in str(error.value)
@@ -0,0 +1,71 @@
+"""Tests for LevelCache (levelcache.py), which levels it keeps built and
+when it tears them down."""
+import pytest
+
+from levelcache import LevelCache
+from leveldata import LevelData
+
+NAMES = ["level" + str(number) for number in range(6)]
+
+def level_cache(capacity):
+    """A cache of `NAMES`, as (cache, built, unloaded), where `built` and
+    `unloaded` list the names of the levels in the order it happened."""
+    built = []
+    unloaded = []
+
+    def build(level):
+        built.append(level.name)
+        return "built " + level.name
+
+    def unload(level):
+        unloaded.append(level)
+
+    cache = LevelCache([LevelData(name, [["None"]]) for name in NAMES], build,
+                        unload, capacity)
+    return cache, built, unloaded
+
+def test_builds_once():
+    cache, built, unloaded = level_cache(2)
+    assert cache.get("level0") == "built level0"
+    assert cache.get("level0") == "built level0"
+    assert built == ["level0"] and unloaded == []
+    assert "level0" in cache and "level1" not in cache
+    with pytest.raises(KeyError):
+        cache.get("no level")
+
+def test_evicts_least_recently_used():
+    cache, built, unloaded = level_cache(2)
+    cache.get("level0")
+    cache.get("level1")
+    cache.get("level0")
+    cache.get("level2")
+    assert unloaded == ["built level1"]
+    assert "level0" in cache and "level2" in cache and len(cache) == 2
+
+def test_keeps_the_current_level():
+    cache, built, unloaded = level_cache(2)
+    # level0 is on screen the whole time, and the least recently used
+    cache.get("level0")
+    for name in NAMES[1:]:
+        cache.get(name, keep=("level0",))
+        assert len(cache) == 2
+        assert "level0" in cache and name in cache
+    assert unloaded == ["built " + name for name in NAMES[1:-1]]
+
+def test_unloads_every_level_once():
+    cache, built, unloaded = level_cache(1)
+    for _ in range(3):
+        for name in NAMES:
+            cache.get(name)
+    # The cache only keeps one level, so every other get evicts one
+    assert len(built) == len(NAMES) * 3
+    assert len(unloaded) == len(built) - 1
+    assert cache.evict() == []
+    cache.clear()
+    assert len(cache) == 0
+    assert sorted(unloaded) == sorted("built " + name for name in built)
+    assert len(unloaded) == len(built)
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        level_cache(0)
@@ -0,0 +1,144 @@
+"""Tests for levelpack.py, compiling random levels and reading them back."""
+import os
+import random
+import struct
+
+import pytest
+
+import leveldata
+from leveldata import LevelData, levels_path, read_levels, TILE_SIZE, \
+    LEVELS_PATH, PACK_PATH
+from levelpack import LevelPack, file_digest, write_pack, VERSION, _HEADER, \
+    _SOURCE
+
+# The root of the repository, where the game is started from
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+BLOCKS = ("None", "dirt", "stone", "grass")
+
+def random_levels(seed):
+    """Gets a few random levels, with long runs and single tiles."""
+    generator = random.Random(seed)
+    levels = []
+    for index in range(3):
+        width = generator.randint(1, 80)
+        height = generator.randint(1, 30)
+        rows = []
+        for _ in range(height):
+            row = []
+            while len(row) < width:
+                row.extend([generator.choice(BLOCKS)] *
+                            generator.choice((1, 1, 5, 40)))
+            rows.append(row[:width])
+        levels.append(LevelData("level " + str(index), rows))
+    return levels
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pack_matches_levels(tmp_path, seed):
+    levels = random_levels(seed)
+    path = str(tmp_path / "levels.lvlpack")
+    write_pack(levels, path)
+    packed = read_levels(path)
+    assert [level.name for level in packed] == \
+        [level.name for level in levels]
+    for level, packed_level in zip(levels, packed):
+        assert (packed_level.width, packed_level.height) == \
+            (level.width, level.height)
+        assert packed_level.rows == level.rows
+        tilemap = packed_level.tilemap(TILE_SIZE)
+        expected = level.tilemap(TILE_SIZE)
+        assert list(tilemap.colliders()) == list(expected.colliders())
+
+def test_source_digest(tmp_path):
+    path = str(tmp_path / "levels.lvlpack")
+    write_pack(random_levels(0), path)
+    assert LevelPack(path).source_digest is None
+
+    source = tmp_path / "levels.json"
+    source.write_text("{}")
+    write_pack(random_levels(0), path, file_digest(str(source)))
+    assert LevelPack(path).source_digest == file_digest(str(source))
+
+def test_levels_path(tmp_path, monkeypatch):
+    json_path = tmp_path / "levels.json"
+    pack_path = tmp_path / "levels.lvlpack"
+    monkeypatch.setattr(leveldata, "LEVELS_PATH", str(json_path))
+    monkeypatch.setattr(leveldata, "PACK_PATH", str(pack_path))
+
+    json_path.write_text('{"levels": []}')
+    assert levels_path() == str(json_path)
+    write_pack(random_levels(1), str(pack_path), file_digest(str(json_path)))
+    assert levels_path() == str(pack_path)
+
+    # Changed with the same modified time
+    stat = os.stat(str(json_path))
+    json_path.write_text('{"levels": [ ]}')
+    os.utime(str(json_path), (stat.st_atime, stat.st_mtime))
+    assert levels_path() == str(json_path)
+
+    # Compiled from a different file, even if it's newer
+    write_pack(random_levels(1), str(pack_path))
+    assert levels_path() == str(json_path)
+
+    os.remove(str(json_path))
+    assert levels_path() == str(pack_path)
+
+def test_runs_must_fill_the_level(tmp_path):
+    path = str(tmp_path / "levels.lvlpack")
+    write_pack(random_levels(2), path)
+    with open(path, "r+b") as file:
+        # Making the first level one column wider in the index
+        position = _HEADER.size + _SOURCE.size + 8
+        file.seek(position)
+        width, = struct.unpack("<I", file.read(4))
+        file.seek(position)
+        file.write(struct.pack("<I", width + 1))
+    level = read_levels(path)[0]
+    with pytest.raises(ValueError):
+        level.tilemap(TILE_SIZE)
+    with pytest.raises(ValueError):
+        level.rows
+
+def test_not_a_pack(tmp_path):
+    path = tmp_path / "empty.lvlpack"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        LevelPack(str(path))
+    path.write_bytes(_HEADER.pack(b"MLVL", VERSION, 1))
+    with pytest.raises(ValueError):
+        LevelPack(str(path))
+    # Other versions aren't read, even if the rest would fit
+    path.write_bytes(_HEADER.pack(b"MLVL", VERSION - 1, 0) +
+                        bytes(_SOURCE.size))
+    with pytest.raises(ValueError):
+        LevelPack(str(path))
+    # An index that is cut off
+    path.write_bytes(_HEADER.pack(b"MLVL", VERSION, 2) +
+                        bytes(_SOURCE.size) + bytes(5))
+    with pytest.raises(ValueError):
+        LevelPack(str(path))
+
+def test_cut_off_pack_falls_back_to_json(tmp_path, monkeypatch):
+    json_path = tmp_path / "levels.json"
+    pack_path = tmp_path / "levels.lvlpack"
+    monkeypatch.setattr(leveldata, "LEVELS_PATH", str(json_path))
+    monkeypatch.setattr(leveldata, "PACK_PATH", str(pack_path))
+    json_path.write_text('{"levels": []}')
+    pack_path.write_bytes(_HEADER.pack(b"MLVL", VERSION, 2) +
+                            file_digest(str(json_path)) + bytes(5))
+    assert levels_path() == str(json_path)
+
+def test_line_endings_dont_change_the_digest(tmp_path):
+    unix = tmp_path / "unix.json"
+    windows = tmp_path / "windows.json"
+    unix.write_bytes(b'{\n    "levels": []\n}\n')
+    windows.write_bytes(b'{\r\n    "levels": []\r\n}\r\n')
+    assert file_digest(str(unix)) == file_digest(str(windows))
+
+def test_shipped_pack_is_up_to_date(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    assert levels_path() == PACK_PATH
+    packed = read_levels(PACK_PATH)
+    levels = read_levels(LEVELS_PATH)
+    assert [level.rows for level in packed] == \
+        [level.rows for level in levels]
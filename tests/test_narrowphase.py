@@ -0,0 +1,256 @@
+"""Tests for narrowphase.py, comparing the batch functions to testing one
+pair at a time."""
+import math
+import random
+
+import pytest
+
+import narrowphase
+from narrowphase import RECT, CIRCLE, OVERLAP_TESTS, SWEPT_TESTS, \
+    swept_aabb, swept_aabb_batch, _swept_aabb_loop, collide_swept_batch, \
+    _swept_shapes_loop, swept_circle_rect, swept_rect_circle, \
+    swept_circle_circle, overlap_circle_rect, overlap_circle_circle, \
+    swept_shapes, overlap_shapes
+from mathf import Circlef, Rectanglef, Vector2f, collide_shapes, \
+    collide_swept
+
+needs_numpy = pytest.mark.skipif(narrowphase.numpy is None,
+                                    reason="needs NumPy")
+
+def random_rect(generator, spread=200.0):
+    """Gets a random (x, y, width, height)."""
+    return (generator.uniform(-spread, spread),
+            generator.uniform(-spread, spread),
+            generator.uniform(0.0, 60.0), generator.uniform(0.0, 60.0))
+
+def random_velocity(generator, speed=150.0):
+    """Gets a random (x, y) velocity, sometimes 0 on an axis."""
+    velocity_x = generator.uniform(-speed, speed)
+    velocity_y = generator.uniform(-speed, speed)
+    if generator.random() < 0.2:
+        velocity_x = 0.0
+    if generator.random() < 0.2:
+        velocity_y = 0.0
+    return velocity_x, velocity_y
+
+def make_rect(x, y, width, height):
+    return Rectanglef(position=Vector2f((x, y)),
+                        size=Vector2f((width, height)))
+
+def brute_force(rect, velocity, others):
+    """The earliest `swept_aabb` time and it's index, one at a time."""
+    time = 1
+    index = -1
+    for other_index, other in enumerate(others):
+        other_time = swept_aabb(*(rect + velocity + other))
+        if other_time < time:
+            time = other_time
+            index = other_index
+    return time, index
+
+def test_swept_aabb_hit_and_miss():
+    # Moving right into a rectangle 10 away, with a velocity of 20
+    assert swept_aabb(0, 0, 10, 10, 20, 0, 20, 0, 10, 10) == 0.5
+    # Passing above it
+    assert swept_aabb(0, 20, 10, 10, 20, 0, 20, 0, 10, 10) == 1
+    # Only touching on the side that it moves along
+    assert swept_aabb(0, 10, 10, 10, 20, 0, 5, 0, 10, 10) == 1
+    # Already overlapping doesn't collide
+    assert swept_aabb(0, 0, 10, 10, 5, 0, 5, 5, 10, 10) == 1
+
+@needs_numpy
+def test_swept_aabb_batch_matches_one_by_one():
+    generator = random.Random(4)
+    for _ in range(500):
+        rect = random_rect(generator)
+        velocity = random_velocity(generator)
+        others = [random_rect(generator)
+                    for _ in range(generator.randint(1, 40))]
+        time, index = swept_aabb_batch(*(rect + velocity),
+                                        [other[:2] for other in others],
+                                        [other[2:] for other in others])
+        expected_time, expected_index = brute_force(rect, velocity, others)
+        assert time == pytest.approx(expected_time, abs=1e-12)
+        assert index == expected_index
+
+def test_swept_aabb_loop_matches_one_by_one():
+    # The batch without NumPy
+    generator = random.Random(5)
+    for _ in range(200):
+        rect = random_rect(generator)
+        velocity = random_velocity(generator)
+        others = [random_rect(generator)
+                    for _ in range(generator.randint(1, 40))]
+        assert _swept_aabb_loop(*(rect + velocity),
+                                [other[:2] for other in others],
+                                [other[2:] for other in others]) == \
+            brute_force(rect, velocity, others)
+
+@needs_numpy
+def test_swept_aabb_batch_empty():
+    assert swept_aabb_batch(0, 0, 10, 10, 5, 5, [], []) == (1, -1)
+
+def test_collide_swept_batch_matches_collide_swept():
+    generator = random.Random(6)
+    for _ in range(300):
+        collider = make_rect(*random_rect(generator))
+        velocity = Vector2f(random_velocity(generator))
+        shapes = [make_rect(*random_rect(generator))
+                    for _ in range(generator.randint(0, 40))]
+        time, index = collide_swept_batch(collider, velocity, shapes)
+        assert time == pytest.approx(collide_swept(collider, velocity,
+                                                    shapes), abs=1e-12)
+        if index >= 0:
+            assert collide_swept(collider, velocity, [shapes[index]]) == \
+                pytest.approx(time, abs=1e-12)
+        else:
+            assert time == 1
+
+def first_overlap(overlap, steps=4000):
+    """Gets the first time (in steps of 1/`steps`) that `overlap(time)` is
+    True, 1 if it never is or already is at 0."""
+    if overlap(0.0):
+        return 1
+    for step in range(1, steps + 1):
+        if overlap(step / float(steps)):
+            return step / float(steps)
+    return 1
+
+def test_swept_circle_rect_matches_stepping():
+    generator = random.Random(7)
+    for _ in range(300):
+        center_x = generator.uniform(-50, 50)
+        center_y = generator.uniform(-50, 50)
+        radius = generator.uniform(1, 15)
+        velocity_x, velocity_y = random_velocity(generator, 80.0)
+        x, y, width, height = random_rect(generator, 40.0)
+        time = swept_circle_rect(center_x, center_y, radius, velocity_x,
+                                    velocity_y, x, y, width, height)
+        expected = first_overlap(lambda time: overlap_circle_rect(
+            center_x + velocity_x * time, center_y + velocity_y * time,
+            radius, x, y, width, height))
+        # Up to one step early, the stepping only finds it after
+        assert expected - 1.0 / 4000 <= time <= expected or \
+            (expected == 1 and time > 0.999)
+        # A rectangle into a circle is the circle moving the other way
+        assert swept_rect_circle(x, y, width, height, -velocity_x,
+                                    -velocity_y, center_x, center_y,
+                                    radius) == time
+
+def test_swept_circle_circle_matches_stepping():
+    generator = random.Random(8)
+    for _ in range(300):
+        center_x = generator.uniform(-50, 50)
+        center_y = generator.uniform(-50, 50)
+        radius = generator.uniform(1, 15)
+        velocity_x, velocity_y = random_velocity(generator, 80.0)
+        other_x = generator.uniform(-40, 40)
+        other_y = generator.uniform(-40, 40)
+        other_radius = generator.uniform(1, 15)
+        time = swept_circle_circle(center_x, center_y, radius, velocity_x,
+                                    velocity_y, other_x, other_y,
+                                    other_radius)
+        expected = first_overlap(lambda time: overlap_circle_circle(
+            center_x + velocity_x * time, center_y + velocity_y * time,
+            radius, other_x, other_y, other_radius))
+        assert expected - 1.0 / 4000 <= time <= expected or \
+            (expected == 1 and time > 0.999)
+
+def test_circle_edge_cases():
+    # Straight into the side, and into a corner at 45 degrees
+    assert swept_circle_rect(0, 5, 5, 20, 0, 10, 0, 10, 10) == 0.25
+    corner = swept_circle_rect(0, 0, 5, 20, 20, 10, 10, 10, 10)
+    assert corner == pytest.approx((10 - 5 / 2 ** 0.5) / 20)
+    # Sliding along the top only touches it
+    assert swept_circle_rect(0, 15, 5, 30, 0, 10, 0, 10, 10) == 1
+    # Touching and moving into it hits at once
+    assert swept_circle_rect(5, 5, 5, 5, 0, 10, 0, 10, 10) == 0
+    # Overlapping doesn't collide, like swept_aabb
+    assert swept_circle_circle(0, 0, 5, 10, 0, 6, 0, 5) == 1
+    assert not overlap_circle_circle(0, 0, 5, 10, 0, 5)
+    assert not overlap_circle_rect(0, 0, 5, 5, -10, 10, 20)
+
+def random_shape(generator):
+    """Gets a random Circlef or Rectanglef."""
+    position = Vector2f((generator.uniform(-100, 100),
+                            generator.uniform(-100, 100)))
+    if generator.random() < 0.5:
+        return Circlef(generator.uniform(1, 20), position)
+    return Rectanglef(position=position,
+                        size=Vector2f((generator.uniform(1, 40),
+                                        generator.uniform(1, 40))))
+
+def test_every_pair_of_kinds_has_tests():
+    pairs = set((kind, other) for kind in (RECT, CIRCLE)
+                for other in (RECT, CIRCLE))
+    assert set(OVERLAP_TESTS) == pairs
+    assert set(SWEPT_TESTS) == pairs
+
+def test_shape_dispatch_matches_float_tests():
+    generator = random.Random(9)
+    for _ in range(500):
+        shape = random_shape(generator)
+        other = random_shape(generator)
+        velocity_x, velocity_y = random_velocity(generator, 100.0)
+        time = swept_shapes(shape, velocity_x, velocity_y, other)
+        overlapping = overlap_shapes(shape, other)
+        assert overlap_shapes(other, shape) == overlapping
+        if shape.kind == RECT and other.kind == RECT:
+            assert time == swept_aabb(*(tuple(shape.position) +
+                                        tuple(shape.size) +
+                                        (velocity_x, velocity_y) +
+                                        tuple(other.position) +
+                                        tuple(other.size)))
+        elif shape.kind == CIRCLE and other.kind == CIRCLE:
+            assert time == swept_circle_circle(
+                shape.center.x, shape.center.y, shape.radius, velocity_x,
+                velocity_y, other.center.x, other.center.y, other.radius)
+        elif shape.kind == CIRCLE:
+            assert time == swept_circle_rect(
+                shape.center.x, shape.center.y, shape.radius, velocity_x,
+                velocity_y, *(tuple(other.position) + tuple(other.size)))
+        else:
+            assert time == swept_rect_circle(
+                *(tuple(shape.position) + tuple(shape.size) +
+                    (velocity_x, velocity_y, other.center.x, other.center.y,
+                    other.radius)))
+
+def test_mixed_batch_matches_collide_swept():
+    generator = random.Random(10)
+    for _ in range(300):
+        collider = random_shape(generator)
+        velocity = Vector2f(random_velocity(generator, 100.0))
+        shapes = [random_shape(generator)
+                    for _ in range(generator.randint(0, 40))]
+        time, index = collide_swept_batch(collider, velocity, shapes)
+        expected = collide_swept(collider, velocity, shapes)
+        assert time == pytest.approx(expected, abs=1e-9)
+        assert _swept_shapes_loop(collider, velocity.x, velocity.y,
+                                    shapes)[0] == expected
+        if index >= 0:
+            assert swept_shapes(collider, velocity.x, velocity.y,
+                                shapes[index]) == pytest.approx(time,
+                                                                abs=1e-9)
+
+def test_collide_shapes():
+    circle = Circlef(5, Vector2f((0, 0)))
+    near = Rectanglef(position=Vector2f((5, 0)), size=Vector2f((4, 4)))
+    far = Rectanglef(position=Vector2f((100, 0)), size=Vector2f((4, 4)))
+    other_circle = Circlef(3, Vector2f((9, 0)))
+    assert collide_shapes(circle, near, far, other_circle) == \
+        {near, other_circle}
+    assert collide_shapes(circle, far) is None
+    with pytest.raises(AssertionError):
+        collide_shapes(circle)
+
+def test_circlef():
+    circle = Circlef(5, Vector2f((1, 2)))
+    assert tuple(circle.size) == (10.0, 10.0)
+    assert tuple(circle.center) == (6.0, 7.0)
+    assert circle.area == pytest.approx(math.pi * 25)
+    circle.radius = -3
+    assert circle.radius == 3
+    circle.diameter = 5000
+    assert circle.radius == 500
+    circle.size = Vector2f((8, 8))
+    assert circle.diameter == 8
@@ -0,0 +1,90 @@
+"""Tests for profiler.py, the percentiles of RollingStats and what the
+physics counts in a frame."""
+import pytest
+
+from mathf import PhysicsWorld, RigidBody2D, Rectanglef, Vector2f, DYNAMIC, \
+    KINEMATIC
+from profiler import RollingStats, FrameProfiler, frame_profiler
+
+@pytest.fixture
+def profiler():
+    """The game's profiler, on and empty, turned off again afterwards."""
+    frame_profiler.reset()
+    frame_profiler.enable()
+    yield frame_profiler
+    frame_profiler.disable()
+    frame_profiler.reset()
+
+def test_percentiles():
+    stats = RollingStats(size=101)
+    assert stats.percentile(50) is None
+    assert stats.summary()["p50"] is None
+    for value in range(101):
+        stats.add(value)
+    assert stats.percentile(0) == 0
+    assert stats.percentile(50) == 50
+    assert stats.percentile(95) == 95
+    assert stats.percentile(100) == 100
+    summary = stats.summary(scale=2.0)
+    assert summary["count"] == 101
+    assert summary["mean"] == 100.0
+    assert (summary["p50"], summary["p99"], summary["max"]) == (100, 198, 200)
+
+def test_only_keeps_the_window():
+    stats = RollingStats(size=10)
+    for value in range(100, 0, -1):
+        stats.add(value)
+    assert len(stats) == 10 and stats.total == 100
+    assert stats.percentile(0) == 1 and stats.percentile(100) == 10
+    with pytest.raises(ValueError):
+        RollingStats(size=0)
+
+def test_frames_without_a_counter_count_as_zero():
+    profiler = FrameProfiler(window=4)
+    profiler.enable()
+    for frame in range(4):
+        profiler.begin_frame()
+        if frame % 2 == 0:
+            profiler.count("things", 3)
+        profiler.end_frame()
+    assert list(profiler.counters["things"].samples) == [3, 0, 3, 0]
+    assert "net_blocks" in profiler.counters
+    assert profiler.rows()[0][:2] == ["kind", "name"]
+
+def moving_world():
+    """A world with a moving dynamic and kinematic rigidbody, and one
+    dynamic rigidbody that stays still."""
+    physics_world = PhysicsWorld()
+    bodies = [RigidBody2D(Rectanglef(position=Vector2f((x, 0)),
+                                        size=Vector2f((20, 20))),
+                            physics_world, body_type)
+                for x, body_type in ((0, DYNAMIC), (100, KINEMATIC),
+                                    (200, DYNAMIC))]
+    bodies[0].velocity = (1, 0)
+    bodies[1].velocity = (0, 1)
+    return physics_world, bodies
+
+def test_counts_stepped_bodies(profiler):
+    physics_world, bodies = moving_world()
+    profiler.begin_frame()
+    physics_world.Update(1.0 / 60.0)
+    profiler.end_frame()
+    assert profiler.counters["bodies_stepped"].percentile(50) == 2
+    assert profiler.counters["bodies_awake"].percentile(50) == 3
+
+    # Nothing is counted once nothing moves
+    bodies[0].velocity = (0, 0)
+    bodies[1].velocity = (0, 0)
+    profiler.begin_frame()
+    physics_world.Update(1.0 / 60.0)
+    profiler.end_frame()
+    assert list(profiler.counters["bodies_stepped"].samples) == [2, 0]
+
+def test_nothing_is_counted_when_off():
+    assert not frame_profiler.enabled
+    physics_world, _ = moving_world()
+    frame_profiler.begin_frame()
+    physics_world.Update(1.0 / 60.0)
+    frame_profiler.end_frame()
+    assert frame_profiler.frames == 0
+    assert "bodies_stepped" not in frame_profiler.counters
@@ -0,0 +1,114 @@
+"""Tests for remote.py, reading a FakeRemote like the Arduino remote."""
+import time
+
+import pytest
+
+from remote import BUTTONS, FakeRemote, PacketDecoder, SerialRemote, \
+    encode_packet, pty
+
+needs_pty = pytest.mark.skipif(pty is None,
+                                reason="FakeRemote needs pseudo terminals")
+
+@pytest.fixture
+def remote():
+    """A started SerialRemote reading a FakeRemote, as (fake, remote)."""
+    fake = FakeRemote()
+    serial_remote = SerialRemote(fake.port)
+    serial_remote.start()
+    yield fake, serial_remote
+    serial_remote.close()
+    fake.close()
+
+def wait_for(serial_remote, packets, timeout=2.0):
+    """Polls until `packets` packets came in, like the game does every
+    frame, and returns the keys of every poll."""
+    polls = []
+    end = time.perf_counter() + timeout
+    while serial_remote.packets < packets and time.perf_counter() < end:
+        polls.append(serial_remote.poll())
+        time.sleep(0.005)
+    assert serial_remote.packets == packets
+    return polls
+
+def test_decoder_split_packets():
+    packet = encode_packet(7, 0b101, 123456)
+    decoder = PacketDecoder()
+    # One byte at a time
+    packets = []
+    for index in range(len(packet)):
+        packets += decoder.feed(packet[index:index + 1])
+    assert packets == [(7, 0b101, 123456)]
+    assert decoder.errors == 0
+
+def test_decoder_resyncs_after_garbage():
+    decoder = PacketDecoder()
+    first = encode_packet(1, 1, 10)
+    second = encode_packet(2, 3, 20)
+    # Garbage with a SYNC byte in it, then the end of a packet that the port
+    # was opened in the middle of
+    garbage = bytes([0x01, 0xAA, 0x55, 0x02]) + first[3:]
+    assert decoder.feed(garbage + first + second) == [(1, 1, 10), (2, 3, 20)]
+    assert decoder.errors == 1
+    # Clean packets after that don't count as errors
+    assert decoder.feed(encode_packet(3, 0, 30)) == [(3, 0, 30)]
+    assert decoder.errors == 1
+
+def test_decoder_bad_checksum():
+    decoder = PacketDecoder()
+    bad = bytearray(encode_packet(4, 1, 40))
+    bad[-1] ^= 0xFF
+    good = encode_packet(5, 2, 50)
+    assert decoder.feed(bytes(bad) + good) == [(5, 2, 50)]
+    assert decoder.errors == 1
+
+@needs_pty
+def test_press_and_release(remote):
+    fake, serial_remote = remote
+    assert serial_remote.running
+    fake.press("d")
+    polls = wait_for(serial_remote, 1)
+    assert polls[-1] == {"d"}
+    assert [change[1:] for change in serial_remote.changes] == [("d", True)]
+    fake.release("d")
+    polls = wait_for(serial_remote, 2)
+    assert polls[-1] == set()
+    assert [change[1:] for change in serial_remote.changes] == [("d", False)]
+    assert serial_remote.read_latency.summary()["count"] == 2
+
+@needs_pty
+def test_taps_are_merged(remote):
+    fake, serial_remote = remote
+    # Pressed and released again between two polls
+    fake.press("spacebar")
+    fake.release("spacebar")
+    end = time.perf_counter() + 2.0
+    while len(serial_remote._queue) < 2 and time.perf_counter() < end:
+        time.sleep(0.005)
+    assert serial_remote.poll() == {"spacebar"}
+    assert [change[1:] for change in serial_remote.changes] == \
+        [("spacebar", True), ("spacebar", False)]
+    # And not held down on the next poll
+    assert serial_remote.poll() == set()
+
+@needs_pty
+def test_lost_and_duplicate_packets(remote):
+    fake, serial_remote = remote
+    now = int(time.perf_counter() * 1000000)
+    for sequence in (254, 255, 2, 2):
+        # 255 to 2 wraps past two lost packets, and 2 again is a duplicate
+        fake.send(encode_packet(sequence, 1, now + sequence))
+    wait_for(serial_remote, 4)
+    assert serial_remote.lost == 2
+    assert serial_remote.duplicates == 1
+    assert serial_remote.errors == 0
+
+@needs_pty
+def test_close_stops_reading(remote):
+    fake, serial_remote = remote
+    serial_remote.close()
+    assert not serial_remote.running
+    assert serial_remote.error is None
+
+def test_buttons_match_keys():
+    # Every button of a packet is a key the player reads
+    assert set(BUTTONS) == {"a", "d", "spacebar"}
@@ -0,0 +1,40 @@
+"""Tests for textureatlas.py, reading back the atlas that it writes."""
+import os
+
+from textureatlas import build_atlas, read_png, read_uvs, write_png
+
+def write_image(path, width, height, seed):
+    """Writes a png where every pixel is different, and returns it's rows."""
+    rows = [b"".join(bytes((seed, x * 8, y * 8, 255)) for x in range(width))
+            for y in range(height)]
+    write_png(path, width, height, rows)
+    return rows
+
+def test_padding_repeats_the_edges(tmp_path):
+    images = dict()
+    expected = dict()
+    for seed, (name, width, height) in enumerate((("a", 5, 3), ("b", 4, 4),
+                                                    ("c", 2, 7))):
+        images[name] = str(tmp_path / (name + ".png"))
+        expected[name] = write_image(images[name], width, height, seed)
+    atlas_path = str(tmp_path / "atlas" / "test.atlas")
+    regions = build_atlas(images, atlas_path, padding=2)
+    atlas_width, atlas_height, pixels = read_png(
+        os.path.join(str(tmp_path / "atlas"), "test-0.png"))
+
+    for name, (x, y, width, height) in regions.items():
+        rows = expected[name]
+        top = atlas_height - y - height
+        for row in range(-2, height + 2):
+            for column in range(-2, width + 2):
+                inside_row = min(max(row, 0), height - 1)
+                inside_column = min(max(column, 0), width - 1)
+                offset = (x + column) * 4
+                assert pixels[top + row][offset:offset + 4] == \
+                    rows[inside_row][inside_column * 4:inside_column * 4 + 4]
+
+    png_path, uvs = read_uvs(atlas_path)
+    assert png_path.endswith("test-0.png")
+    x, y, width, height = regions["a"]
+    assert uvs["a"] == (x / atlas_width, y / atlas_height,
+                        (x + width) / atlas_width, (y + height) / atlas_height)
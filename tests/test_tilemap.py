@@ -0,0 +1,139 @@
+"""Tests for tilemap.py, comparing the merged rectangles and sweeps to
+looking at every tile."""
+from array import array
+import random
+
+import pytest
+
+from narrowphase import swept_aabb, swept_circle_rect
+from tilemap import TileMap, merge_rects
+
+TILE_SIZE = (30, 30)
+BLOCKS = ("None", "dirt", "stone")
+
+def random_tilemap(seed, width=40, height=20, density=0.4):
+    """Gets a TileMap with random blocks of `BLOCKS`."""
+    generator = random.Random(seed)
+    tiles = array("B", (generator.randrange(1, len(BLOCKS))
+                        if generator.random() < density else 0
+                        for _ in range(width * height)))
+    return TileMap(width, height, TILE_SIZE, BLOCKS, tiles)
+
+def covered(rects, width, height):
+    """Gets how many of `rects` cover every tile."""
+    counts = [0] * (width * height)
+    for rect in rects:
+        column, row, columns, rows = rect[:4]
+        for y in range(row, row + rows):
+            for x in range(column, column + columns):
+                counts[y * width + x] += 1
+    return counts
+
+@pytest.mark.parametrize("seed", range(20))
+def test_merge_rects_covers_every_solid_tile_once(seed):
+    tilemap = random_tilemap(seed, density=seed / 20.0)
+    rects = merge_rects(tilemap.tiles, tilemap.width, tilemap.height)
+    counts = covered(rects, tilemap.width, tilemap.height)
+    for index, tile in enumerate(tilemap.tiles):
+        assert counts[index] == (1 if tile else 0)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_merge_rects_same_block(seed):
+    tilemap = random_tilemap(seed)
+    rects = merge_rects(tilemap.tiles, tilemap.width, tilemap.height,
+                        same_block=True)
+    counts = covered(rects, tilemap.width, tilemap.height)
+    for index, tile in enumerate(tilemap.tiles):
+        assert counts[index] == (1 if tile else 0)
+    # Every rectangle is only one kind of block
+    for column, row, columns, rows, block in rects:
+        for y in range(row, row + rows):
+            for x in range(column, column + columns):
+                assert tilemap[x, y] == block
+
+def test_merge_rects_full_and_empty():
+    assert merge_rects(array("B", bytes(12)), 4, 3) == []
+    assert merge_rects(array("B", [1] * 12), 4, 3) == [(0, 0, 4, 3)]
+
+def test_colliders_follow_set_tile():
+    tilemap = TileMap(3, 1, TILE_SIZE, BLOCKS, array("B", [1, 1, 1]))
+    assert tilemap.colliders() == [(0, 0, 3, 1)]
+    tilemap.set_tile(1, 0, "None")
+    assert sorted(tilemap.colliders()) == [(0, 0, 1, 1), (2, 0, 1, 1)]
+    assert tilemap.collider_at(1, 0) is None
+
+def test_tiles_must_fit():
+    with pytest.raises(ValueError):
+        TileMap(3, 2, TILE_SIZE, BLOCKS, array("B", [0] * 5))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_matches_every_collider(seed):
+    tilemap = random_tilemap(seed, density=0.25)
+    rects = [tilemap.collider_rect(index)
+                for index in range(len(tilemap.colliders()))]
+    generator = random.Random(seed)
+    for _ in range(300):
+        x = generator.uniform(-60, tilemap.width * TILE_SIZE[0])
+        y = generator.uniform(-60, tilemap.height * TILE_SIZE[1])
+        width = generator.uniform(1, 50)
+        height = generator.uniform(1, 50)
+        velocity_x = generator.choice((0.0, generator.uniform(-90, 90)))
+        velocity_y = generator.choice((0.0, generator.uniform(-90, 90)))
+
+        expected = min([swept_aabb(x, y, width, height, velocity_x,
+                                    velocity_y, *rect) for rect in rects] +
+                        [1])
+        time, index = tilemap.sweep_collider(x, y, width, height, velocity_x,
+                                                velocity_y)
+        assert time == expected
+        if index >= 0:
+            assert swept_aabb(x, y, width, height, velocity_x, velocity_y,
+                                *rects[index]) == time
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_circle_matches_every_collider(seed):
+    tilemap = random_tilemap(seed, density=0.25)
+    rects = [tilemap.collider_rect(index)
+                for index in range(len(tilemap.colliders()))]
+    generator = random.Random(seed)
+    for _ in range(300):
+        center_x = generator.uniform(-60, tilemap.width * TILE_SIZE[0])
+        center_y = generator.uniform(-60, tilemap.height * TILE_SIZE[1])
+        radius = generator.uniform(1, 25)
+        velocity_x = generator.choice((0.0, generator.uniform(-90, 90)))
+        velocity_y = generator.choice((0.0, generator.uniform(-90, 90)))
+
+        expected = min([swept_circle_rect(center_x, center_y, radius,
+                                            velocity_x, velocity_y, *rect)
+                        for rect in rects] + [1])
+        time, index = tilemap.sweep_circle_collider(center_x, center_y,
+                                                    radius, velocity_x,
+                                                    velocity_y)
+        assert time == expected
+        assert tilemap.sweep_circle(center_x, center_y, radius, velocity_x,
+                                    velocity_y) == time
+        if index >= 0:
+            assert swept_circle_rect(center_x, center_y, radius, velocity_x,
+                                        velocity_y, *rects[index]) == time
+
+@pytest.mark.parametrize("seed", range(5))
+def test_overlap_matches_every_collider(seed):
+    tilemap = random_tilemap(seed, density=0.25)
+    rects = [tilemap.collider_rect(index)
+                for index in range(len(tilemap.colliders()))]
+    generator = random.Random(seed)
+    for _ in range(300):
+        x = generator.uniform(-60, tilemap.width * TILE_SIZE[0])
+        y = generator.uniform(-60, tilemap.height * TILE_SIZE[1])
+        # Sometimes lined up with the tiles, to test only touching
+        if generator.random() < 0.3:
+            x = round(x / TILE_SIZE[0]) * TILE_SIZE[0]
+            y = round(y / TILE_SIZE[1]) * TILE_SIZE[1]
+        width = generator.choice((TILE_SIZE[0], generator.uniform(1, 90)))
+        height = generator.choice((TILE_SIZE[1], generator.uniform(1, 90)))
+        expected = set(index for index, (other_x, other_y, other_width,
+                                            other_height) in enumerate(rects)
+                        if x < other_x + other_width and other_x < x + width
+                        and y < other_y + other_height and
+                        other_y < y + height)
+        assert set(tilemap.overlap(x, y, width, height)) == expected
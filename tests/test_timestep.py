@@ -0,0 +1,58 @@
+"""Tests for timestep.py, the fixed physics timestep."""
+import pytest
+
+from timestep import FixedTimestep
+
+def run(timestep, dt):
+    """Advances `timestep` by `dt`, and gets the lengths of the steps it
+    ran."""
+    steps = []
+    timestep.advance(dt, steps.append)
+    return steps
+
+def test_steps_at_a_fixed_rate():
+    timestep = FixedTimestep(rate=50)
+    assert timestep.step == 0.02
+    # Less than a step only adds to the accumulator
+    assert run(timestep, 0.015) == []
+    assert timestep.alpha == pytest.approx(0.75)
+    assert run(timestep, 0.015) == [0.02]
+    assert timestep.alpha == pytest.approx(0.5)
+    # Frames at the same rate as the physics run one step each
+    for _ in range(10):
+        assert run(timestep, 0.02) == [0.02]
+        assert timestep.alpha == pytest.approx(0.5)
+    assert timestep.steps == 11
+    assert timestep.extra_steps == 0
+    assert timestep.dropped_steps == 0
+
+def test_catches_up_after_a_slow_frame():
+    timestep = FixedTimestep(rate=100, max_substeps=5)
+    # Three steps and a half in one frame
+    assert len(run(timestep, 0.035)) == 3
+    assert timestep.extra_steps == 2
+    assert timestep.alpha == pytest.approx(0.5)
+    assert timestep.dropped_steps == 0
+
+def test_clamps_the_steps_of_one_frame():
+    timestep = FixedTimestep(rate=100, max_substeps=4)
+    # A frame of 10.25 steps only runs 4 of them, the other whole steps are
+    # dropped so that the next frame doesn't have to catch up
+    assert len(run(timestep, 0.1025)) == 4
+    assert timestep.extra_steps == 3
+    assert timestep.dropped_steps == 6
+    assert timestep.alpha == pytest.approx(0.25)
+    assert len(run(timestep, 0.01)) == 1
+    assert timestep.steps == 5
+
+def test_time_doesnt_go_backwards():
+    timestep = FixedTimestep(rate=10)
+    run(timestep, 0.05)
+    assert run(timestep, -1.0) == []
+    assert timestep.alpha == pytest.approx(0.5)
+
+def test_rate_and_substeps_must_be_positive():
+    with pytest.raises(ValueError):
+        FixedTimestep(rate=0)
+    with pytest.raises(ValueError):
+        FixedTimestep(max_substeps=0)
@@ -0,0 +1,70 @@
+"""Tests for Vector2f and ArrayVector2f (mathf.py), their operators and
+that the in-place ones change the vector itself."""
+from array import array
+import math
+
+import pytest
+
+from mathf import Vector2f, ArrayVector2f
+
+def test_operators():
+    a = Vector2f(x=6, y=8)
+    b = Vector2f((2, 4))
+    assert tuple(a + b) == (8.0, 12.0)
+    assert tuple(a + 1) == (7.0, 9.0)
+    # Subtracting is in order, a - b and not b - a
+    assert tuple(a - b) == (4.0, 4.0)
+    assert tuple(b - a) == (-4.0, -4.0)
+    assert tuple(a - 1.5) == (4.5, 6.5)
+    assert tuple(a * b) == (12.0, 32.0)
+    assert tuple(2 * a) == tuple(a * 2) == (12.0, 16.0)
+    assert tuple(a / b) == (3.0, 2.0)
+    assert tuple(a / 4) == (1.5, 2.0)
+    # True division, even for int components
+    assert tuple(Vector2f(x=1, y=3) / 2) == (0.5, 1.5)
+    with pytest.raises(ZeroDivisionError):
+        a / 0
+    with pytest.raises(TypeError):
+        a + "1"
+    # The operands stay the same
+    assert tuple(a) == (6.0, 8.0) and tuple(b) == (2.0, 4.0)
+
+@pytest.mark.parametrize("operation, expected", [
+    ("add", (8.0, 12.0)), ("sub", (4.0, 4.0)), ("mul", (12.0, 32.0)),
+    ("truediv", (3.0, 2.0)),
+])
+def test_in_place_operators(operation, expected):
+    xs = array("d", [0.0, 6.0])
+    ys = array("d", [0.0, 8.0])
+    for vector in (Vector2f(x=6, y=8), ArrayVector2f(xs, ys, 1)):
+        before = vector
+        if operation == "add":
+            vector += Vector2f(x=2, y=4)
+        elif operation == "sub":
+            vector -= Vector2f(x=2, y=4)
+        elif operation == "mul":
+            vector *= Vector2f(x=2, y=4)
+        else:
+            vector /= Vector2f(x=2, y=4)
+        # Changed in place, not replaced by a new vector
+        assert vector is before
+        assert tuple(vector) == expected
+    assert (xs[1], ys[1]) == expected
+    assert (xs[0], ys[0]) == (0.0, 0.0)
+
+def test_in_place_scalars():
+    vector = Vector2f(x=1, y=2)
+    vector += 1
+    vector -= 0.5
+    vector *= 4
+    vector /= 2
+    assert tuple(vector) == (3.0, 5.0)
+
+def test_set_and_length():
+    vector = Vector2f()
+    assert vector.set(3, 4) is vector
+    assert type(vector.x) is float and type(vector.y) is float
+    assert vector.length() == 5.0
+    assert Vector2f(x=-1, y=1).length() == pytest.approx(math.sqrt(2))
+    with pytest.raises(TypeError):
+        len(vector)
@@ -0,0 +1,259 @@
+"""Tests for PhysicsWorld (mathf.py), comparing it's queries to testing
+every rigidbody and collision rectangle, and for how it steps and puts
+rigidbodies to sleep."""
+import random
+
+import pytest
+
+from mathf import PhysicsWorld, RigidBody2D, Circlef, Rectanglef, Vector2f, \
+    STATIC, KINEMATIC, DYNAMIC, SLEEP_FRAMES
+from narrowphase import CIRCLE, swept_aabb, swept_shapes, overlap_shapes
+from tilemap import TileMap
+
+TILE_SIZE = (60, 60)
+
+@pytest.fixture(scope="module")
+def world():
+    """A world on a random level with static and moving rigidbodies, as
+    (world, rigidbodies)."""
+    generator = random.Random(4)
+    rows = [[("stone" if generator.random() < 0.15 else "None")
+                for _ in range(60)] for _ in range(30)]
+    physics_world = PhysicsWorld(TileMap.from_rows(rows, TILE_SIZE))
+    bodies = []
+    for index in range(300):
+        body = RigidBody2D(Rectanglef(
+            position=Vector2f((generator.uniform(0, 3600),
+                                generator.uniform(0, 1800))),
+            size=Vector2f((generator.uniform(10, 80),
+                            generator.uniform(10, 80)))),
+            physics_world, STATIC if index % 3 == 0 else DYNAMIC)
+        if body.body_type == DYNAMIC:
+            body.velocity = (generator.uniform(-5, 5),
+                                generator.uniform(-5, 5))
+        bodies.append(body)
+    for _ in range(5):
+        physics_world.Update(1.0 / 60.0)
+    return physics_world, bodies
+
+def random_queries(generator, count):
+    """Gets raycasts, sweeps and overlaps, one after the other."""
+    queries = []
+    for index in range(count):
+        x = generator.uniform(-100, 3700)
+        y = generator.uniform(-100, 1900)
+        kind = index % 3
+        if kind == 0:
+            queries.append((x, y, 0.0, 0.0, generator.uniform(-400, 400),
+                            generator.uniform(-400, 400)))
+        elif kind == 1:
+            queries.append((x, y, generator.uniform(5, 60),
+                            generator.uniform(5, 60),
+                            generator.uniform(-200, 200),
+                            generator.uniform(-200, 200)))
+        else:
+            queries.append((x, y, generator.uniform(0, 150),
+                            generator.uniform(0, 150), 0.0, 0.0))
+    return queries
+
+def body_rect(body):
+    return (body.position.x, body.position.y, body.size.x, body.size.y)
+
+def test_query_batch_matches_brute_force(world):
+    physics_world, bodies = world
+    tilemap = physics_world.tilemap
+    rects = [tilemap.collider_rect(index)
+                for index in range(len(tilemap.colliders()))]
+    queries = random_queries(random.Random(1), 1500)
+    results = physics_world.query_batch(queries)
+    assert len(results) == len(queries)
+
+    for query, result in zip(queries, results):
+        x, y, width, height, velocity_x, velocity_y = query
+        if velocity_x == 0 and velocity_y == 0:
+            expected = set(body for body in bodies
+                            if x < body.position.x + body.size.x and
+                            body.position.x < x + width and
+                            y < body.position.y + body.size.y and
+                            body.position.y < y + height)
+            assert set(hit.body for hit in result
+                        if hit.body is not None) == expected
+            expected_rects = sorted(rect for rect in rects
+                                    if x < rect[0] + rect[2] and
+                                    rect[0] < x + width and
+                                    y < rect[1] + rect[3] and
+                                    rect[1] < y + height)
+            assert sorted(hit.rect for hit in result
+                            if hit.body is None) == expected_rects
+            continue
+
+        expected = min([swept_aabb(*(query + body_rect(body)))
+                        for body in bodies] +
+                        [swept_aabb(*(query + rect)) for rect in rects] +
+                        [1])
+        if expected == 1:
+            assert result is None
+        else:
+            assert result.time == pytest.approx(expected, abs=1e-12)
+            assert swept_aabb(*(query + tuple(result.rect))) == \
+                pytest.approx(result.time, abs=1e-12)
+            if result.body is not None:
+                assert tuple(result.rect) == body_rect(result.body)
+
+def test_single_queries_match_query_batch(world):
+    physics_world, bodies = world
+    generator = random.Random(2)
+    for query in random_queries(generator, 150):
+        expected = physics_world.query_batch([query])[0]
+        x, y, width, height, velocity_x, velocity_y = query
+        if velocity_x == 0 and velocity_y == 0:
+            result = physics_world.overlap_rect(x, y, width, height)
+            assert [(hit.body, hit.rect) for hit in result] == \
+                [(hit.body, hit.rect) for hit in expected]
+        elif width == 0 and height == 0:
+            result = physics_world.raycast(x, y, velocity_x, velocity_y)
+            assert repr(result) == repr(expected)
+        else:
+            result = physics_world.cast_rect(x, y, width, height, velocity_x,
+                                                velocity_y)
+            assert repr(result) == repr(expected)
+
+def test_ignore_and_normals():
+    physics_world = PhysicsWorld()
+    wall = RigidBody2D(Rectanglef(position=Vector2f((100, 0)),
+                                    size=Vector2f((20, 100))),
+                        physics_world, STATIC)
+    hit = physics_world.raycast(0, 50, 200, 0)
+    assert hit.body is wall
+    assert hit.time == pytest.approx(0.5)
+    assert hit.normal == (-1.0, 0.0)
+    assert physics_world.raycast(0, 50, 200, 0, ignore=wall) is None
+
+    # Landing on top of it
+    hit = physics_world.cast_rect(100, 150, 10, 10, 0, -100)
+    assert hit.normal == (0.0, 1.0)
+    assert hit.time == pytest.approx(0.5)
+
+    hits = physics_world.overlap_rect(90, 10, 15, 10)
+    assert [hit.body for hit in hits] == [wall]
+    assert hits[0].normal == (-1.0, 0.0)
+    # Only touching isn't overlapping
+    assert physics_world.overlap_rect(80, 10, 20, 10) == []
+
+def test_circle_bodies_match_brute_force():
+    generator = random.Random(5)
+    physics_world = PhysicsWorld()
+    bodies = []
+    for _ in range(200):
+        position = Vector2f((generator.uniform(0, 2000),
+                                generator.uniform(0, 1000)))
+        if generator.random() < 0.5:
+            shape = Circlef(generator.uniform(5, 20), position)
+        else:
+            shape = Rectanglef(position=position, size=Vector2f((30, 30)))
+        bodies.append(RigidBody2D(shape, physics_world, STATIC))
+    for _ in range(300):
+        x = generator.uniform(0, 2000)
+        y = generator.uniform(0, 1000)
+        velocity_x = generator.uniform(-300, 300)
+        velocity_y = generator.uniform(-300, 300)
+        probe = Rectanglef(position=Vector2f((x, y)),
+                            size=Vector2f((20, 20)))
+        expected = min([swept_shapes(probe, velocity_x, velocity_y, body)
+                        for body in bodies] + [1])
+        hit = physics_world.cast_rect(x, y, 20, 20, velocity_x, velocity_y)
+        assert (hit.time if hit else 1) == pytest.approx(expected, abs=1e-12)
+
+        probe = Rectanglef(position=Vector2f((x, y)),
+                            size=Vector2f((60, 60)))
+        hits = physics_world.overlap_rect(x, y, 60, 60)
+        assert set(hit.body for hit in hits) == \
+            set(body for body in bodies if overlap_shapes(probe, body))
+        for hit in hits:
+            if hit.body.kind == CIRCLE:
+                assert hit.normal[0] ** 2 + hit.normal[1] ** 2 == \
+                    pytest.approx(1)
+
+def test_head_on_bodies_dont_pass_through():
+    physics_world = PhysicsWorld()
+    left = RigidBody2D(Rectanglef(position=Vector2f((0, 0)),
+                                    size=Vector2f((10, 10))),
+                        physics_world, DYNAMIC)
+    right = RigidBody2D(Rectanglef(position=Vector2f((25, 0)),
+                                    size=Vector2f((10, 10))),
+                        physics_world, DYNAMIC)
+    for _ in range(10):
+        # Faster than the gap between them, both would move into each other
+        # if they were swept against where the other one started
+        left.velocity = (10, 0)
+        right.velocity = (-10, 0)
+        physics_world.Update(1.0 / 60.0)
+        assert left.position.x + left.size.x <= right.position.x
+    # They meet in the gap and stay touching
+    assert left.position.x + left.size.x == right.position.x
+
+def sleep_world():
+    """A world with a resting dynamic rigidbody next to a wall, and a
+    static and a kinematic one that don't move."""
+    physics_world = PhysicsWorld()
+    bodies = dict()
+    for name, x, body_type in (("dynamic", 0, DYNAMIC), ("wall", 100, STATIC),
+                                ("kinematic", 300, KINEMATIC),
+                                ("other", 40, DYNAMIC)):
+        bodies[name] = RigidBody2D(Rectanglef(position=Vector2f((x, 0)),
+                                                size=Vector2f((20, 20))),
+                                    physics_world, body_type)
+    return physics_world, bodies
+
+def test_resting_bodies_fall_asleep():
+    physics_world, bodies = sleep_world()
+    for _ in range(SLEEP_FRAMES - 1):
+        physics_world.Update(1.0 / 60.0)
+    assert not bodies["dynamic"].sleeping
+    physics_world.Update(1.0 / 60.0)
+    assert bodies["dynamic"].sleeping and bodies["other"].sleeping
+
+    # Static and kinematic rigidbodies never sleep
+    for _ in range(SLEEP_FRAMES * 3):
+        physics_world.Update(1.0 / 60.0)
+    assert not bodies["wall"].sleeping
+    assert not bodies["kinematic"].sleeping
+    physics_world.sleep(bodies["kinematic"])
+    assert not bodies["kinematic"].sleeping
+
+def test_setting_velocity_wakes_up():
+    physics_world, bodies = sleep_world()
+    for _ in range(SLEEP_FRAMES):
+        physics_world.Update(1.0 / 60.0)
+    dynamic = bodies["dynamic"]
+    assert dynamic.sleeping
+
+    # The same value doesn't change anything
+    dynamic.velocity.x = 0
+    assert dynamic.sleeping
+    dynamic.velocity.y = 5
+    assert not dynamic.sleeping
+    physics_world.Update(1.0 / 60.0)
+    assert dynamic.position.y == 5
+
+    dynamic.velocity.y = 0
+    for _ in range(SLEEP_FRAMES):
+        physics_world.Update(1.0 / 60.0)
+    assert dynamic.sleeping
+    dynamic.velocity = (3, 0)
+    assert not dynamic.sleeping
+
+def test_contact_wakes_up():
+    physics_world, bodies = sleep_world()
+    for _ in range(SLEEP_FRAMES):
+        physics_world.Update(1.0 / 60.0)
+    other = bodies["other"]
+    assert other.sleeping
+    # Moving into `other` wakes it up, moving near it doesn't
+    bodies["dynamic"].velocity = (0, 5)
+    physics_world.Update(1.0 / 60.0)
+    assert other.sleeping
+    bodies["dynamic"].velocity = (30, 0)
+    physics_world.Update(1.0 / 60.0)
+    assert not other.sleeping
+    assert bodies["dynamic"].position.x + 20 <= other.position.x